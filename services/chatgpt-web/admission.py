@@ -0,0 +1,170 @@
+import asyncio, hashlib, json, time
+from collections import deque
+
+
+class Overloaded(Exception):
+    """The upstream queue is full, or a request waited past its deadline."""
+
+
+def prompt_key(model, messages):
+    raw = json.dumps([model, messages], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _percentiles(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+class Broadcast:
+    """Text parts of one upstream reply, fanned out to every request waiting on it.
+
+    Followers that join late first replay the parts already received, so a
+    coalesced stream looks the same to each client.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.error = None
+        self.finished = False
+        self.changed = asyncio.Event()
+
+    def push(self, part):
+        self.parts.append(part)
+        self._wake()
+
+    def finish(self, error=None):
+        self.error = error
+        self.finished = True
+        self._wake()
+
+    def _wake(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self):
+        seen = 0
+        while True:
+            changed = self.changed
+            while seen < len(self.parts):
+                seen += 1
+                yield self.parts[seen - 1]
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+    async def text(self):
+        return "".join([part async for part in self.follow()])
+
+
+class Admission:
+    """Gate in front of the model API: bounded concurrency, a bounded queue with a deadline,
+    and coalescing of identical prompts already in flight into one upstream call.
+
+    `submit(key, produce)` returns a Broadcast. `produce(push)` runs once a
+    slot is free and pushes the reply text as it arrives. A request whose key
+    is already in flight joins that broadcast instead of calling upstream again.
+    """
+
+    def __init__(self, max_concurrent=4, max_queue=32, queue_timeout=20.0, samples=500, clock=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self.running = 0
+        self.queued = 0
+        self.waiters = deque()      # futures handed a slot in FIFO order
+        self.inflight = {}          # key -> Broadcast
+        self.tasks = set()
+        self.waits = deque(maxlen=samples)
+        self.latencies = deque(maxlen=samples)
+        self.admitted = self.coalesced = self.rejected = self.timed_out = self.failed = 0
+
+    def submit(self, key, produce):
+        if key in self.inflight:
+            self.coalesced += 1
+            return self.inflight[key]
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("too many chat requests queued, try again shortly")
+        self.queued += 1
+        broadcast = Broadcast()
+        self.inflight[key] = broadcast
+        task = asyncio.get_running_loop().create_task(self._run(key, broadcast, produce))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return broadcast
+
+    async def _run(self, key, broadcast, produce):
+        try:
+            try:
+                await self._acquire()
+            finally:
+                self.queued -= 1
+            started = self.clock()
+            try:
+                await produce(broadcast.push)
+            finally:
+                self.latencies.append(self.clock() - started)
+                self._release()
+            broadcast.finish()
+        except Exception as e:
+            if not isinstance(e, Overloaded):
+                self.failed += 1
+            broadcast.finish(e)
+        finally:
+            if not broadcast.finished:  # cancelled (e.g. at shutdown): release every follower
+                broadcast.finish(Overloaded("chat request was cancelled"))
+            if self.inflight.get(key) is broadcast:
+                del self.inflight[key]
+
+    async def _acquire(self):
+        queued_at = self.clock()
+        if self.running < self.max_concurrent and not self.waiters:
+            self.running += 1
+        else:
+            slot = asyncio.get_running_loop().create_future()
+            self.waiters.append(slot)
+            try:
+                await asyncio.wait_for(slot, self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded(f"chat request waited over {self.queue_timeout:g}s for the model")
+            except asyncio.CancelledError:
+                if slot.done() and not slot.cancelled():
+                    self._release()  # a slot was handed over just as we were cancelled
+                raise
+            finally:
+                if slot in self.waiters:
+                    self.waiters.remove(slot)
+        self.admitted += 1
+        self.waits.append(self.clock() - queued_at)
+
+    def _release(self):
+        while self.waiters:
+            slot = self.waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)  # the slot passes straight to the next waiter
+                return
+        self.running -= 1
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "admitted": self.admitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+            "queue_wait": _percentiles(self.waits),
+            "upstream_latency": _percentiles(self.latencies),
+        }
@@ -0,0 +1,117 @@
+import os, queue, re, threading
+from datetime import datetime
+
+ENTRY_RE = re.compile(r"^\[(?P<ts>[^\]]*)\] USER: (?P<user>.*?)\n\[(?P=ts)\] GPT : (?P<reply>.*)\n\n$", re.S)
+ENTRY_START = re.compile(rb"^\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\] USER: ")
+
+
+class ChatLog:
+    """Buffered writer for `chat_<date>.log`, rolled over by each entry's own date.
+
+    `write` only enqueues; a background thread appends batches every
+    `flush_seconds`. Next to every log file a `chat_<date>.idx` holds the byte
+    offset of each entry, so `read(date, after)` seeks straight to a page
+    instead of loading the whole file. Logs without an index (written before
+    it existed) are indexed by one scan on first read.
+    """
+
+    def __init__(self, directory, flush_seconds=1.0, batch_size=100):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()  # guards files and the offset index
+        self.offsets = {}  # date -> [byte offset of each entry]
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="chat-log", daemon=True)
+        self.thread.start()
+
+    def path(self, date, ext="log"):
+        return os.path.join(self.directory, f"chat_{date}.{ext}")
+
+    def write(self, user_msg, reply, when=None):
+        when = when or datetime.now()
+        self.queue.put((when, user_msg, reply))
+
+    def flush(self):
+        """Block until everything written so far is on disk."""
+        self.queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get(timeout=self.flush_seconds))
+            except queue.Empty:
+                pass
+            try:
+                self._append(batch)
+            except Exception as e:
+                print(f"chat log write failed: {e}", flush=True)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _append(self, batch):
+        by_date = {}
+        for when, user_msg, reply in batch:
+            ts = when.strftime("%Y-%m-%d %H:%M:%S")
+            entry = f"[{ts}] USER: {user_msg}\n[{ts}] GPT : {reply}\n\n".encode("utf-8")
+            by_date.setdefault(when.strftime("%Y-%m-%d"), []).append(entry)
+        with self.lock:
+            for date, entries in by_date.items():
+                offsets = self._offsets(date)
+                with open(self.path(date), "ab") as log:
+                    pos = log.tell()
+                    new = []
+                    for entry in entries:
+                        new.append(pos)
+                        pos += len(entry)
+                    log.write(b"".join(entries))
+                with open(self.path(date, "idx"), "a") as idx:
+                    idx.write("".join(f"{o}\n" for o in new))
+                offsets.extend(new)
+
+    def _offsets(self, date):
+        """Entry offsets for `date`, loaded from the .idx file or rebuilt from the log. Call with lock held."""
+        if date in self.offsets:
+            return self.offsets[date]
+        offsets = []
+        try:
+            with open(self.path(date, "idx")) as idx:
+                offsets = [int(line) for line in idx if line.strip()]
+        except FileNotFoundError:
+            if os.path.exists(self.path(date)):
+                pos = 0
+                with open(self.path(date), "rb") as log:
+                    for line in log:
+                        if ENTRY_START.match(line):
+                            offsets.append(pos)
+                        pos += len(line)
+                with open(self.path(date, "idx"), "w") as idx:
+                    idx.write("".join(f"{o}\n" for o in offsets))
+        self.offsets[date] = offsets
+        return offsets
+
+    def read(self, date, after=0, limit=50):
+        """Entries `after`.. of `date` (0-based), as `{date, entries, next, more}`."""
+        with self.lock:
+            offsets = self._offsets(date)
+            page = offsets[after:after + limit]
+            end = offsets[after + limit] if len(offsets) > after + limit else None
+            total = len(offsets)
+            chunk = b""
+            if page:
+                with open(self.path(date), "rb") as log:
+                    log.seek(page[0])
+                    chunk = log.read(end - page[0]) if end is not None else log.read()
+        entries = []
+        bounds = [o - page[0] for o in page] + [len(chunk)]
+        for n, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+            text = chunk[start:stop].decode("utf-8", errors="replace")
+            match = ENTRY_RE.match(text)
+            entry = {"id": after + n, "ts": match["ts"], "user": match["user"], "reply": match["reply"]} if match \
+                else {"id": after + n, "ts": None, "user": None, "reply": text}
+            entries.append(entry)
+        return {"date": date, "entries": entries, "next": after + len(entries), "more": after + len(entries) < total}
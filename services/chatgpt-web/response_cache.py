@@ -0,0 +1,121 @@
+import hashlib, json, os, re, sqlite3, threading, time
+from collections import OrderedDict
+
+
+def normalize(message):
+    """Case, inner whitespace and trailing punctuation do not change the answer."""
+    return re.sub(r"\s+", " ", message).strip().rstrip("?!. ").lower()
+
+
+def cache_key(model, system_prompt, message):
+    raw = json.dumps([model, system_prompt, normalize(message)], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of chat replies, persisted to SQLite so it survives restarts.
+
+    `get` never touches SQLite: it is served from the in-memory OrderedDict
+    and only records the hit (last-used time) or expiry. Those are written in
+    the same transaction as the next `put`, or by `flush`, which is what the
+    async handlers should run off the event loop (e.g. in `asyncio.to_thread`).
+    """
+
+    def __init__(self, path, max_entries=500, ttl=3600, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()  # SQLite writes, so `get` never waits on a commit
+        self.entries = OrderedDict()  # key -> (expires_at, reply), least recently used first
+        self.touched = {}  # key -> last_used not yet written
+        self.stale = set()  # expired or evicted keys not yet deleted
+        self.hits = self.misses = self.evictions = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, reply TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._load()
+
+    def _load(self):
+        now = self.clock()
+        with self.db:
+            self.db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        rows = self.db.execute(
+            "SELECT key, reply, expires_at FROM responses ORDER BY last_used DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        for key, reply, expires_at in reversed(rows):
+            self.entries[key] = (expires_at, reply)
+
+    def get(self, key):
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.touched[key] = now
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, reply):
+        """Store a reply and write it, with every hit and drop recorded since the last write."""
+        now = self.clock()
+        with self.lock:
+            self.entries[key] = (now + self.ttl, reply)
+            self.entries.move_to_end(key)
+            self.touched.pop(key, None)
+            self.stale.discard(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+            touched, stale = self._take_pending()
+        self._write([(key, reply, now + self.ttl, now)], touched, stale)
+
+    def flush(self):
+        """Write the hits and drops recorded by `get` since the last write."""
+        with self.lock:
+            touched, stale = self._take_pending()
+        self._write([], touched, stale)
+
+    def _take_pending(self):
+        touched, self.touched = self.touched, {}
+        stale, self.stale = self.stale, set()
+        return touched, stale
+
+    def _write(self, inserts, touched, stale):
+        if not (inserts or touched or stale):
+            return
+        with self.db_lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO responses (key, reply, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                inserts,
+            )
+            self.db.executemany("UPDATE responses SET last_used = ? WHERE key = ?",
+                                [(used, key) for key, used in touched.items()])
+            self.db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in stale])
+
+    def _drop(self, key):
+        self.entries.pop(key, None)
+        self.touched.pop(key, None)
+        self.stale.add(key)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
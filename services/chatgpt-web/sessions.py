@@ -0,0 +1,124 @@
+import secrets, threading, time
+from collections import OrderedDict
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation between a user and the More Pi dashboard assistant in at most "
+    "{words} words. Keep facts, names, numbers and open questions the assistant may need later."
+)
+
+
+def estimate_tokens(text):
+    """Rough count (about 4 characters per token): enough to hold a budget without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+class Session:
+    def __init__(self, session_id, now):
+        self.id = session_id
+        self.summary = ""
+        self.turns = []  # alternating user/assistant messages, oldest first
+        self.last_used = now
+        self.compacting = False
+
+    def has_history(self):
+        return bool(self.summary or self.turns)
+
+    def tokens(self):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(t["content"]) for t in self.turns)
+
+
+class SessionStore:
+    """Conversation state per session id, bounded in count and evicted after `idle_seconds`.
+
+    History sent to the model is the running summary plus the most recent
+    turns. Once it exceeds `token_budget`, the oldest turns are folded into
+    the summary (by `summarize`) in the background, so the prompt stays
+    about the same size however long the conversation runs.
+    """
+
+    def __init__(self, max_sessions=200, idle_seconds=1800, token_budget=1500, summary_words=120,
+                 clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.token_budget = token_budget
+        self.summary_words = summary_words
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # id -> Session, least recently used first
+
+    def get(self, session_id=None):
+        """The live session for `session_id`, or a new one if it is unknown or expired."""
+        now = self.clock()
+        with self.lock:
+            while self.sessions and now - next(iter(self.sessions.values())).last_used >= self.idle_seconds:
+                self.sessions.popitem(last=False)
+            session = self.sessions.get(session_id) if session_id else None
+            if session is None:
+                while len(self.sessions) >= self.max_sessions:
+                    self.sessions.popitem(last=False)
+                session = Session(secrets.token_urlsafe(12), now)
+                self.sessions[session.id] = session
+            session.last_used = now
+            self.sessions.move_to_end(session.id)
+            return session
+
+    def drop(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def messages(self, session, system_prompt, user_msg):
+        """The prompt: summary plus the newest whole exchanges that fit `token_budget`.
+
+        Compaction runs in the background, so until it catches up the oldest
+        turns are left out here rather than sent over budget.
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        if session.summary:
+            messages.append({"role": "system", "content": f"Conversation so far: {session.summary}"})
+        turns, budget = session.turns, self.token_budget - estimate_tokens(session.summary)
+        start = len(turns)
+        while start >= 2:
+            cost = sum(estimate_tokens(t["content"]) for t in turns[start - 2:start])
+            if cost > budget:
+                break
+            budget -= cost
+            start -= 2
+        return messages + turns[start:] + [{"role": "user", "content": user_msg}]
+
+    def add_turn(self, session, user_msg, reply):
+        session.turns += [{"role": "user", "content": user_msg}, {"role": "assistant", "content": reply}]
+        return session.tokens() > self.token_budget and not session.compacting
+
+    async def compact(self, session, summarize):
+        """Fold the oldest turns into the summary until the history fits the budget again.
+
+        `summarize(messages)` is an async model call returning text. If it
+        fails the oldest turns are simply dropped, so the budget still holds.
+        """
+        if session.compacting:
+            return
+        session.compacting = True
+        try:
+            # Fold whole exchanges, oldest first, until what is left is half the budget.
+            count, remaining = 0, session.tokens()
+            while len(session.turns) - count > 2 and remaining > self.token_budget // 2:
+                remaining -= sum(estimate_tokens(t["content"]) for t in session.turns[count:count + 2])
+                count += 2
+            folded = session.turns[:count]
+            if not folded:
+                return
+            transcript = "\n".join(f"{t['role']}: {t['content']}" for t in folded)
+            if session.summary:
+                transcript = f"Earlier summary: {session.summary}\n{transcript}"
+            try:
+                summary = await summarize([
+                    {"role": "system", "content": SUMMARY_PROMPT.format(words=self.summary_words)},
+                    {"role": "user", "content": transcript},
+                ])
+                session.summary = summary.strip()
+            except Exception as e:
+                print(f"session summary failed, dropping oldest turns: {e}", flush=True)
+            # Turns added while the summary was being written stay untouched.
+            del session.turns[:len(folded)]
+        finally:
+            session.compacting = False
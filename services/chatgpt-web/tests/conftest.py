@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="chatgpt-logs-"))
+os.environ.setdefault("CHAT_CACHE_DB", os.path.join(tempfile.mkdtemp(prefix="chatgpt-cache-"), "cache.db"))
+
+
+class _StubOpenAI(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /v1/chat/completions: echoes the last user message in words."""
+
+    requests = []
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        time.sleep(self.delay)
+        words = f"echo: {body['messages'][-1]['content']}".split(" ")
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": "c1", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        payload = json.dumps({
+            "id": "c1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": " ".join(words)}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, fmt, *args):
+        return None
+
+
+@pytest.fixture
+def stub_openai(monkeypatch):
+    """Point web_chatgpt's client at a local stub server; yields the handler class for inspection."""
+    from openai import AsyncOpenAI
+
+    import web_chatgpt
+
+    _StubOpenAI.requests = []
+    _StubOpenAI.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOpenAI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    monkeypatch.setattr(web_chatgpt, "client", AsyncOpenAI(api_key="test-key", base_url=base_url))
+    yield _StubOpenAI
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch, tmp_path):
+    """Each test starts with an empty response cache."""
+    import web_chatgpt
+    from response_cache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(web_chatgpt, "cache", cache)
+    return cache
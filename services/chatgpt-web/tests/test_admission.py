@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx
+import pytest
+
+import web_chatgpt
+from admission import Admission, Overloaded
+
+
+def test_identical_prompts_in_flight_share_one_upstream_call(monkeypatch, stub_openai):
+    stub_openai.delay = 0.3
+    monkeypatch.setattr(web_chatgpt, "admission", Admission())
+
+    async def burst():
+        transport = httpx.ASGITransport(app=web_chatgpt.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                client.post("/api/chat", json={"message": "uptime?"}),
+                client.post("/api/chat", json={"message": "uptime?", "stream": True}),
+                client.post("/api/chat", json={"message": "uptime?"}),
+            )
+
+    plain, streamed, again = asyncio.run(burst())
+
+    assert len(stub_openai.requests) == 1
+    assert plain.json()["response"] == again.json()["response"] == "echo: uptime?"
+    assert '"response": "echo: uptime?"' in streamed.text
+    assert web_chatgpt.admission.stats()["coalesced"] == 2
+
+
+def test_queue_is_bounded_in_size_and_wait():
+    async def scenario():
+        gate = Admission(max_concurrent=1, max_queue=1, queue_timeout=0.1)
+
+        async def slow(push):
+            await asyncio.sleep(0.3)
+            push("slow")
+
+        first = gate.submit("a", slow)
+        await asyncio.sleep(0)  # let "a" take the only slot
+        second = gate.submit("b", slow)
+        with pytest.raises(Overloaded):
+            gate.submit("c", slow)  # queue already holds "b"
+        with pytest.raises(Overloaded):
+            await second.text()  # waited past the deadline
+        return await first.text(), gate.stats()
+
+    text, stats = asyncio.run(scenario())
+
+    assert text == "slow"
+    assert (stats["admitted"], stats["rejected"], stats["timed_out"]) == (1, 1, 1)
+    assert stats["running"] == stats["queued"] == 0
+    assert stats["upstream_latency"]["p50_ms"] >= 250
+
+
+def test_waiters_get_slots_in_order_and_wait_is_measured():
+    async def scenario():
+        gate = Admission(max_concurrent=1)
+        order = []
+
+        def job(name):
+            async def produce(push):
+                order.append(name)
+                await asyncio.sleep(0.05)
+                push(name)
+            return produce
+
+        replies = await asyncio.gather(*(gate.submit(n, job(n)).text() for n in "abc"))
+        return replies, order, gate.stats()
+
+    replies, order, stats = asyncio.run(scenario())
+
+    assert replies == order == ["a", "b", "c"]
+    assert stats["queue_wait"]["max_ms"] >= 90
+
+
+def test_cancelled_call_releases_followers_and_its_slot():
+    async def scenario():
+        gate = Admission(max_concurrent=1)
+
+        async def hang(push):
+            await asyncio.Event().wait()
+
+        broadcast = gate.submit("a", hang)
+        queued = gate.submit("b", hang)
+        followers = [asyncio.create_task(b.text()) for b in (broadcast, gate.submit("a", hang), queued)]
+        await asyncio.sleep(0)
+        for task in list(gate.tasks):
+            task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*followers, return_exceptions=True), 1)
+        return results, gate.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert all(isinstance(r, Overloaded) for r in results)
+    assert stats["running"] == stats["queued"] == 0
@@ -0,0 +1,82 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import web_chatgpt
+from response_cache import ResponseCache, cache_key
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_case_whitespace_and_trailing_punctuation():
+    assert cache_key("m", "sys", "What is  MorePi?") == cache_key("m", "sys", " what is morepi ")
+    assert cache_key("m", "sys", "hi") != cache_key("other", "sys", "hi")
+
+
+def test_lru_ttl_and_persistence(tmp_path):
+    clock = _Clock()
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, max_entries=2, ttl=60, clock=clock)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert cache.get("b") is None  # least recently used
+    assert ResponseCache(path, max_entries=2, ttl=60, clock=clock).get("a") == "A"
+    clock.now += 61
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_repeated_prompt_skips_upstream(stub_openai, fresh_cache):
+    client = TestClient(web_chatgpt.app)
+
+    first = client.post("/api/chat", json={"message": "How hot is the Pi?"}).json()
+    second = client.post("/api/chat", json={"message": "how hot is the pi"}).json()
+    with client.stream("POST", "/api/chat", json={"message": "How hot is the Pi", "stream": True}) as resp:
+        done = [json.loads(line[6:]) for line in resp.iter_lines() if line.startswith("data: ")][-1]
+    stats = client.get("/api/cache/stats").json()
+
+    assert second["session_id"] != first["session_id"]  # no session sent: each prompt stands alone
+    assert {k: second[k] for k in ("response", "cached")} == {"response": first["response"], "cached": True}
+    assert {k: done[k] for k in ("response", "cached")} == {"response": first["response"], "cached": True}
+    assert len(stub_openai.requests) == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_hits_are_written_with_the_next_put(tmp_path):
+    clock = _Clock()
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, max_entries=2, ttl=60, clock=clock)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    clock.now += 1
+    cache.get("a")
+
+    used = lambda: dict(cache.db.execute("SELECT key, last_used FROM responses").fetchall())
+    before = used()
+    clock.now += 1
+    cache.put("c", "C")  # evicts b, the least recently used
+
+    assert before == {"a": 1000.0, "b": 1000.0}
+    assert used() == {"a": 1001.0, "c": 1002.0}
+    clock.now += 60
+    assert cache.get("a") is None
+    cache.flush()
+    assert used() == {"c": 1002.0}
+
+
+def test_shutdown_writes_pending_hits(stub_openai, fresh_cache):
+    with TestClient(web_chatgpt.app) as client:
+        client.post("/api/chat", json={"message": "uptime?"})
+        client.post("/api/chat", json={"message": "uptime"})
+        assert fresh_cache.touched
+
+    assert not fresh_cache.touched
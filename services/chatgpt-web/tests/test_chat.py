@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+import web_chatgpt
+
+
+def _events(resp):
+    events, name = [], None
+    for line in resp.iter_lines():
+        if line.startswith("event: "):
+            name = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((name, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_chat_returns_json_reply(stub_openai):
+    client = TestClient(web_chatgpt.app)
+
+    resp = client.post("/api/chat", json={"message": "hi there"})
+
+    assert resp.json() == {"response": "echo: hi there", "session_id": resp.headers["x-session-id"]}
+    assert stub_openai.requests[0]["messages"][0]["role"] == "system"
+
+
+def test_slow_completions_do_not_block_each_other(stub_openai):
+    stub_openai.delay = 0.5
+
+    async def two_chats():
+        transport = httpx.ASGITransport(app=web_chatgpt.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/api/chat", json={"message": f"m{i}"}) for i in range(2)))
+
+    started = time.monotonic()
+    replies = asyncio.run(two_chats())
+
+    assert time.monotonic() - started < 0.9
+    assert sorted(r.json()["response"] for r in replies) == ["echo: m0", "echo: m1"]
+
+
+def test_chat_streams_deltas_then_done(stub_openai):
+    client = TestClient(web_chatgpt.app)
+
+    with client.stream("POST", "/api/chat", json={"message": "one two", "stream": True}) as resp:
+        events = _events(resp)
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert [e for e, _ in events] == ["delta", "delta", "delta", "done"]
+    assert "".join(d["content"] for e, d in events if e == "delta") == "echo: one two"
+    assert events[-1][1] == {"response": "echo: one two", "session_id": resp.headers["x-session-id"]}
+    assert stub_openai.requests[0]["stream"] is True
+
+
+def test_stream_reports_upstream_errors(monkeypatch, stub_openai):
+    def broken(*args, **kwargs):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(web_chatgpt.client.chat.completions, "create", broken)
+    with TestClient(web_chatgpt.app).stream("POST", "/api/chat", json={"message": "x", "stream": True}) as resp:
+        events = _events(resp)
+
+    assert events == [("error", {"error": "upstream down"})]
+
+
+def test_missing_message_is_rejected():
+    assert TestClient(web_chatgpt.app).post("/api/chat", json={}).status_code == 400
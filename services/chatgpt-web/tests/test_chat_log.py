@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import web_chatgpt
+from chat_log import ChatLog
+
+
+def test_entries_roll_over_by_their_own_date(tmp_path):
+    log = ChatLog(str(tmp_path), flush_seconds=0.01)
+    log.write("late", "night", when=datetime(2026, 3, 1, 23, 59, 59))
+    log.write("early", "morning", when=datetime(2026, 3, 2, 0, 0, 1))
+    log.flush()
+
+    assert [e["user"] for e in log.read("2026-03-01")["entries"]] == ["late"]
+    assert [e["user"] for e in log.read("2026-03-02")["entries"]] == ["early"]
+
+
+def test_paged_reads_use_the_index(tmp_path):
+    log = ChatLog(str(tmp_path), flush_seconds=0.01)
+    day = datetime(2026, 3, 1, 12, 0, 0)
+    for i in range(5):
+        log.write(f"q{i}", f"line one\nline two {i}", when=day)
+    log.flush()
+
+    first = log.read("2026-03-01", after=0, limit=2)
+    last = log.read("2026-03-01", after=4, limit=2)
+
+    assert [e["user"] for e in first["entries"]] == ["q0", "q1"] and first["next"] == 2 and first["more"]
+    assert last["entries"] == [{"id": 4, "ts": "2026-03-01 12:00:00", "user": "q4", "reply": "line one\nline two 4"}]
+    assert last["more"] is False
+    assert len((tmp_path / "chat_2026-03-01.idx").read_text().split()) == 5
+
+
+def test_legacy_log_without_index_is_scanned(tmp_path):
+    (tmp_path / "chat_2025-12-31.log").write_text(
+        "[2025-12-31 10:00:00] USER: a\n[2025-12-31 10:00:00] GPT : b\n\n"
+        "[2025-12-31 11:00:00] USER: c\n[2025-12-31 11:00:00] GPT : d\n\n"
+    )
+    log = ChatLog(str(tmp_path))
+
+    page = log.read("2025-12-31", after=1)
+
+    assert page["entries"] == [{"id": 1, "ts": "2025-12-31 11:00:00", "user": "c", "reply": "d"}]
+
+
+def test_logs_endpoint_defaults_to_today(stub_openai, monkeypatch, tmp_path):
+    monkeypatch.setattr(web_chatgpt, "chat_log", ChatLog(str(tmp_path), flush_seconds=0.01))
+    client = TestClient(web_chatgpt.app)
+    client.post("/api/chat", json={"message": "hello"})
+    web_chatgpt.chat_log.flush()
+
+    page = client.get("/logs").json()
+
+    assert page["date"] == datetime.now().strftime("%Y-%m-%d")
+    assert [(e["user"], e["reply"]) for e in page["entries"]] == [("hello", "echo: hello")]
+    assert client.get("/logs", params={"date": "../etc"}).status_code == 400
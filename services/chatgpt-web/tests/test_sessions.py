@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import web_chatgpt
+from sessions import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sessions_are_bounded_and_expire_when_idle():
+    clock = FakeClock()
+    store = SessionStore(max_sessions=2, idle_seconds=60, clock=clock)
+    a, b = store.get(), store.get()
+
+    assert store.get(a.id) is a
+    store.get()  # third session pushes out b, the least recently used
+    assert store.get(b.id) is not b
+    clock.now += 61
+    assert store.get(a.id) is not a
+    assert len(store.sessions) == 1
+
+
+def test_compact_folds_oldest_turns_into_summary():
+    store = SessionStore(token_budget=100)
+    session = store.get()
+    for i in range(6):
+        over = store.add_turn(session, f"question {i} " + "x" * 80, f"answer {i} " + "y" * 80)
+    seen = []
+
+    async def summarize(messages):
+        seen.append(messages[-1]["content"])
+        return "user asked six questions"
+
+    assert over
+    asyncio.run(store.compact(session, summarize))
+
+    assert session.summary == "user asked six questions"
+    assert session.tokens() <= store.token_budget
+    assert session.turns[-1]["content"].startswith("answer 5")
+    assert seen[0].startswith("user: question 0")
+    prompt = store.messages(session, "sys", "next")
+    assert prompt[1] == {"role": "system", "content": "Conversation so far: user asked six questions"}
+
+
+def test_compact_drops_turns_when_summary_fails():
+    store = SessionStore(token_budget=50)
+    session = store.get()
+    for i in range(4):
+        store.add_turn(session, "q" * 80, "a" * 80)
+
+    async def broken(messages):
+        raise RuntimeError("upstream down")
+
+    asyncio.run(store.compact(session, broken))
+
+    assert session.summary == ""
+    assert len(session.turns) == 2
+
+
+def test_prompt_keeps_to_the_budget_before_compaction():
+    store = SessionStore(token_budget=100)
+    session = store.get()
+    for i in range(6):
+        store.add_turn(session, f"question {i} " + "x" * 80, f"answer {i} " + "y" * 80)
+    session.summary = "s" * 40  # 11 tokens; each exchange is about 46
+
+    prompt = store.messages(session, "sys", "next")
+
+    assert [m["content"][:10] for m in prompt[2:-1]] == ["question 5", "answer 5 y"]
+    assert prompt[-1] == {"role": "user", "content": "next"}
+    assert len(session.turns) == 12  # the history itself is left to compaction
+
+
+def test_failed_compaction_is_kept_and_logged(monkeypatch, capsys):
+    async def broken(session, summarize):
+        raise RuntimeError("summary store down")
+
+    async def run():
+        session = web_chatgpt.sessions.get()
+        session.turns = [{"role": "user", "content": "x" * 8000}]
+        web_chatgpt.remember(session, "q", "a")
+        assert len(web_chatgpt.compactions) == 1
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(web_chatgpt.sessions, "compact", broken)
+    asyncio.run(run())
+
+    assert not web_chatgpt.compactions
+    assert "summary store down" in capsys.readouterr().out
+
+
+def test_chat_session_sends_history_and_bypasses_cache(stub_openai, fresh_cache):
+    client = TestClient(web_chatgpt.app)
+
+    first = client.post("/api/chat", json={"message": "my name is Pi"}).json()
+    again = client.post("/api/chat", json={"message": "my name is Pi", "session_id": first["session_id"]}).json()
+
+    assert again["session_id"] == first["session_id"]
+    assert "cached" not in again
+    assert len(stub_openai.requests) == 2
+    assert [m["role"] for m in stub_openai.requests[1]["messages"]] == ["system", "user", "assistant", "user"]
+    assert client.delete(f"/api/session/{first['session_id']}").json() == {"dropped": True}
@@ -1,31 +1,120 @@
-import os
+import os, json, asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
-from openai import OpenAI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from openai import AsyncOpenAI
+from chat_log import ChatLog
+from response_cache import ResponseCache, cache_key
+from sessions import SessionStore
+from admission import Admission, Overloaded, prompt_key
 
-app = FastAPI()
-
-# Mount the logs directory
-app.mount("/logs", StaticFiles(directory="/app/logs"), name="logs")
+LOG_DIR = os.getenv("LOG_DIR", "/app/logs")
+chat_log = ChatLog(LOG_DIR)
 
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key and os.path.exists("key.txt"):
     with open("key.txt") as f:
         api_key = f.read().strip()
 
-client = OpenAI(api_key=api_key)
+# Async client: a completion in flight no longer blocks other chats or /logs.
+# OPENAI_BASE_URL points it at any OpenAI-compatible server.
+client = AsyncOpenAI(api_key=api_key)
 model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+SYSTEM_PROMPT = "You are a helpful assistant on the More Pi dashboard."
+
+# Repeated dashboard questions are answered from here; CHAT_CACHE_TTL_SECONDS=0 turns it off.
+# Lookups stay in memory; its SQLite writes (cache.put) run in a worker thread.
+CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600"))
+cache = ResponseCache(
+    os.getenv("CHAT_CACHE_DB", "/app/data/response_cache.db"),
+    max_entries=int(os.getenv("CHAT_CACHE_SIZE", "500")),
+    ttl=CACHE_TTL,
+) if CACHE_TTL > 0 else None
+
+# Every upstream call goes through here: at most CHAT_MAX_CONCURRENT at once, the rest wait
+# (up to CHAT_MAX_QUEUE, for CHAT_QUEUE_TIMEOUT_SECONDS), and identical prompts in flight share one call.
+admission = Admission(
+    max_concurrent=int(os.getenv("CHAT_MAX_CONCURRENT", "4")),
+    max_queue=int(os.getenv("CHAT_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "20")),
+)
+
+def complete(messages, stream=False):
+    """Admit one completion; returns a Broadcast of its text. Raises Overloaded if the queue is full."""
+    async def produce(push):
+        if not stream:
+            resp = await client.chat.completions.create(model=model, messages=messages)
+            push(resp.choices[0].message.content)
+            return
+        chunks = await client.chat.completions.create(model=model, messages=messages, stream=True)
+        async for chunk in chunks:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                push(delta)
+    return admission.submit(prompt_key(model, messages), produce)
+
+# Conversation memory per dashboard tab. Only the running summary plus the latest
+# turns (CHAT_HISTORY_TOKENS) go to the model, however long the chat gets.
+sessions = SessionStore(
+    max_sessions=int(os.getenv("CHAT_SESSION_MAX", "200")),
+    idle_seconds=float(os.getenv("CHAT_SESSION_IDLE_SECONDS", "1800")),
+    token_budget=int(os.getenv("CHAT_HISTORY_TOKENS", "1500")),
+)
+
+async def summarize(messages):
+    return await complete(messages).text()
 
-LOG_DIR = "/app/logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-LOG_FILE = os.path.join(LOG_DIR, f"chat_{datetime.now().strftime('%Y-%m-%d')}.log")
+compactions = set()  # running compaction tasks; the loop itself only keeps weak references
+
+def compaction_done(task):
+    compactions.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"session compaction failed: {task.exception()!r}", flush=True)
+
+def remember(session, user_msg, reply):
+    if sessions.add_turn(session, user_msg, reply):
+        task = asyncio.create_task(sessions.compact(session, summarize))
+        compactions.add(task)
+        task.add_done_callback(compaction_done)
 
 def log_interaction(user_msg, reply):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] USER: {user_msg}\n[{ts}] GPT : {reply}\n\n")
+    chat_log.write(user_msg, reply)
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Shutdown: write out buffered log lines and the cache's pending hit times.
+    chat_log.flush()
+    if cache:
+        await asyncio.to_thread(cache.flush)
+
+app = FastAPI(lifespan=lifespan)
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def stream_cached(reply, session):
+    yield sse("delta", {"content": reply})
+    yield sse("done", {"response": reply, "cached": True, "session_id": session.id})
+
+async def stream_reply(upstream, user_msg, session, key=None):
+    """Yield SSE `delta` events as tokens arrive, then `done` with the full reply (or `error`)."""
+    parts = []
+    try:
+        async for delta in upstream.follow():
+            parts.append(delta)
+            yield sse("delta", {"content": delta})
+        reply = "".join(parts).strip()
+        log_interaction(user_msg, reply)
+        remember(session, user_msg, reply)
+        if key:
+            await asyncio.to_thread(cache.put, key, reply)
+        yield sse("done", {"response": reply, "session_id": session.id})
+    except Exception as e:
+        err = str(e)
+        log_interaction(user_msg, f"ERROR: {err}")
+        yield sse("error", {"error": err})
 
 @app.post("/api/chat")
 async def chat(request: Request):
@@ -33,19 +122,60 @@ async def chat(request: Request):
     user_msg = data.get("message", "")
     if not user_msg:
         return JSONResponse({"error": "Missing message"}, status_code=400)
+    session = sessions.get(data.get("session_id") or request.headers.get("x-session-id"))
+    messages = sessions.messages(session, SYSTEM_PROMPT, user_msg)
+    stream = data.get("stream") or "text/event-stream" in request.headers.get("accept", "")
+    headers = {"X-Session-Id": session.id}
+    # A reply that depends on earlier turns is neither served from nor stored in the cache.
+    key = cache_key(model, SYSTEM_PROMPT, user_msg) if cache and not session.has_history() else None
+    cached = cache.get(key) if key else None
+    if cached is not None:
+        log_interaction(user_msg, cached)
+        remember(session, user_msg, cached)
+        if stream:
+            return StreamingResponse(stream_cached(cached, session), media_type="text/event-stream", headers=headers)
+        return JSONResponse({"response": cached, "cached": True, "session_id": session.id}, headers=headers)
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant on the More Pi dashboard."},
-                {"role": "user", "content": user_msg},
-            ],
+        upstream = complete(messages, stream=bool(stream))
+    except Overloaded as e:
+        log_interaction(user_msg, f"ERROR: {e}")
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "5"})
+    if stream:
+        return StreamingResponse(
+            stream_reply(upstream, user_msg, session, key),
+            media_type="text/event-stream",
+            headers={**headers, "Cache-Control": "no-store", "X-Accel-Buffering": "no"},
         )
-        reply = resp.choices[0].message.content.strip()
+    try:
+        reply = (await upstream.text()).strip()
         log_interaction(user_msg, reply)
-        return {"response": reply}
+        remember(session, user_msg, reply)
+        if key:
+            await asyncio.to_thread(cache.put, key, reply)
+        return JSONResponse({"response": reply, "session_id": session.id}, headers=headers)
     except Exception as e:
         err = str(e)
         log_interaction(user_msg, f"ERROR: {err}")
-        return JSONResponse({"error": err}, status_code=500)
+        return JSONResponse({"error": err}, status_code=503 if isinstance(e, Overloaded) else 500)
+
+@app.delete("/api/session/{session_id}")
+async def end_session(session_id: str):
+    return {"dropped": sessions.drop(session_id)}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return cache.stats() if cache else {"enabled": False}
 
+@app.get("/api/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+# Paged chat history: entries `after`.. of one day's log (default today), read via its offset index.
+@app.get("/logs")
+def logs(date: str = "", after: int = 0, limit: int = 50):
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    return chat_log.read(date, max(0, after), max(1, min(limit, 500)))
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""One cached status snapshot for every dashboard tab (proxied by nginx under /status/).
+
+Follows the Docker events stream, a system sampler (see sysinfo_ring), version.json
+and the external site check in background threads and keeps a single merged snapshot
+in memory. Browsers revalidate it with If-None-Match, so an unchanged
+snapshot costs a 304 and no upstream calls however many tabs are open.
+"""
+import hashlib, http.client, json, os, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+from urllib.request import Request, urlopen
+
+from sysinfo_ring import HISTORY_DAYS, SAMPLE_SECONDS, History, RingBuffer, Sampler, current
+
+PORT = int(os.getenv("PORT", "8090"))
+DOCKER_URL = os.getenv("DOCKER_URL", "http://dockerproxy:2375").rstrip("/")
+RING_FILE = os.getenv("RING_FILE", "/data/sysinfo.ring")
+VERSION_FILE = os.getenv("VERSION_FILE", "/html/version.json")
+EXTERNAL_URL = os.getenv("EXTERNAL_URL", "https://turbatto.com")
+VERSION_SECONDS = float(os.getenv("VERSION_SECONDS", "15"))
+EXTERNAL_SECONDS = float(os.getenv("EXTERNAL_SECONDS", "15"))
+DOCKER_RESYNC_SECONDS = float(os.getenv("DOCKER_RESYNC_SECONDS", "300"))
+DOCKER_MAX_BACKOFF = 60
+HEALTH_RE = re.compile(r"\((healthy|unhealthy|health: starting)\)")
+# container events that can change what the dashboard shows; not exec_* (every healthcheck run)
+DOCKER_EVENTS = ("create", "start", "restart", "stop", "die", "kill", "pause", "unpause", "rename", "destroy",
+                 "health_status")
+
+
+def log(msg):
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {msg}", flush=True)
+
+
+class Snapshot:
+    """The merged status document, re-rendered (with a new ETag) only when a part changes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.parts = {"containers": [], "system": {}, "version": {}, "external": {}}
+        self.body = b""
+        self.etag = ""
+        self._render()
+
+    def update(self, part, value):
+        with self.lock:
+            if self.parts.get(part) == value:
+                return False
+            self.parts[part] = value
+            self._render()
+            return True
+
+    def _render(self):
+        self.body = json.dumps({**self.parts, "updated": int(time.time())}, separators=(",", ":")).encode()
+        self.etag = '"%s"' % hashlib.sha1(json.dumps(self.parts, sort_keys=True).encode()).hexdigest()[:16]
+
+    def current(self):
+        with self.lock:
+            return self.body, self.etag
+
+
+def summarize_containers(containers):
+    """Keep only what the dashboard shows: names, state and health."""
+    out = []
+    for c in containers:
+        match = HEALTH_RE.search(c.get("Status") or "")
+        out.append({
+            "names": [n.lstrip("/") for n in c.get("Names") or []],
+            "state": c.get("State") or "unknown",
+            "health": match.group(1).replace("health: ", "") if match else None,
+        })
+    return sorted(out, key=lambda c: c["names"])
+
+
+def is_state_change(event):
+    """True for a Docker events line that can change a container's name, state or health."""
+    action = (event.get("Action") or event.get("status") or "").split(":")[0]
+    return action in DOCKER_EVENTS
+
+
+class DockerFollower(threading.Thread):
+    """Lists containers once, then re-lists only when the events stream reports a container change.
+
+    Exec and other noise events are filtered out by Docker and again here, and a
+    failing daemon keeps the last good list on the dashboard instead of blanking it.
+    """
+
+    def __init__(self, snapshot, base_url=DOCKER_URL):
+        super().__init__(name="docker-events", daemon=True)
+        self.snapshot = snapshot
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+
+    def _get(self, path, timeout):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        if resp.status != 200:
+            raise RuntimeError(f"docker {path} -> {resp.status}")
+        return conn, resp
+
+    def refresh(self):
+        conn, resp = self._get("/containers/json?all=1", timeout=10)
+        try:
+            self.snapshot.update("containers", summarize_containers(json.load(resp)))
+        finally:
+            conn.close()
+
+    def follow(self):
+        """Block on the events stream; returns when it ends or the resync interval passes."""
+        since = int(time.time())
+        until = since + int(DOCKER_RESYNC_SECONDS)
+        filters = json.dumps({"type": ["container"], "event": list(DOCKER_EVENTS)}, separators=(",", ":"))
+        self.refresh()
+        conn, resp = self._get(f"/events?since={since}&until={until}&filters={quote(filters)}",
+                               timeout=DOCKER_RESYNC_SECONDS + 30)
+        try:
+            for line in resp:
+                if line.strip() and is_state_change(json.loads(line)):
+                    self.refresh()
+        finally:
+            conn.close()
+
+    def run(self):
+        backoff = 1
+        while True:
+            try:
+                self.follow()
+                backoff = 1
+            except Exception as e:
+                log(f"⚠️ Docker events: {e}, keeping last container list, retrying in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, DOCKER_MAX_BACKOFF)
+
+
+def system_summary(sample):
+    """The few figures the status bar shows, rounded so the snapshot ETag does not churn on noise."""
+    temp, load = sample.get("temp"), sample.get("load1")
+    return {
+        "temp": f"{temp:.1f}" if temp is not None else None,
+        "load": f"{load:.2f}" if load is not None else None,
+        "mem_pct": round(sample["mem_pct"]) if sample.get("mem_pct") is not None else None,
+        "disk_pct": round(sample["disk_pct"]) if sample.get("disk_pct") is not None else None,
+    }
+
+
+def read_version():
+    try:
+        with open(VERSION_FILE) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {k: meta[k] for k in ("version", "commit", "built_at") if meta.get(k)}
+
+
+def check_external():
+    started = time.monotonic()
+    try:
+        with urlopen(Request(EXTERNAL_URL, method="HEAD", headers={"User-Agent": "dashboard-status"}), timeout=5):
+            pass
+        online = True
+    except Exception as e:
+        # Any HTTP answer means the site is up; only network failures count as offline.
+        online = hasattr(e, "code")
+    return {"url": EXTERNAL_URL, "online": online, "ms": int((time.monotonic() - started) * 1000) if online else None}
+
+
+def every(seconds, part, fn, snapshot):
+    def loop():
+        while True:
+            try:
+                snapshot.update(part, fn())
+            except Exception as e:
+                log(f"⚠️ {part}: {e}")
+            time.sleep(seconds)
+    threading.Thread(target=loop, name=f"poll-{part}", daemon=True).start()
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    server_version = "dashboard-status"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/")
+        if path == "/status/health":
+            return self.send_body(b'{"status":"ok"}')
+        if path == "/status/sysinfo":
+            return self.sysinfo({k: v[-1] for k, v in parse_qs(url.query).items()})
+        if path not in ("/status", "/status/snapshot"):
+            return self.send_body(b'{"error":"not found"}', 404)
+        body, etag = self.server.snapshot.current()
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+        self.send_body(body, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    def sysinfo(self, query):
+        history = self.server.history
+        if history is None:
+            return self.send_body(b'{"error":"sysinfo sampling disabled"}', 503)
+        try:
+            payload = {"current": current(history.ring), **history.window(query.get("window", "1h"))}
+        except ValueError as e:
+            return self.send_body(json.dumps({"error": str(e)}).encode(), 400)
+        # history only moves once per sample
+        self.send_body(json.dumps(payload, separators=(",", ":")).encode(),
+                       headers={"Cache-Control": f"max-age={int(SAMPLE_SECONDS)}"})
+
+    def send_body(self, body, status=200, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        return None
+
+
+def start_server(snapshot, history=None, port=PORT, host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), StatusHandler)
+    server.daemon_threads = True
+    server.snapshot = snapshot
+    server.history = history
+    threading.Thread(target=server.serve_forever, name="status-api", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    snapshot = Snapshot()
+    DockerFollower(snapshot).start()
+    ring = RingBuffer(RING_FILE, capacity=int(HISTORY_DAYS * 86400 / SAMPLE_SECONDS))
+    Sampler(ring, on_sample=lambda sample: snapshot.update("system", system_summary(sample))).start()
+    every(VERSION_SECONDS, "version", read_version, snapshot)
+    every(EXTERNAL_SECONDS, "external", check_external, snapshot)
+    start_server(snapshot, History(ring))
+    log(f"✅ Serving dashboard status on :{PORT}")
+    threading.Event().wait()
@@ -0,0 +1,234 @@
+"""Fixed-rate system samples in a memory-mapped ring buffer, with downsampled history."""
+import math, mmap, os, struct, threading, time
+
+SAMPLE_SECONDS = float(os.getenv("SAMPLE_SECONDS", "10"))
+HISTORY_DAYS = float(os.getenv("HISTORY_DAYS", "7"))
+PROC_ROOT = os.getenv("PROC_ROOT", "/proc")
+THERMAL_ZONE = os.getenv("THERMAL_ZONE", "/sys/class/thermal/thermal_zone0/temp")
+TEMP_FILE = os.getenv("TEMP_FILE", "/shared/sysinfo/temp")  # host-written °C, used when sysfs is not visible
+DISK_PATH = os.getenv("DISK_PATH", "/")
+NET_IFACES = {i for i in os.getenv("NET_IFACES", "").split(",") if i.strip()}  # empty: all but lo
+
+FIELDS = ("temp", "load1", "mem_pct", "disk_pct", "rx_bps", "tx_bps")
+RECORD = struct.Struct("<d" + "f" * len(FIELDS))  # ts, then one float per field (NaN = unknown)
+HEADER = struct.Struct("<4sIIIQ")  # magic, version, record size, capacity, records written
+MAGIC, VERSION = b"SYSR", 1
+WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+POINTS = 120
+
+
+class RingBuffer:
+    """Append-only ring of RECORDs in a file-backed mmap.
+
+    The header's write counter is bumped after the record is in place, so a
+    reader (or a restart after a crash) never sees a half-written sample.
+    History survives restarts; a file with a different layout is reset.
+    """
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        size = HEADER.size + RECORD.size * capacity
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fresh = os.fstat(fd).st_size != size
+            if fresh:
+                os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, version, record_size, cap, written = HEADER.unpack_from(self.mm, 0)
+        if fresh or (magic, version, record_size, cap) != (MAGIC, VERSION, RECORD.size, capacity):
+            self.written = 0
+            self._write_header()
+        else:
+            self.written = written
+
+    def _write_header(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, RECORD.size, self.capacity, self.written)
+
+    def append(self, ts, values):
+        with self.lock:
+            slot = self.written % self.capacity
+            RECORD.pack_into(self.mm, HEADER.size + slot * RECORD.size, ts, *values)
+            self.written += 1
+            self._write_header()
+
+    def latest(self):
+        rows = self.since(0, limit=1)
+        return rows[0] if rows else None
+
+    def since(self, ts, limit=None):
+        """Records with timestamp >= `ts`, newest first."""
+        out = []
+        with self.lock:
+            first = max(0, self.written - self.capacity)
+            for n in range(self.written - 1, first - 1, -1):
+                row = RECORD.unpack_from(self.mm, HEADER.size + (n % self.capacity) * RECORD.size)
+                if row[0] < ts or (limit is not None and len(out) >= limit):
+                    break
+                out.append(row)
+        return out
+
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+
+
+def _clean(value, digits=2):
+    return None if value is None or math.isnan(value) else round(value, digits)
+
+
+def downsample(rows, window_seconds, now, points=POINTS):
+    """Average `rows` into `points` equal buckets ending at `now`; empty buckets are skipped."""
+    step = window_seconds / points
+    start = now - window_seconds
+    sums = {}
+    for row in rows:
+        if row[0] < start:
+            continue
+        b = min(int((row[0] - start) // step), points - 1)
+        acc = sums.setdefault(b, [[0.0, 0] for _ in FIELDS])
+        for acc_field, value in zip(acc, row[1:]):
+            if not math.isnan(value):
+                acc_field[0] += value
+                acc_field[1] += 1
+    return {
+        "step": step,
+        "points": [
+            [int(start + (b + 1) * step)] + [_clean(total / n if n else None) for total, n in sums[b]]
+            for b in sorted(sums)
+        ],
+    }
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def read_temp():
+    try:
+        return int(_read(THERMAL_ZONE)) / 1000.0
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(_read(TEMP_FILE))
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def read_load():
+    raw = _read(os.path.join(PROC_ROOT, "loadavg"))
+    return float(raw.split()[0]) if raw else float("nan")
+
+
+def read_mem_pct():
+    info = {}
+    for line in (_read(os.path.join(PROC_ROOT, "meminfo")) or "").splitlines():
+        key, _, rest = line.partition(":")
+        info[key] = int(rest.split()[0]) if rest.split() else 0
+    total, available = info.get("MemTotal"), info.get("MemAvailable")
+    return 100.0 * (total - available) / total if total and available is not None else float("nan")
+
+
+def read_disk_pct():
+    try:
+        st = os.statvfs(DISK_PATH)
+    except OSError:
+        return float("nan")
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    usable = used + st.f_bavail * st.f_frsize
+    return 100.0 * used / usable if usable else float("nan")
+
+
+def read_net_bytes():
+    """Total (rx, tx) bytes; /proc/1/net/dev so a host /proc mount reports host interfaces."""
+    rx = tx = 0
+    raw = _read(os.path.join(PROC_ROOT, "1", "net", "dev")) or _read(os.path.join(PROC_ROOT, "net", "dev"))
+    if not raw:
+        return None
+    for line in raw.splitlines()[2:]:
+        iface, _, data = line.partition(":")
+        iface = iface.strip()
+        if iface == "lo" or (NET_IFACES and iface not in NET_IFACES):
+            continue
+        cols = data.split()
+        rx += int(cols[0])
+        tx += int(cols[8])
+    return rx, tx
+
+
+class Sampler(threading.Thread):
+    """Samples every SAMPLE_SECONDS into the ring and calls `on_sample(current)`."""
+
+    def __init__(self, ring, on_sample=None, interval=SAMPLE_SECONDS):
+        super().__init__(name="sysinfo-sampler", daemon=True)
+        self.ring = ring
+        self.on_sample = on_sample
+        self.interval = interval
+        self._last_net = None
+
+    def sample(self, now=None):
+        now = time.time() if now is None else now
+        rx_bps = tx_bps = float("nan")
+        net = read_net_bytes()
+        if net and self._last_net:
+            elapsed = now - self._last_net[0]
+            if elapsed > 0:
+                rx_bps = max(0, net[0] - self._last_net[1][0]) / elapsed
+                tx_bps = max(0, net[1] - self._last_net[1][1]) / elapsed
+        if net:
+            self._last_net = (now, net)
+        values = (read_temp(), read_load(), read_mem_pct(), read_disk_pct(), rx_bps, tx_bps)
+        self.ring.append(now, values)
+        return current(self.ring)
+
+    def run(self):
+        next_at = time.monotonic()
+        while True:
+            try:
+                snapshot = self.sample()
+                if self.on_sample:
+                    self.on_sample(snapshot)
+            except Exception as e:
+                print(f"⚠️ sysinfo sample failed: {e}", flush=True)
+            next_at += self.interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+
+def current(ring):
+    row = ring.latest()
+    if row is None:
+        return {}
+    return {"ts": int(row[0]), **{field: _clean(value) for field, value in zip(FIELDS, row[1:])}}
+
+
+class History:
+    """Downsampled windows, recomputed only after a new sample lands."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.lock = threading.Lock()
+        self.cache = {}  # window -> (records written, result)
+
+    def window(self, name, now=None):
+        if name not in WINDOWS:
+            raise ValueError(f"window must be one of {', '.join(WINDOWS)}")
+        written = self.ring.written
+        with self.lock:
+            cached = self.cache.get(name)
+            if cached and cached[0] == written and now is None:
+                return cached[1]
+        seconds = WINDOWS[name]
+        now = time.time() if now is None else now
+        result = {"window": name, "fields": list(FIELDS), **downsample(self.ring.since(now - seconds), seconds, now)}
+        with self.lock:
+            self.cache[name] = (written, result)
+        return result
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from dashboard_status import DockerFollower, Snapshot, is_state_change, start_server, summarize_containers
+
+
+def _container(name, state="running", status="Up 2 hours"):
+    return {"Names": [f"/{name}"], "State": state, "Status": status}
+
+
+class _FakeDocker(BaseHTTPRequestHandler):
+    containers = [_container("nginx")]
+    events = threading.Event()
+    list_calls = 0
+
+    def do_GET(self):
+        if self.path.startswith("/containers/json"):
+            type(self).list_calls += 1
+            body = json.dumps(self.containers).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith("/events"):
+            self.send_response(200)
+            self.end_headers()
+            self.events.wait(5)
+            for action in (b"exec_create: true", b"exec_start: true", b"exec_die"):
+                self.wfile.write(b'{"Type":"container","Action":"%s"}\n' % action)
+            self.wfile.write(b'{"Type":"container","Action":"die"}\n')
+            self.wfile.flush()
+            time.sleep(5)
+
+    def log_message(self, fmt, *args):
+        return None
+
+
+def test_summary_extracts_health():
+    summary = summarize_containers([_container("farmbot", status="Up 5 minutes (unhealthy)"), _container("a")])
+
+    assert summary == [
+        {"names": ["a"], "state": "running", "health": None},
+        {"names": ["farmbot"], "state": "running", "health": "unhealthy"},
+    ]
+
+
+def test_follower_relists_on_container_event():
+    docker = ThreadingHTTPServer(("127.0.0.1", 0), _FakeDocker)
+    docker.daemon_threads = True
+    threading.Thread(target=docker.serve_forever, daemon=True).start()
+    snapshot = Snapshot()
+    DockerFollower(snapshot, f"http://127.0.0.1:{docker.server_address[1]}").start()
+    try:
+        deadline = time.monotonic() + 2
+        while not snapshot.parts["containers"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert snapshot.parts["containers"][0]["state"] == "running"
+
+        _FakeDocker.containers = [_container("nginx", state="exited", status="Exited (0)")]
+        _FakeDocker.events.set()
+        deadline = time.monotonic() + 2
+        while snapshot.parts["containers"][0]["state"] != "exited" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        docker.shutdown()
+
+    assert snapshot.parts["containers"][0]["state"] == "exited"
+    assert _FakeDocker.list_calls == 2
+
+
+def test_only_state_changes_trigger_a_relist():
+    assert is_state_change({"Action": "health_status: unhealthy"})
+    assert is_state_change({"status": "rename"})
+    assert not is_state_change({"Action": "exec_start: /bin/sh -c healthcheck"})
+    assert not is_state_change({"Action": "attach"})
+
+
+def test_docker_failure_keeps_last_container_list(monkeypatch):
+    class _Stop(Exception):
+        pass
+
+    def stop(seconds):
+        raise _Stop
+
+    snapshot = Snapshot()
+    snapshot.update("containers", summarize_containers([_container("nginx")]))
+    follower = DockerFollower(snapshot, "http://127.0.0.1:9")
+    monkeypatch.setattr("dashboard_status.time.sleep", stop)
+
+    with pytest.raises(_Stop):
+        follower.run()
+
+    assert snapshot.parts["containers"] == [{"names": ["nginx"], "state": "running", "health": None}]
+
+
+def test_unchanged_snapshot_revalidates_with_304():
+    snapshot = Snapshot()
+    snapshot.update("system", {"temp": "48.2", "load": "0.4"})
+    server = start_server(snapshot, port=0, host="127.0.0.1")
+    url = f"http://127.0.0.1:{server.server_address[1]}/status/"
+    try:
+        first = urlopen(url)
+        etag = first.headers["ETag"]
+        body = json.load(first)
+        try:
+            urlopen(Request(url, headers={"If-None-Match": etag}))
+            status = 200
+        except HTTPError as e:
+            status = e.code
+        snapshot.update("system", {"temp": "49.0", "load": "0.4"})
+        changed = urlopen(Request(url, headers={"If-None-Match": etag}))
+    finally:
+        server.shutdown()
+
+    assert body["system"] == {"temp": "48.2", "load": "0.4"}
+    assert status == 304
+    assert changed.headers["ETag"] != etag
+    assert snapshot.update("system", {"temp": "49.0", "load": "0.4"}) is False
@@ -0,0 +1,51 @@
+import math
+
+import sysinfo_ring
+from sysinfo_ring import FIELDS, History, RingBuffer, Sampler, downsample
+
+NAN = float("nan")
+
+
+def _values(temp, load=0.5):
+    return (temp, load, 40.0, 60.0, NAN, NAN)
+
+
+def test_ring_wraps_and_survives_reopen(tmp_path):
+    path = str(tmp_path / "sysinfo.ring")
+    ring = RingBuffer(path, capacity=3)
+    for i in range(5):
+        ring.append(1000 + i, _values(40 + i))
+    ring.close()
+
+    reopened = RingBuffer(path, capacity=3)
+
+    assert [int(row[0]) for row in reopened.since(0)] == [1004, 1003, 1002]
+    assert [int(row[0]) for row in reopened.since(1003)] == [1004, 1003]
+    assert RingBuffer(path, capacity=4).written == 0  # layout changed: history reset
+
+
+def test_downsample_averages_buckets_and_skips_unknowns():
+    rows = [(t, *_values(40.0 if t < 50 else 50.0)) for t in range(0, 100, 10)]
+
+    result = downsample(rows, window_seconds=100, now=100, points=2)
+
+    assert result["step"] == 50
+    assert [p[0] for p in result["points"]] == [50, 100]
+    assert [p[1 + FIELDS.index("temp")] for p in result["points"]] == [40.0, 50.0]
+    assert result["points"][0][1 + FIELDS.index("rx_bps")] is None
+
+
+def test_sampler_records_network_rates(tmp_path, monkeypatch):
+    counters = iter([(1000, 500), (3000, 1500)])
+    monkeypatch.setattr(sysinfo_ring, "read_net_bytes", lambda: next(counters))
+    monkeypatch.setattr(sysinfo_ring, "read_temp", lambda: 51.5)
+    ring = RingBuffer(str(tmp_path / "r"), capacity=100)
+    sampler = Sampler(ring)
+
+    sampler.sample(now=1_000_000)
+    latest = sampler.sample(now=1_000_010)
+
+    assert latest["temp"] == 51.5 and latest["rx_bps"] == 200 and latest["tx_bps"] == 100
+    assert not math.isnan(ring.latest()[1 + FIELDS.index("load1")])
+    history = History(ring)
+    assert history.window("1h", now=1_000_010)["points"][-1][1 + FIELDS.index("rx_bps")] == 200
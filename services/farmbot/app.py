@@ -1,13 +1,16 @@
+import json
 import logging
 import os
+import socket
+import tempfile
 import threading
 import time
 from pathlib import Path
 
 import requests
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 
-from farmbot_actions import ActionRunner, build_default_actions
+from farmbot_actions import ActionCancelled, ActionRunner, CancelSignal, RunnerBusy, build_default_actions
 from secret_loader import get_secret
 
 
@@ -140,6 +143,45 @@ def _request_origin_matches_unifi_host(request_obj, expected_host: str | None) -
         return True
     return remote_addr == expected_host
 
+
+def _request_from_unifi_relay(request_obj, relay_hosts: list[str]) -> bool:
+    """True when the caller is one of `UNIFI_RELAY_HOSTS` (addresses or names resolved per call)."""
+    if not relay_hosts:
+        return False
+    addresses = set()
+    for host in relay_hosts:
+        try:
+            addresses.update(socket.gethostbyname_ex(host)[2])
+        except OSError:
+            continue
+    forwarded_for = request_obj.headers.get("X-Forwarded-For", "")
+    candidates = {(request_obj.remote_addr or "").strip()}
+    if forwarded_for:
+        candidates.add(forwarded_for.split(",")[0].strip())
+    return bool(addresses & candidates)
+
+
+def _reject_unifi_webhook(
+    request_obj, expected_host: str | None, api_key: str | None, relay_hosts: list[str]
+) -> tuple | None:
+    """Return the error response for a UniFi webhook call that may not proceed, else None.
+
+    Calls must come from the UniFi host, localhost or one of the relay hosts (such as the
+    unifi collector's webhook sink), and carry the API key when one is configured.
+    """
+    logger = logging.getLogger("farmbot-web")
+    if not (
+        _request_origin_matches_unifi_host(request_obj, expected_host)
+        or _request_from_unifi_relay(request_obj, relay_hosts)
+    ):
+        logger.warning("Rejected UniFi webhook request from unexpected host: %s", request_obj.remote_addr)
+        return jsonify({"status": "error", "message": "Forbidden source"}), 403
+    if api_key and not _has_unifi_api_key_access(request_obj, api_key):
+        logger.warning("Rejected UniFi webhook request due to invalid API key")
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+    return None
+
+
 def _load_unifi_api_key() -> str | None:
     configured_secret = get_secret("UNIFI_PROTECT_API_KEY")
     if configured_secret:
@@ -173,6 +215,28 @@ def _extract_event_time(payload: dict) -> str | None:
             return candidate.strip()
     return None
 
+
+def _queue_depth() -> int:
+    return max(0, int(os.getenv("ACTION_QUEUE_DEPTH", "2")))
+
+
+def _job_slots() -> int:
+    """Concurrent non-safety jobs per worker.
+
+    Queued jobs hold a Gunicorn thread while they wait, so the default leaves
+    room for the queue plus one thread kept free for stops.
+    """
+    configured = os.getenv("ACTION_JOB_SLOTS", "").strip()
+    if configured:
+        return max(1, int(configured))
+    return max(1, int(os.getenv("GUNICORN_THREADS", "6")) - _queue_depth() - 1)
+
+
+def _cancel_file() -> str:
+    """Shared by every Gunicorn worker in the container, so a stop on one cancels jobs on all."""
+    return os.getenv("ACTION_CANCEL_FILE", os.path.join(tempfile.gettempdir(), "farmbot-action-cancel"))
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
 
@@ -180,7 +244,16 @@ def create_app() -> Flask:
     logging.basicConfig(level=log_level)
     logger = logging.getLogger("farmbot-web")
 
-    runner = ActionRunner(build_default_actions(), logger=logger)
+    runner = ActionRunner(
+        build_default_actions(),
+        logger=logger,
+        max_batch_steps=int(os.getenv("BATCH_MAX_STEPS", "25")),
+        job_slots=_job_slots(),
+        queue_depth=_queue_depth(),
+        queue_wait_seconds=float(os.getenv("ACTION_QUEUE_WAIT_SECONDS", "30")),
+        safety_timeout=float(os.getenv("SAFETY_TIMEOUT_SECONDS", "10")),
+        cancel_signal=CancelSignal(_cancel_file()),
+    )
     target_camera_name = os.getenv("UNIFI_MOTION_CAMERA_NAME", "G4 Pro")
     require_camera_match = _coerce_bool(os.getenv("UNIFI_MOTION_REQUIRE_CAMERA", "true"))
     require_motion_flag = _coerce_bool(os.getenv("UNIFI_MOTION_REQUIRE_MOTION", "true"))
@@ -194,35 +267,100 @@ def create_app() -> Flask:
     trigger_timeout = int(os.getenv("UNIFI_MOTION_TRIGGER_TIMEOUT", "60"))
     unifi_api_key = _load_unifi_api_key()
     unifi_protect_host = os.getenv("UNIFI_PROTECT_HOST", "192.168.1.59").strip()
+    unifi_relay_hosts = [h.strip() for h in os.getenv("UNIFI_RELAY_HOSTS", "").split(",") if h.strip()]
     discord_unifi_webhook = _load_discord_unifi_webhook()
 
+    @app.before_request
+    def stamp_receipt() -> None:
+        g.received_at = time.perf_counter()
+
     @app.get("/health")
     def health() -> tuple:
         return jsonify({"status": "ok"}), 200
 
-    @app.post("/trigger/<action_name>")
-    def trigger_action(action_name: str) -> tuple:
+    @app.post("/trigger/batch")
+    def trigger_batch() -> tuple:
         payload = request.get_json(silent=True) or {}
+        stop_on_error = _coerce_bool(payload.get("stop_on_error", True))
+        try:
+            result = runner.run_batch(payload.get("steps"), stop_on_error=stop_on_error is not False)
+        except RunnerBusy as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 503
+        except ActionCancelled as exc:
+            return jsonify({"status": "cancelled", "message": str(exc)}), 409
+        except KeyError as exc:
+            return jsonify({"status": "error", "message": f"Unknown action: {exc.args[0]}"}), 400
+        except ValueError as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 400
+        status_code = 200 if result["status"] == "ok" else 500
+        return jsonify(result), status_code
+
+    def _dispatch(action_name: str, payload: dict) -> tuple:
+        if action_name in runner.safety_actions:
+            try:
+                result = runner.run_safety(action_name, payload, received_at=g.received_at)
+            except KeyError:
+                return jsonify({"status": "error", "message": f"Unknown action: {action_name}"}), 404
+            except TimeoutError as exc:
+                return jsonify({"status": "error", "message": str(exc)}), 504
+            except Exception as exc:  # pragma: no cover - defensive handler for runtime integrations
+                logger.exception("Failed to execute safety action '%s'", action_name)
+                return jsonify({"status": "error", "message": str(exc)}), 500
+            return jsonify({"status": "ok", "action": action_name, **result}), 200
+
         try:
             result = runner.run(action_name, payload)
             return jsonify({"status": "ok", "action": action_name, "result": result}), 200
         except KeyError:
             return jsonify({"status": "error", "message": f"Unknown action: {action_name}"}), 404
+        except RunnerBusy as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 503
+        except ActionCancelled as exc:
+            return jsonify({"status": "cancelled", "action": action_name, "message": str(exc)}), 409
         except Exception as exc:  # pragma: no cover - defensive handler for runtime integrations
             logger.exception("Failed to execute action '%s'", action_name)
             return jsonify({"status": "error", "message": str(exc)}), 500
 
+    @app.post("/trigger/<action_name>")
+    def trigger_action(action_name: str) -> tuple:
+        return _dispatch(action_name, request.get_json(silent=True) or {})
+
     @app.get("/trigger/<action_name>")
     def trigger_action_get(action_name: str) -> tuple:
+        return _dispatch(action_name, dict(request.args))
+
+    @app.post("/estop")
+    def estop() -> tuple:
+        return _dispatch("emergency_stop", request.get_json(silent=True) or {})
+
+    @app.get("/safety/latency")
+    def safety_latency() -> tuple:
+        return jsonify({"safety_actions": sorted(runner.safety_actions), **runner.safety_latency.snapshot()}), 200
+
+    @app.get("/trigger/<action_name>/stream")
+    def trigger_action_stream(action_name: str):
         payload = dict(request.args)
         try:
-            result = runner.run(action_name, payload)
-            return jsonify({"status": "ok", "action": action_name, "result": result}), 200
+            events = runner.stream(action_name, payload)
         except KeyError:
             return jsonify({"status": "error", "message": f"Unknown action: {action_name}"}), 404
-        except Exception as exc:  # pragma: no cover - defensive handler for runtime integrations
-            logger.exception("Failed to execute action '%s'", action_name)
-            return jsonify({"status": "error", "message": str(exc)}), 500
+        except RunnerBusy as exc:
+            return jsonify({"status": "error", "message": str(exc)}), 503
+        except ActionCancelled as exc:
+            return jsonify({"status": "cancelled", "action": action_name, "message": str(exc)}), 409
+
+        def generate():
+            for event in events:
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     @app.get("/actions")
     def list_actions() -> tuple:
@@ -231,13 +369,9 @@ def create_app() -> Flask:
     @app.post("/webhooks/unifi-protect-motion")
     def unifi_protect_motion() -> tuple:
         payload = request.get_json(silent=True) or {}
-        if not _request_origin_matches_unifi_host(request, unifi_protect_host):
-            logger.warning("Rejected UniFi webhook request from unexpected host: %s", request.remote_addr)
-            return jsonify({"status": "error", "message": "Forbidden source"}), 403
-
-        if unifi_api_key and not _has_unifi_api_key_access(request, unifi_api_key):
-            logger.warning("Rejected UniFi webhook request due to invalid API key")
-            return jsonify({"status": "error", "message": "Unauthorized"}), 401
+        denied = _reject_unifi_webhook(request, unifi_protect_host, unifi_api_key, unifi_relay_hosts)
+        if denied:
+            return denied
 
         camera_name = _extract_camera_name(payload)
         motion_detected = _extract_motion_detected(payload)
@@ -299,13 +433,9 @@ def create_app() -> Flask:
     @app.post("/webhooks/unifi-protect-discord")
     def unifi_protect_discord() -> tuple:
         payload = request.get_json(silent=True) or {}
-        if not _request_origin_matches_unifi_host(request, unifi_protect_host):
-            logger.warning("Rejected UniFi webhook request from unexpected host: %s", request.remote_addr)
-            return jsonify({"status": "error", "message": "Forbidden source"}), 403
-
-        if unifi_api_key and not _has_unifi_api_key_access(request, unifi_api_key):
-            logger.warning("Rejected UniFi webhook request due to invalid API key")
-            return jsonify({"status": "error", "message": "Unauthorized"}), 401
+        denied = _reject_unifi_webhook(request, unifi_protect_host, unifi_api_key, unifi_relay_hosts)
+        if denied:
+            return denied
 
         if not discord_unifi_webhook:
             return jsonify({"status": "error", "message": "Discord webhook not configured"}), 500
@@ -1,34 +1,466 @@
 from __future__ import annotations
 
-import json
+import contextvars
+import itertools
 import logging
 import os
+import queue
+import threading
 import time
-from dataclasses import dataclass
-from typing import Any, Callable, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, Iterator
 
 import requests
 from farmbot import Farmbot
 
+from farmbot_token import FarmbotTokenManager
 from secret_loader import get_secret
 
 ActionCallable = Callable[[dict[str, Any]], dict[str, Any]]
 
+DISCORD_MESSAGE_LIMIT = 2000
+
+# Actions that bypass job slots and preempt whatever else is running on the bot.
+SAFETY_ACTIONS = frozenset({"emergency_stop", "rotary_stop", "vacuum_off", "water_off"})
+
+# Pins switched off by `emergency_stop`, when configured.
+SAFETY_PIN_ENVS = ("WATER_PIN", "VACUUM_PIN", "ROTARY_FWD_PIN", "ROTARY_REV_PIN", "IRRIGATION_PIN")
+
+
+class ActionCancelled(RuntimeError):
+    """Raised inside an action that was preempted by a safety action."""
+
+
+class RunnerBusy(RuntimeError):
+    """Raised when no job slot frees up in time; the reserved capacity is kept for safety actions."""
+
+
+class CancelSignal:
+    """Preemption shared between Gunicorn workers: a file holding the time of the last safety stop.
+
+    A stop that lands on one worker must also cancel jobs running in the
+    others, so every job compares its start time against this file at each step.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def raise_signal(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as handle:
+            handle.write(str(time.time_ns()))
+        os.replace(tmp, self.path)
+
+    def raised_since(self, started_ns: int) -> bool:
+        try:
+            with open(self.path) as handle:
+                return int(handle.read().strip() or 0) >= started_ns
+        except (OSError, ValueError):
+            return False
+
+
+@dataclass
+class ActionSession:
+    """State shared by every action run inside one request (e.g. a batch).
+
+    When a session is active, its actions reuse one Farmbot client (parallel
+    batch branches each get their own) and, if `digest` is set, notifications
+    are collected instead of posted one by one.
+    `on_step` receives every progress message the action reports, and setting
+    `cancelled` makes the action stop at its next step.
+    """
+
+    client: Farmbot | None = None
+    digest: dict[str, list[str]] | None = None
+    on_step: Callable[[str], None] | None = None
+    cancelled: threading.Event = field(default_factory=threading.Event, repr=False)
+    cancel_signal: CancelSignal | None = field(default=None, repr=False)
+    started_ns: int = field(default_factory=time.time_ns, repr=False)
+    first_command_at: float | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def is_cancelled(self) -> bool:
+        if self.cancelled.is_set():
+            return True
+        if self.cancel_signal is not None and self.cancel_signal.raised_since(self.started_ns):
+            self.cancelled.set()
+            return True
+        return False
+
+    def record(self, channel: str, text: str) -> bool:
+        if self.digest is None:
+            return False
+        with self._lock:
+            self.digest.setdefault(channel, []).append(text)
+        return True
+
+    def flush_digest(self) -> None:
+        if not self.digest:
+            return
+        with self._lock:
+            teams = list(self.digest.get("teams", []))
+            discord = list(self.digest.get("discord", []))
+            self.digest.clear()
+        if teams:
+            _post_webhook(os.getenv("TEAMS_WEBHOOK_URL"), {"text": "\n".join(teams)})
+        if discord:
+            webhook = get_secret("DISCORD_WEBHOOK_URL")
+            for chunk in _chunk_lines(discord, DISCORD_MESSAGE_LIMIT):
+                _post_webhook(webhook, {"content": chunk})
+
+
+class LatencyTracker:
+    """Keeps recent latency samples (ms) plus the worst case seen since startup."""
+
+    def __init__(self, size: int = 500):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._worst = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, value_ms: float) -> None:
+        with self._lock:
+            self._samples.append(value_ms)
+            self._worst = max(self._worst, value_ms)
+            self._count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            if not self._samples:
+                return {"count": 0}
+            samples = sorted(self._samples)
+            last, count, worst = self._samples[-1], self._count, self._worst
+
+        def pct(q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+        return {
+            "count": count,
+            "last_ms": last,
+            "p50_ms": pct(0.5),
+            "p99_ms": pct(0.99),
+            "max_ms": worst,
+        }
+
+
+_token_manager = FarmbotTokenManager()
+
+_SESSION: contextvars.ContextVar[ActionSession | None] = contextvars.ContextVar(
+    "farmbot_action_session", default=None
+)
+
 
 @dataclass
 class ActionRunner:
     actions: Dict[str, ActionCallable]
     logger: logging.Logger
+    max_batch_steps: int = 25
+    job_slots: int | None = None
+    queue_depth: int = 2
+    queue_wait_seconds: float = 30.0
+    safety_actions: frozenset[str] = SAFETY_ACTIONS
+    safety_timeout: float = 10.0
+    cancel_signal: CancelSignal | None = None
+    safety_latency: LatencyTracker = field(default_factory=LatencyTracker)
+    _jobs: dict[int, ActionSession] = field(default_factory=dict, init=False, repr=False)
+    _jobs_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _slots: threading.BoundedSemaphore | None = field(default=None, init=False, repr=False)
+    _waiting: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.job_slots:
+            self._slots = threading.BoundedSemaphore(self.job_slots)
 
     def run(self, action_name: str, payload: dict[str, Any]) -> dict[str, Any]:
         if action_name not in self.actions:
             raise KeyError(action_name)
         self.logger.info("Running action '%s' with payload=%s", action_name, payload)
-        return self.actions[action_name](payload)
+        if _SESSION.get() is not None:
+            return self.actions[action_name](payload)
+
+        session = ActionSession(cancel_signal=self.cancel_signal)
+        self._start_job(session)
+        token = _SESSION.set(session)
+        try:
+            return self.actions[action_name](payload)
+        finally:
+            _SESSION.reset(token)
+            self._finish_job(session)
 
     def available_actions(self) -> set[str]:
         return set(self.actions)
 
+    def run_safety(
+        self, action_name: str, payload: dict[str, Any], received_at: float | None = None
+    ) -> dict[str, Any]:
+        """Run a safety action immediately, preempting every running job.
+
+        Safety actions take no job slot, and their notifications are posted in the
+        background after the device commands went out. They use their own client
+        built from the cached token, so they never wait for a token refresh, and
+        give up with `TimeoutError` after `safety_timeout` seconds. Latency is
+        measured from `received_at` (a `time.perf_counter()` value taken on HTTP
+        receipt) to the first device command.
+        """
+        if action_name not in self.safety_actions or action_name not in self.actions:
+            raise KeyError(action_name)
+        received_at = received_at if received_at is not None else time.perf_counter()
+
+        preempted = self.cancel_running()
+        session = ActionSession(digest={}, client=_new_safety_client())
+        outcome: dict[str, Any] = {}
+
+        def act() -> None:
+            _SESSION.set(session)
+            try:
+                outcome["result"] = self.actions[action_name](payload)
+            except Exception as exc:
+                outcome["error"] = exc
+            finally:
+                threading.Thread(target=self._flush_quietly, args=(session,), daemon=True).start()
+
+        worker = threading.Thread(
+            target=contextvars.Context().run, args=(act,), name=f"safety-{action_name}", daemon=True
+        )
+        worker.start()
+        worker.join(self.safety_timeout)
+        if worker.is_alive():
+            self.logger.error("Safety action '%s' still running after %ss", action_name, self.safety_timeout)
+            raise TimeoutError(f"Safety action '{action_name}' did not finish within {self.safety_timeout:g}s")
+        if "error" in outcome:
+            raise outcome["error"]
+        result = outcome["result"]
+
+        command_at = session.first_command_at or time.perf_counter()
+        command_ms = round((command_at - received_at) * 1000, 1)
+        self.safety_latency.record(command_ms)
+        self.logger.warning(
+            "Safety action '%s' sent first command after %sms (preempted %s jobs)",
+            action_name,
+            command_ms,
+            preempted,
+        )
+        return {
+            "result": result,
+            "preempted_jobs": preempted,
+            "latency": {"command_ms": command_ms, "total_ms": _elapsed_ms(received_at)},
+        }
+
+    def cancel_running(self) -> int:
+        """Cancel every job on the bot; returns how many were running in this worker."""
+        if self.cancel_signal is not None:
+            self.cancel_signal.raise_signal()
+        with self._jobs_lock:
+            sessions = list(self._jobs.values())
+        for session in sessions:
+            session.cancelled.set()
+        return len(sessions)
+
+    def _start_job(self, session: ActionSession) -> None:
+        """Take a job slot, waiting up to `queue_wait_seconds` behind at most `queue_depth` others.
+
+        Queued jobs are registered first, so a safety stop cancels them too.
+        """
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            with self._jobs_lock:
+                if self._waiting >= self.queue_depth:
+                    raise RunnerBusy("All action slots are busy; try again shortly")
+                self._waiting += 1
+                self._jobs[id(session)] = session
+            admitted = False
+            try:
+                admitted = self._slots.acquire(timeout=self.queue_wait_seconds)
+            finally:
+                with self._jobs_lock:
+                    self._waiting -= 1
+                    if not admitted:
+                        self._jobs.pop(id(session), None)
+            if not admitted:
+                raise RunnerBusy(f"No action slot freed up within {self.queue_wait_seconds:g}s; try again shortly")
+            if session.is_cancelled():
+                self._finish_job(session)
+                raise ActionCancelled("Action preempted by a safety stop while queued")
+        with self._jobs_lock:
+            self._jobs[id(session)] = session
+
+    def _finish_job(self, session: ActionSession) -> None:
+        with self._jobs_lock:
+            self._jobs.pop(id(session), None)
+        if self._slots is not None:
+            self._slots.release()
+
+    def _flush_quietly(self, session: ActionSession) -> None:
+        try:
+            session.flush_digest()
+        except Exception:  # pragma: no cover - notification failures never fail an action
+            self.logger.exception("Failed to post notification digest")
+
+    def stream(
+        self, action_name: str, payload: dict[str, Any], heartbeat_seconds: float = 15.0
+    ) -> Iterator[dict[str, Any] | None]:
+        """Start `action_name` in the background and yield its progress events.
+
+        Yields `{"event": "step" | "result" | "error", "data": {...}}` dicts as the
+        action reports progress, and `None` whenever `heartbeat_seconds` pass
+        without an event so callers can keep the connection alive.
+        """
+        if action_name not in self.actions:
+            raise KeyError(action_name)
+
+        events: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        started = time.perf_counter()
+        counter = itertools.count(1)
+
+        def on_step(message: str) -> None:
+            events.put(
+                {
+                    "event": "step",
+                    "data": {"seq": next(counter), "message": message, "elapsed_ms": _elapsed_ms(started)},
+                }
+            )
+
+        session = ActionSession(on_step=on_step, cancel_signal=self.cancel_signal)
+        self._start_job(session)
+
+        def worker() -> None:
+            token = _SESSION.set(session)
+            try:
+                result = self.run(action_name, payload)
+                events.put({"event": "result", "data": {"status": "ok", "action": action_name, "result": result}})
+            except Exception as exc:
+                self.logger.exception("Failed to execute action '%s'", action_name)
+                events.put({"event": "error", "data": {"status": "error", "message": str(exc)}})
+            finally:
+                _SESSION.reset(token)
+                self._finish_job(session)
+                events.put(None)
+
+        threading.Thread(target=worker, name=f"stream-{action_name}", daemon=True).start()
+        return self._drain(events, heartbeat_seconds, started)
+
+    @staticmethod
+    def _drain(
+        events: queue.Queue[dict[str, Any] | None], heartbeat_seconds: float, started: float
+    ) -> Iterator[dict[str, Any] | None]:
+        while True:
+            try:
+                event = events.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield None
+                continue
+            if event is None:
+                return
+            if event["event"] != "step":
+                event["data"]["elapsed_ms"] = _elapsed_ms(started)
+            yield event
+
+    def run_batch(self, steps: list[Any], stop_on_error: bool = True) -> dict[str, Any]:
+        """Run `steps` in order with one shared Farmbot client and one notification digest.
+
+        Each step is either `{"action": name, "payload": {...}}` or
+        `{"parallel": [step, ...]}`; a parallel group runs its steps concurrently
+        and counts as failed if any of them fails.
+        """
+        self._validate_batch(steps)
+
+        session = ActionSession(digest={}, cancel_signal=self.cancel_signal)
+        self._start_job(session)
+        token = _SESSION.set(session)
+        started = time.perf_counter()
+        results: list[dict[str, Any]] = []
+        failed = False
+        try:
+            for index, step in enumerate(steps):
+                if failed and stop_on_error:
+                    results.append({"index": index, "status": "skipped"})
+                    continue
+                if "parallel" in step:
+                    result = self._run_parallel(step["parallel"])
+                else:
+                    result = self._run_step(step)
+                result["index"] = index
+                results.append(result)
+                failed = failed or result["status"] == "error"
+
+            summary = f"Batch finished: {len(steps)} steps, {'errors' if failed else 'all ok'}"
+            session.record("teams", summary)
+            session.record("discord", summary)
+        finally:
+            _SESSION.reset(token)
+            self._finish_job(session)
+            self._flush_quietly(session)
+
+        return {
+            "status": "error" if failed else "ok",
+            "steps": results,
+            "elapsed_ms": _elapsed_ms(started),
+        }
+
+    def _validate_batch(self, steps: Any) -> None:
+        if not isinstance(steps, list) or not steps:
+            raise ValueError("Batch requires a non-empty 'steps' list")
+
+        count = 0
+        for step in steps:
+            group = step.get("parallel") if isinstance(step, dict) else None
+            if group is not None:
+                if not isinstance(group, list) or not group:
+                    raise ValueError("'parallel' must be a non-empty list of steps")
+            for item in group if group is not None else [step]:
+                if not isinstance(item, dict) or not isinstance(item.get("action"), str):
+                    raise ValueError("Each step needs an 'action' name")
+                if not isinstance(item.get("payload", {}), dict):
+                    raise ValueError(f"Payload for '{item['action']}' must be an object")
+                if item["action"] not in self.actions:
+                    raise KeyError(item["action"])
+                count += 1
+
+        if count > self.max_batch_steps:
+            raise ValueError(f"Batch exceeds {self.max_batch_steps} steps")
+
+    def _run_step(self, step: dict[str, Any]) -> dict[str, Any]:
+        action_name = step["action"]
+        started = time.perf_counter()
+        try:
+            result = self.run(action_name, dict(step.get("payload") or {}))
+        except Exception as exc:
+            self.logger.exception("Batch step '%s' failed", action_name)
+            return {
+                "action": action_name,
+                "status": "error",
+                "message": str(exc),
+                "elapsed_ms": _elapsed_ms(started),
+            }
+        return {
+            "action": action_name,
+            "status": "ok",
+            "result": result,
+            "elapsed_ms": _elapsed_ms(started),
+        }
+
+    def _run_branch(self, session: ActionSession, step: dict[str, Any]) -> dict[str, Any]:
+        _SESSION.set(session)
+        return self._run_step(step)
+
+    def _run_parallel(self, group: list[dict[str, Any]]) -> dict[str, Any]:
+        started = time.perf_counter()
+        session = _SESSION.get()
+        with ThreadPoolExecutor(max_workers=len(group)) as pool:
+            # Each branch shares the session's digest and cancel flag but builds its own
+            # client: a Farmbot broker must not be driven from two threads at once.
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._run_branch, replace(session, client=None), step)
+                for step in group
+            ]
+            results = [future.result() for future in futures]
+        return {
+            "parallel": results,
+            "status": "error" if any(r["status"] == "error" for r in results) else "ok",
+            "elapsed_ms": _elapsed_ms(started),
+        }
+
 
 def build_default_actions() -> Dict[str, ActionCallable]:
     return {
@@ -42,6 +474,8 @@ def build_default_actions() -> Dict[str, ActionCallable]:
         "rotary_forward": rotary_forward,
         "rotary_reverse": rotary_reverse,
         "rotary_stop": rotary_stop,
+        "water_off": water_off,
+        "emergency_stop": emergency_stop,
         "demo_move_home": demo_move_home,
         "demo_the_bot": demo_the_bot,
         "exercise_the_farmbot": exercise_the_farmbot,
@@ -49,42 +483,95 @@ def build_default_actions() -> Dict[str, ActionCallable]:
     }
 
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _chunk_lines(lines: list[str], limit: int) -> list[str]:
+    chunks: list[str] = []
+    current = ""
+    for line in lines:
+        line = line[:limit]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
 def _post_webhook(url: str, payload: dict[str, Any]) -> None:
     if not url:
         return
     requests.post(url, json=payload, timeout=10).raise_for_status()
 
 
+def _check_cancelled() -> None:
+    """Raise if the job was preempted. Only called at step boundaries (`_report_step`),
+    never from device commands, so `finally` blocks can still switch outputs off."""
+    session = _SESSION.get()
+    if session is not None and session.is_cancelled():
+        raise ActionCancelled("Action preempted by a safety stop")
+
+
+def _mark_device_command() -> None:
+    session = _SESSION.get()
+    if session is not None and session.first_command_at is None:
+        session.first_command_at = time.perf_counter()
+
+
+def _report_step(text: str) -> None:
+    _check_cancelled()
+    session = _SESSION.get()
+    if session is not None and session.on_step is not None:
+        session.on_step(text)
+
+
 def _send_teams_message(text: str) -> None:
+    session = _SESSION.get()
+    if session is not None and session.record("teams", text):
+        return
     webhook = os.getenv("TEAMS_WEBHOOK_URL")
     _post_webhook(webhook, {"text": text})
 
 
 def _send_discord_message(text: str) -> None:
+    _report_step(text)
+    session = _SESSION.get()
+    if session is not None and session.record("discord", text):
+        return
     webhook = get_secret("DISCORD_WEBHOOK_URL")
     _post_webhook(webhook, {"content": text})
 
 
 def _mock_farmbot_step(message: str, seconds: float = 0.2) -> None:
     logging.getLogger("farmbot-web").info(message)
+    _report_step(message)
     time.sleep(seconds)
 
 
 def _load_farmbot_token() -> dict[str, Any]:
-    token_json = get_secret("FARMBOT_TOKEN_JSON")
-    if not token_json:
-        raise RuntimeError("Missing FARMBOT_TOKEN_JSON (or FARMBOT_TOKEN_JSON_FILE)")
-    try:
-        return json.loads(token_json)
-    except json.JSONDecodeError as exc:
-        raise RuntimeError("Invalid FARMBOT_TOKEN_JSON contents") from exc
+    return _token_manager.token()
+
+
+def _new_farmbot_client() -> Farmbot:
+    return _token_manager.client()
+
+
+def _new_safety_client() -> Farmbot:
+    return _token_manager.client(_token_manager.cached_token())
 
 
 def _get_farmbot_client() -> Farmbot:
-    token = _load_farmbot_token()
-    fb = Farmbot()
-    fb.set_token(token)
-    return fb
+    session = _SESSION.get()
+    if session is None:
+        return _new_farmbot_client()
+    with session._lock:
+        if session.client is None:
+            session.client = _new_farmbot_client()
+        return session.client
 
 
 def _pin_from_env(name: str) -> int:
@@ -95,6 +582,7 @@ def _pin_from_env(name: str) -> int:
 
 
 def _toggle_pin(fb: Farmbot, pin: int, value: int) -> dict[str, Any]:
+    _mark_device_command()
     if value:
         fb.on(pin)
     else:
@@ -103,6 +591,15 @@ def _toggle_pin(fb: Farmbot, pin: int, value: int) -> dict[str, Any]:
     return {"pin": pin, "readback": readback, "verified": bool(readback == value)}
 
 
+def _switch_off(fb: Farmbot, pin: int) -> dict[str, Any]:
+    """Cleanup for `finally` blocks: never raises, so the original error (or cancel) wins."""
+    try:
+        return _toggle_pin(fb, pin, 0)
+    except Exception as exc:
+        logging.getLogger("farmbot-web").exception("Failed to switch pin %s off", pin)
+        return {"pin": pin, "error": str(exc), "verified": False}
+
+
 def water_the_rock(payload: dict[str, Any]) -> dict[str, Any]:
     x = payload.get("x", 200)
     y = payload.get("y", 200)
@@ -117,9 +614,11 @@ def water_the_rock(payload: dict[str, Any]) -> dict[str, Any]:
     water_pin = _pin_from_env("WATER_PIN")
     lights_state = _toggle_pin(fb, lights_pin, 1)
     _mock_farmbot_step(f"Moving to ({x}, {y}, 0)")
-    water_on = _toggle_pin(fb, water_pin, 1)
-    _mock_farmbot_step(f"Watering for {water_seconds}s")
-    water_off = _toggle_pin(fb, water_pin, 0)
+    try:
+        water_on = _toggle_pin(fb, water_pin, 1)
+        _mock_farmbot_step(f"Watering for {water_seconds}s")
+    finally:
+        water_off = _switch_off(fb, water_pin)
     _mock_farmbot_step("Returning to home (0,0,0)")
 
     return {
@@ -294,6 +793,45 @@ def rotary_stop(payload: dict[str, Any]) -> dict[str, Any]:
     }
 
 
+def water_off(payload: dict[str, Any]) -> dict[str, Any]:
+    zone = payload.get("zone", "default")
+    fb = _get_farmbot_client()
+    pin = _pin_from_env("WATER_PIN")
+    pin_state = _toggle_pin(fb, pin, 0)
+    message = f"Water off (zone={zone})"
+    _send_teams_message(message)
+    _send_discord_message(message)
+    return {
+        "zone": zone,
+        "status": "off",
+        "action": f"pin:{pin}",
+        "readback": pin_state["readback"],
+        "verified": pin_state["verified"],
+    }
+
+
+def emergency_stop(payload: dict[str, Any]) -> dict[str, Any]:
+    fb = _get_farmbot_client()
+    _mark_device_command()
+    fb.e_stop()
+
+    pins_off: dict[str, Any] = {}
+    for name in SAFETY_PIN_ENVS:
+        if not os.getenv(name, "").strip():
+            continue
+        pin = _pin_from_env(name)
+        try:
+            fb.off(pin)
+            pins_off[name] = pin
+        except Exception as exc:  # pragma: no cover - keep switching the remaining pins off
+            pins_off[name] = f"error: {exc}"
+
+    message = "EMERGENCY STOP: device locked, outputs switched off"
+    _send_teams_message(message)
+    _send_discord_message(message)
+    return {"status": "e_stopped", "pins_off": pins_off}
+
+
 def demo_move_home(payload: dict[str, Any]) -> dict[str, Any]:
     x = int(payload.get("x", 400))
     y = int(payload.get("y", 300))
@@ -303,23 +841,24 @@ def demo_move_home(payload: dict[str, Any]) -> dict[str, Any]:
     fb = _get_farmbot_client()
     lights_pin = _pin_from_env("LIGHTS_PIN")
     lights_on = _toggle_pin(fb, lights_pin, 1)
-    _send_discord_message("Demo move: lights on")
-
-    message = f"Demo move: going to ({x}, {y}, {z})"
-    _send_teams_message(message)
-    _send_discord_message(message)
-    fb.move(x=x, y=y, z=z, speed=speed)
-    at_target = fb.get_xyz()
-    _send_discord_message(f"At target: {at_target}")
-
-    message = "Demo move: returning to home (0, 0, 0)"
-    _send_teams_message(message)
-    _send_discord_message(message)
-    fb.move(x=0, y=0, z=0, speed=speed)
-    at_home = fb.get_xyz()
-    _send_discord_message(f"At home: {at_home}")
-
-    lights_off = _toggle_pin(fb, lights_pin, 0)
+    try:
+        _send_discord_message("Demo move: lights on")
+
+        message = f"Demo move: going to ({x}, {y}, {z})"
+        _send_teams_message(message)
+        _send_discord_message(message)
+        fb.move(x=x, y=y, z=z, speed=speed)
+        at_target = fb.get_xyz()
+        _send_discord_message(f"At target: {at_target}")
+
+        message = "Demo move: returning to home (0, 0, 0)"
+        _send_teams_message(message)
+        _send_discord_message(message)
+        fb.move(x=0, y=0, z=0, speed=speed)
+        at_home = fb.get_xyz()
+        _send_discord_message(f"At home: {at_home}")
+    finally:
+        lights_off = _switch_off(fb, lights_pin)
     _send_discord_message("Demo move: lights off")
 
     return {
@@ -338,9 +877,11 @@ def demo_the_bot(payload: dict[str, Any]) -> dict[str, Any]:
     fb = _get_farmbot_client()
     lights_pin = _pin_from_env("LIGHTS_PIN")
     lights_on = _toggle_pin(fb, lights_pin, 1)
-    _send_discord_message("Demo: lights on")
-    _mock_farmbot_step("Performing demo sequence")
-    lights_off = _toggle_pin(fb, lights_pin, 0)
+    try:
+        _send_discord_message("Demo: lights on")
+        _mock_farmbot_step("Performing demo sequence")
+    finally:
+        lights_off = _switch_off(fb, lights_pin)
     _send_discord_message("Demo: lights off")
     return {"message": "demo sequence complete", "lights_on": lights_on, "lights_off": lights_off}
 
@@ -362,7 +903,9 @@ def yard_irrigation(payload: dict[str, Any]) -> dict[str, Any]:
     _send_discord_message(message)
     fb = _get_farmbot_client()
     irrigation_pin = _pin_from_env("IRRIGATION_PIN")
-    irrigation_on = _toggle_pin(fb, irrigation_pin, 1)
-    _mock_farmbot_step("Closing solenoid")
-    irrigation_off = _toggle_pin(fb, irrigation_pin, 0)
+    try:
+        irrigation_on = _toggle_pin(fb, irrigation_pin, 1)
+        _mock_farmbot_step("Closing solenoid")
+    finally:
+        irrigation_off = _switch_off(fb, irrigation_pin)
     return {"minutes": minutes, "irrigation_on": irrigation_on, "irrigation_off": irrigation_off}
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import requests
+from farmbot import Farmbot
+
+from secret_loader import get_secret
+
+logger = logging.getLogger("farmbot-web")
+
+
+def parse_token(token_json: str) -> dict[str, Any]:
+    try:
+        token = json.loads(token_json)
+    except json.JSONDecodeError as exc:
+        raise RuntimeError("Invalid FARMBOT_TOKEN_JSON contents") from exc
+    if not isinstance(token, dict) or not isinstance(token.get("token"), dict):
+        raise RuntimeError("Invalid FARMBOT_TOKEN_JSON contents")
+    return token
+
+
+def token_claims(token: dict[str, Any]) -> dict[str, Any]:
+    """Return the token's claims, decoding the JWT payload when `unencoded` is missing."""
+    inner = token.get("token") or {}
+    unencoded = inner.get("unencoded")
+    if isinstance(unencoded, dict):
+        return unencoded
+
+    encoded = inner.get("encoded")
+    if not isinstance(encoded, str) or encoded.count(".") != 2:
+        return {}
+    segment = encoded.split(".")[1]
+    try:
+        decoded = base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+        claims = json.loads(decoded)
+    except (ValueError, json.JSONDecodeError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def token_expiry(token: dict[str, Any]) -> float | None:
+    exp = token_claims(token).get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def token_server(token: dict[str, Any]) -> str:
+    """Resolve the FarmBot web app URL from `FARMBOT_SERVER` or the token issuer."""
+    configured = os.getenv("FARMBOT_SERVER", "").strip()
+    if configured:
+        return configured.rstrip("/")
+
+    issuer = str(token_claims(token).get("iss") or "//my.farm.bot").strip()
+    if issuer.startswith("http://") or issuer.startswith("https://"):
+        return issuer.rstrip("/")
+    host = issuer.lstrip("/").rstrip("/")
+    port = host.rsplit(":", 1)[1] if ":" in host else "443"
+    scheme = "https" if port == "443" else "http"
+    return f"{scheme}://{host}"
+
+
+class FarmbotTokenManager:
+    """Caches the FarmBot token and refreshes it before it expires.
+
+    The token is parsed once from `FARMBOT_TOKEN_JSON` (re-read only when the
+    secret changes) and refreshed through `GET /api/tokens` once it is within
+    `refresh_margin_seconds` of expiry. If that fails and `FARMBOT_EMAIL` /
+    `FARMBOT_PASSWORD` are configured, a new token is requested with them.
+
+    Refreshes are single-flight and run outside the lock: while one thread
+    talks to the web app, other callers get the current token as long as it
+    is still valid, and only wait when it has already expired. Every `client()`
+    call returns a new Farmbot, because its MQTT broker and state are not safe
+    to share between threads; only the token is shared.
+    """
+
+    def __init__(
+        self,
+        refresh_margin_seconds: float | None = None,
+        retry_seconds: float = 60.0,
+        timeout: float = 10.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if refresh_margin_seconds is None:
+            refresh_margin_seconds = float(os.getenv("FARMBOT_TOKEN_REFRESH_MARGIN", "3600"))
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self.timeout = timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refreshed = threading.Condition(self._lock)
+        self._refreshing = False
+        self._source: str | None = None
+        self._token: dict[str, Any] | None = None
+        self._next_attempt = 0.0
+
+    def token(self) -> dict[str, Any]:
+        with self._lock:
+            self._load_secret()
+            while self._refreshing:
+                if not self._expired(self._token):
+                    return self._token
+                self._refreshed.wait()
+            if not self._needs_refresh():
+                return self._token
+            self._refreshing = True
+            current = self._token
+        try:
+            fresh, error = self._request_token(token_server(current), current), None
+        except Exception as exc:
+            fresh, error = None, exc
+        with self._lock:
+            self._refreshing = False
+            self._refreshed.notify_all()
+            return self._finish_refresh(current, fresh, error)
+
+    def cached_token(self) -> dict[str, Any]:
+        """The token as it stands, without refreshing; never waits for a refresh in flight."""
+        token = self._token
+        if token is None:
+            with self._lock:
+                self._load_secret()
+                token = self._token
+        return token
+
+    def expires_at(self) -> float | None:
+        with self._lock:
+            return token_expiry(self._token) if self._token else None
+
+    def client(self, token: dict[str, Any] | None = None) -> Farmbot:
+        fb = Farmbot()
+        fb.set_token(token or self.token())
+        return fb
+
+    def _load_secret(self) -> None:
+        source = get_secret("FARMBOT_TOKEN_JSON")
+        if source == self._source and self._token is not None:
+            return
+        if not source:
+            if self._token is not None:
+                return
+            raise RuntimeError("Missing FARMBOT_TOKEN_JSON (or FARMBOT_TOKEN_JSON_FILE)")
+        self._token = parse_token(source)
+        self._source = source
+        self._next_attempt = 0.0
+
+    def _expired(self, token: dict[str, Any]) -> bool:
+        expiry = token_expiry(token)
+        return expiry is not None and expiry <= self._clock()
+
+    def _needs_refresh(self) -> bool:
+        expiry = token_expiry(self._token)
+        if expiry is None:
+            return False
+        now = self._clock()
+        return expiry - now <= self.refresh_margin_seconds and now >= self._next_attempt
+
+    def _finish_refresh(
+        self, current: dict[str, Any], fresh: dict[str, Any] | None, error: Exception | None
+    ) -> dict[str, Any]:
+        if self._token is not current:  # the secret changed while we were refreshing
+            return self._token
+        if fresh is not None:
+            self._token = fresh
+            self._next_attempt = 0.0
+            logger.info("Refreshed FarmBot token; new expiry %s", token_expiry(fresh))
+            return fresh
+        self._next_attempt = self._clock() + self.retry_seconds
+        if self._expired(current):
+            raise RuntimeError(f"FarmBot token expired and refresh failed: {error}") from error
+        logger.warning("FarmBot token refresh failed, keeping current token: %s", error)
+        return current
+
+    def _request_token(self, server: str, current: dict[str, Any]) -> dict[str, Any]:
+        encoded = current["token"].get("encoded")
+        errors = []
+        if encoded:
+            try:
+                response = requests.get(
+                    f"{server}/api/tokens",
+                    headers={"Authorization": f"Bearer {encoded}"},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                return parse_token(response.text)
+            except (requests.RequestException, RuntimeError) as exc:
+                errors.append(str(exc))
+
+        email = get_secret("FARMBOT_EMAIL")
+        password = get_secret("FARMBOT_PASSWORD")
+        if email and password:
+            response = requests.post(
+                f"{server}/api/tokens",
+                json={"user": {"email": email, "password": password}},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return parse_token(response.text)
+
+        raise RuntimeError("; ".join(errors) or "no refresh credentials available")
@@ -2,7 +2,7 @@ import os
 
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 workers = int(os.getenv("GUNICORN_WORKERS", "2"))
-threads = int(os.getenv("GUNICORN_THREADS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "6"))
 timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
 accesslog = "-"
 errorlog = "-"
@@ -0,0 +1,100 @@
+import logging
+import sys
+import types
+
+
+class _DummyFarmbot:
+    pass
+
+
+sys.modules.setdefault("farmbot", types.SimpleNamespace(Farmbot=_DummyFarmbot))
+
+from app import create_app
+from farmbot_actions import ActionRunner, _get_farmbot_client, _send_discord_message
+
+
+class _Resp:
+    def raise_for_status(self):
+        return None
+
+
+def _fake_actions(clients):
+    def step_one(payload):
+        clients.append(_get_farmbot_client())
+        _send_discord_message("step one")
+        return {"step": 1}
+
+    def step_two(payload):
+        clients.append(_get_farmbot_client())
+        _send_discord_message("step two")
+        return {"step": 2, "payload": payload}
+
+    def broken(payload):
+        raise RuntimeError("boom")
+
+    return {"step_one": step_one, "step_two": step_two, "broken": broken}
+
+
+def _patch_io(monkeypatch, posts):
+    def fake_post(url, json, timeout):
+        posts.append(json)
+        return _Resp()
+
+    monkeypatch.setenv("DISCORD_WEBHOOK_URL", "https://discord.example/webhook")
+    monkeypatch.setattr("farmbot_actions.requests.post", fake_post)
+    monkeypatch.setattr("farmbot_actions._new_farmbot_client", lambda: object())
+
+
+def test_batch_shares_client_and_digest(monkeypatch):
+    posts, clients = [], []
+    _patch_io(monkeypatch, posts)
+    runner = ActionRunner(_fake_actions(clients), logger=logging.getLogger("test"))
+
+    result = runner.run_batch(
+        [
+            {"action": "step_one"},
+            {"parallel": [{"action": "step_two", "payload": {"a": 1}}, {"action": "step_one"}]},
+            {"action": "step_two"},
+        ]
+    )
+
+    assert result["status"] == "ok"
+    assert result["steps"][1]["parallel"][0]["result"] == {"step": 2, "payload": {"a": 1}}
+    assert all("elapsed_ms" in step for step in result["steps"])
+    # Sequential steps share the batch client; each parallel branch gets its own.
+    assert len(clients) == 4 and clients[0] is clients[3]
+    assert len({id(c) for c in clients}) == 3
+    assert len(posts) == 1
+    assert posts[0]["content"].startswith("step one\n")
+
+
+def test_batch_stops_on_error(monkeypatch):
+    posts, clients = [], []
+    _patch_io(monkeypatch, posts)
+    runner = ActionRunner(_fake_actions(clients), logger=logging.getLogger("test"))
+
+    result = runner.run_batch([{"action": "broken"}, {"action": "step_one"}])
+
+    assert result["status"] == "error"
+    assert result["steps"][0]["message"] == "boom"
+    assert result["steps"][1]["status"] == "skipped"
+    assert clients == []
+
+
+def test_batch_continue_on_error(monkeypatch):
+    posts, clients = [], []
+    _patch_io(monkeypatch, posts)
+    runner = ActionRunner(_fake_actions(clients), logger=logging.getLogger("test"))
+
+    result = runner.run_batch([{"action": "broken"}, {"action": "step_one"}], stop_on_error=False)
+
+    assert [step["status"] for step in result["steps"]] == ["error", "ok"]
+
+
+def test_batch_endpoint_rejects_unknown_action():
+    client = create_app().test_client()
+
+    response = client.post("/trigger/batch", json={"steps": [{"action": "nope"}]})
+
+    assert response.status_code == 400
+    assert "nope" in response.get_json()["message"]
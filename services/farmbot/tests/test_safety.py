@@ -0,0 +1,249 @@
+import logging
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+class _DummyFarmbot:
+    pass
+
+
+sys.modules.setdefault("farmbot", types.SimpleNamespace(Farmbot=_DummyFarmbot))
+
+import app as app_module
+from farmbot_actions import (
+    ActionCancelled,
+    ActionRunner,
+    CancelSignal,
+    RunnerBusy,
+    _get_farmbot_client,
+    _mock_farmbot_step,
+    _toggle_pin,
+    water_the_rock,
+)
+
+
+class _FakeBot:
+    def __init__(self):
+        self.commands = []
+        self.hold_on = {}  # pin -> (reached, release): pause `on(pin)` until released
+
+    def on(self, pin):
+        self.commands.append(("on", pin))
+        if pin in self.hold_on:
+            reached, release = self.hold_on[pin]
+            reached.set()
+            release.wait(2)
+
+    def off(self, pin):
+        self.commands.append(("off", pin))
+
+    def read_pin(self, pin, mode):
+        return 0
+
+
+def _actions(started, outcome):
+    def long_job(payload):
+        started.set()
+        try:
+            while True:
+                _mock_farmbot_step("moving", seconds=0.01)
+        except ActionCancelled:
+            outcome["cancelled"] = True
+            raise
+
+    def stop(payload):
+        fb = _get_farmbot_client()
+        return _toggle_pin(fb, 3, 0)
+
+    return {"long_job": long_job, "rotary_stop": stop}
+
+
+@pytest.fixture
+def bot(monkeypatch):
+    fake = _FakeBot()
+    monkeypatch.setattr("farmbot_actions._new_farmbot_client", lambda: fake)
+    monkeypatch.setattr("farmbot_actions._new_safety_client", lambda: fake)
+    monkeypatch.setattr("farmbot_actions.requests.post", lambda *args, **kwargs: None)
+    return fake
+
+
+def test_safety_action_preempts_running_job(bot):
+    started, outcome = threading.Event(), {}
+    runner = ActionRunner(_actions(started, outcome), logger=logging.getLogger("test"))
+    worker = threading.Thread(target=lambda: pytest.raises(ActionCancelled, runner.run, "long_job", {}))
+    worker.start()
+    assert started.wait(2)
+
+    result = runner.run_safety("rotary_stop", {})
+    worker.join(2)
+
+    assert not worker.is_alive()
+    assert outcome["cancelled"] is True
+    assert result["preempted_jobs"] == 1
+    assert bot.commands == [("off", 3)]
+    assert result["latency"]["command_ms"] >= 0
+    assert runner.safety_latency.snapshot()["count"] == 1
+
+
+def test_job_slots_leave_room_for_safety(bot):
+    started, outcome = threading.Event(), {}
+    runner = ActionRunner(
+        _actions(started, outcome), logger=logging.getLogger("test"), job_slots=1, queue_depth=0
+    )
+    worker = threading.Thread(target=lambda: pytest.raises(ActionCancelled, runner.run, "long_job", {}))
+    worker.start()
+    assert started.wait(2)
+
+    with pytest.raises(RunnerBusy):
+        runner.run("long_job", {})
+    runner.run_safety("rotary_stop", {})
+    worker.join(2)
+
+    assert not worker.is_alive()
+
+
+def test_busy_slots_queue_ordinary_triggers_with_a_bound(bot):
+    release = threading.Event()
+    started = []
+
+    def hold(payload):
+        started.append(payload["n"])
+        release.wait(2)
+        return {"n": payload["n"]}
+
+    runner = ActionRunner(
+        {"hold": hold}, logger=logging.getLogger("test"), job_slots=1, queue_depth=1, queue_wait_seconds=2
+    )
+    results = []
+    first = threading.Thread(target=lambda: results.append(runner.run("hold", {"n": 1})))
+    first.start()
+    while not started:
+        time.sleep(0.01)
+    queued = threading.Thread(target=lambda: results.append(runner.run("hold", {"n": 2})))
+    queued.start()
+    while runner._waiting == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(RunnerBusy):
+        runner.run("hold", {"n": 3})  # the queue is full
+    release.set()
+    first.join(2)
+    queued.join(2)
+
+    assert results == [{"n": 1}, {"n": 2}]
+
+
+def test_queued_trigger_gives_up_after_its_wait(bot):
+    holding, release = threading.Event(), threading.Event()
+
+    def hold(payload):
+        holding.set()
+        release.wait(2)
+        return {}
+
+    runner = ActionRunner({"hold": hold}, logger=logging.getLogger("test"), job_slots=1, queue_wait_seconds=0.1)
+    first = threading.Thread(target=runner.run, args=("hold", {}))
+    first.start()
+    assert holding.wait(2)
+
+    with pytest.raises(RunnerBusy, match="within 0.1s"):
+        runner.run("hold", {})
+    release.set()
+    first.join(2)
+
+
+def test_safety_route_reports_latency(monkeypatch, bot):
+    started, outcome = threading.Event(), {}
+    monkeypatch.setattr(app_module, "build_default_actions", lambda: _actions(started, outcome))
+    client = app_module.create_app().test_client()
+
+    response = client.post("/trigger/rotary_stop", json={})
+    stats = client.get("/safety/latency").get_json()
+
+    assert response.status_code == 200
+    assert response.get_json()["latency"]["command_ms"] >= 0
+    assert stats["count"] == 1
+    assert "rotary_stop" in stats["safety_actions"]
+
+
+def test_preempted_watering_still_switches_water_off(monkeypatch, bot):
+    monkeypatch.setenv("LIGHTS_PIN", "7")
+    monkeypatch.setenv("WATER_PIN", "8")
+    monkeypatch.setattr("farmbot_actions.time.sleep", lambda seconds: None)
+    watering, release = threading.Event(), threading.Event()
+    bot.hold_on[8] = (watering, release)
+    actions = {**_actions(threading.Event(), {}), "water_the_rock": water_the_rock}
+    runner = ActionRunner(actions, logger=logging.getLogger("test"))
+    outcome = {}
+
+    def job():
+        try:
+            runner.run("water_the_rock", {})
+        except ActionCancelled:
+            outcome["cancelled"] = True
+
+    worker = threading.Thread(target=job)
+    worker.start()
+    assert watering.wait(2)
+    runner.run_safety("rotary_stop", {})
+    release.set()
+    worker.join(2)
+
+    assert outcome == {"cancelled": True}
+    water = [cmd for cmd in bot.commands if cmd[1] == 8]
+    assert water == [("on", 8), ("off", 8)]
+
+
+
+class _TokenBot:
+    def set_token(self, token):
+        self.token = token
+
+
+def test_safety_client_uses_cached_token_without_refreshing(monkeypatch):
+    import farmbot_actions
+
+    manager = farmbot_actions._token_manager
+    monkeypatch.setattr(manager, "token", lambda: pytest.fail("safety lane must not wait for a refresh"))
+    monkeypatch.setattr(manager, "cached_token", lambda: {"token": {"encoded": "cached"}})
+    monkeypatch.setattr("farmbot_token.Farmbot", _TokenBot)
+
+    assert farmbot_actions._new_safety_client().token == {"token": {"encoded": "cached"}}
+
+
+def test_stuck_safety_action_times_out(bot):
+    release = threading.Event()
+
+    def stuck_stop(payload):
+        release.wait(2)
+        return {}
+
+    runner = ActionRunner({"rotary_stop": stuck_stop}, logger=logging.getLogger("test"), safety_timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        runner.run_safety("rotary_stop", {})
+    release.set()
+
+
+def test_stop_on_one_worker_cancels_jobs_on_another(tmp_path, bot):
+    started, outcome = threading.Event(), {}
+    signal = CancelSignal(str(tmp_path / "cancel"))
+    busy_worker, other_worker = (
+        ActionRunner(_actions(started, outcome), logger=logging.getLogger("test"), cancel_signal=signal)
+        for _ in range(2)
+    )
+    job = threading.Thread(target=lambda: pytest.raises(ActionCancelled, busy_worker.run, "long_job", {}))
+    job.start()
+    assert started.wait(2)
+
+    result = other_worker.run_safety("rotary_stop", {})
+    job.join(2)
+
+    assert not job.is_alive()
+    assert outcome["cancelled"] is True
+    assert result["preempted_jobs"] == 0  # counted per worker
+    assert busy_worker.run("rotary_stop", {})["verified"]  # jobs started after the stop still run
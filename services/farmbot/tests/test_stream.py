@@ -0,0 +1,58 @@
+import logging
+import sys
+import types
+
+
+class _DummyFarmbot:
+    pass
+
+
+sys.modules.setdefault("farmbot", types.SimpleNamespace(Farmbot=_DummyFarmbot))
+
+import app as app_module
+from farmbot_actions import ActionRunner, _mock_farmbot_step, _send_discord_message
+
+
+def _progress_action(payload):
+    _send_discord_message("Demo move: going to (1, 2, 0)")
+    _mock_farmbot_step("At target", seconds=0)
+    return {"done": True}
+
+
+def _failing_action(payload):
+    _mock_farmbot_step("Starting", seconds=0)
+    raise RuntimeError("bot offline")
+
+
+def test_stream_yields_steps_then_result(monkeypatch):
+    monkeypatch.delenv("DISCORD_WEBHOOK_URL", raising=False)
+    monkeypatch.delenv("DISCORD_WEBHOOK_URL_FILE", raising=False)
+    runner = ActionRunner({"demo": _progress_action}, logger=logging.getLogger("test"))
+
+    events = [event for event in runner.stream("demo", {}) if event is not None]
+
+    assert [event["event"] for event in events] == ["step", "step", "result"]
+    assert events[0]["data"]["message"] == "Demo move: going to (1, 2, 0)"
+    assert events[1]["data"]["seq"] == 2
+    assert events[-1]["data"]["result"] == {"done": True}
+
+
+def test_stream_endpoint_reports_errors(monkeypatch):
+    monkeypatch.setattr(app_module, "build_default_actions", lambda: {"fail": _failing_action})
+    client = app_module.create_app().test_client()
+
+    response = client.get("/trigger/fail/stream")
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert "event: step" in body
+    assert "event: error" in body and "bot offline" in body
+
+
+def test_stream_unknown_action_returns_404():
+    client = app_module.create_app().test_client()
+
+    response = client.get("/trigger/not-real/stream")
+
+    assert response.status_code == 404
@@ -0,0 +1,138 @@
+import json
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _DummyFarmbot:
+    def set_token(self, token):
+        self.token = token
+
+
+sys.modules.setdefault("farmbot", types.SimpleNamespace(Farmbot=_DummyFarmbot))
+
+from farmbot_token import FarmbotTokenManager, token_expiry, token_server
+
+
+def _token(encoded, exp, iss="//my.farm.bot:443"):
+    return {"token": {"encoded": encoded, "unencoded": {"exp": exp, "iss": iss}}}
+
+
+@pytest.fixture
+def auth_server():
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.headers.get("Authorization"))
+            time.sleep(self.server.delay)
+            if self.server.fail:
+                self.send_response(500)
+                self.end_headers()
+                return
+            body = json.dumps(_token("fresh", self.server.next_exp)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            return None
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.fail = False
+    server.delay = 0.0
+    server.next_exp = 10_000
+    server.calls = calls
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def _configure(monkeypatch, server, token):
+    monkeypatch.delenv("FARMBOT_TOKEN_JSON_FILE", raising=False)
+    monkeypatch.setenv("FARMBOT_TOKEN_JSON", json.dumps(token))
+    monkeypatch.setenv("FARMBOT_SERVER", f"http://127.0.0.1:{server.server_address[1]}")
+
+
+def test_token_is_cached_while_valid(monkeypatch, auth_server):
+    _configure(monkeypatch, auth_server, _token("old", 5_000))
+    manager = FarmbotTokenManager(refresh_margin_seconds=60, clock=lambda: 1_000)
+
+    first = manager.token()
+    second = manager.token()
+
+    assert first is second
+    assert auth_server.calls == []
+
+
+def test_token_refreshes_ahead_of_expiry_for_new_clients(monkeypatch, auth_server):
+    now = {"value": 1_000}
+    _configure(monkeypatch, auth_server, _token("old", 1_100))
+    monkeypatch.setattr("farmbot_token.Farmbot", _DummyFarmbot)
+    manager = FarmbotTokenManager(refresh_margin_seconds=60, clock=lambda: now["value"])
+
+    client = manager.client()
+    assert client.token["token"]["encoded"] == "old"
+
+    now["value"] = 1_050
+    next_client = manager.client()
+
+    assert next_client is not client  # one client per job; only the token is shared
+    assert next_client.token["token"]["encoded"] == "fresh"
+    assert auth_server.calls == ["Bearer old"]
+    assert manager.expires_at() == 10_000
+
+
+def test_refresh_is_single_flight_and_valid_token_is_served_meanwhile(monkeypatch, auth_server):
+    auth_server.delay = 0.5
+    _configure(monkeypatch, auth_server, _token("old", 1_100))
+    manager = FarmbotTokenManager(refresh_margin_seconds=200, clock=lambda: 1_000)
+    manager.cached_token()  # load the secret
+    refresher = threading.Thread(target=manager.token)
+    refresher.start()
+    while not auth_server.calls:
+        time.sleep(0.01)
+
+    started = time.perf_counter()
+    during = [manager.token()["token"]["encoded"], manager.cached_token()["token"]["encoded"]]
+    waited = time.perf_counter() - started
+    refresher.join(2)
+
+    assert during == ["old", "old"]
+    assert waited < 0.2
+    assert len(auth_server.calls) == 1
+    assert manager.token()["token"]["encoded"] == "fresh"
+
+
+def test_failed_refresh_keeps_valid_token_and_backs_off(monkeypatch, auth_server):
+    auth_server.fail = True
+    _configure(monkeypatch, auth_server, _token("old", 1_100))
+    manager = FarmbotTokenManager(refresh_margin_seconds=200, retry_seconds=30, clock=lambda: 1_000)
+
+    assert manager.token()["token"]["encoded"] == "old"
+    assert manager.token()["token"]["encoded"] == "old"
+    assert len(auth_server.calls) == 1
+
+
+def test_expired_token_with_failed_refresh_raises(monkeypatch, auth_server):
+    auth_server.fail = True
+    _configure(monkeypatch, auth_server, _token("old", 900))
+    manager = FarmbotTokenManager(refresh_margin_seconds=60, clock=lambda: 1_000)
+
+    with pytest.raises(RuntimeError, match="expired"):
+        manager.token()
+
+
+def test_token_server_from_issuer(monkeypatch):
+    monkeypatch.delenv("FARMBOT_SERVER", raising=False)
+
+    assert token_server(_token("x", 1)) == "https://my.farm.bot:443"
+    assert token_server(_token("x", 1, iss="//192.168.1.20:3000")) == "http://192.168.1.20:3000"
+    assert token_expiry(_token("x", 42)) == 42
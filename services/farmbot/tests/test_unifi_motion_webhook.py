@@ -258,3 +258,37 @@ def test_unifi_motion_accepts_expected_forwarded_host(monkeypatch):
 
     assert response.status_code == 200
     assert called["value"] == 1
+
+
+def test_unifi_motion_accepts_keyed_relay_host_only(monkeypatch):
+    called = {"value": 0}
+
+    def fake_get(url, timeout):
+        called["value"] += 1
+        return _Resp()
+
+    monkeypatch.setenv("UNIFI_MOTION_CAMERA_NAME", "G4 Pro")
+    monkeypatch.setenv("UNIFI_PROTECT_HOST", "192.168.1.59")
+    monkeypatch.setenv("UNIFI_PROTECT_API_KEY", "super-secret")
+    monkeypatch.setenv("UNIFI_RELAY_HOSTS", "172.20.0.7")
+    monkeypatch.setattr("app.requests.get", fake_get)
+
+    app = create_app()
+    client = app.test_client()
+
+    def post(remote_addr, key):
+        return client.post(
+            "/webhooks/unifi-protect-motion",
+            json={"camera_name": "G4 Pro", "motion": True},
+            environ_base={"REMOTE_ADDR": remote_addr},
+            headers={"X-API-Key": key},
+        )
+
+    relayed = post("172.20.0.7", "super-secret")
+    relay_wrong_key = post("172.20.0.7", "guess")
+    elsewhere = post("172.20.0.9", "super-secret")
+
+    assert relayed.status_code == 200
+    assert relay_wrong_key.status_code == 401
+    assert elsewhere.status_code == 403
+    assert called["value"] == 1
@@ -1,14 +1,31 @@
 from fastapi import FastAPI, Request, Form, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse, HTMLResponse
 import psutil, socket, time, secrets, jwt, datetime
+from contextlib import asynccontextmanager
+from auth_cache import CodeStore, TokenCache
+from docker_cache import ContainerCache
+from mcp_transport import ToolManifest, mcp_router
+from sampler import Sampler
 
 SECRET = "morepi-secret-key"   # store securely or via env var
 ALGORITHM = "HS256"
 CLIENT_ID = "chatgpt-desktop"
 REDIRECT_URI = "http://localhost:8081/oauth/callback"  # ChatGPT will override
-TOKENS = {}
+CODES = CodeStore(ttl=300, max_codes=1000)     # unexchanged codes expire instead of piling up
+VERIFIED = TokenCache(max_size=256)             # repeat Bearer tokens skip jwt.decode until exp
+BOOT_TIME = psutil.boot_time()
 
-app = FastAPI(title="MorePi MCP Agent (OAuth)")
+sampler = Sampler()
+containers = ContainerCache()
+
+@asynccontextmanager
+async def lifespan(app):
+    if not sampler.is_alive():
+        sampler.start()
+    containers.start()
+    yield
+
+app = FastAPI(title="MorePi MCP Agent (OAuth)", lifespan=lifespan)
 
 def create_token():
     payload = {
@@ -25,7 +42,7 @@ def authorize(response_type: str, client_id: str, redirect_uri: str, state: str)
     # Auto-approve (no login screen)
     token = create_token()
     code = secrets.token_hex(8)
-    TOKENS[code] = token
+    CODES.put(code, token)
     return RedirectResponse(f"{redirect_uri}?code={code}&state={state}")
 
 @app.post("/token")
@@ -35,9 +52,9 @@ async def token(
     client_id: str = Form(...),
     redirect_uri: str = Form(...)
 ):
-    if code not in TOKENS:
+    token = CODES.pop(code)
+    if token is None:
         raise HTTPException(status_code=400, detail="Invalid code")
-    token = TOKENS.pop(code)
     return {
         "access_token": token,
         "token_type": "Bearer",
@@ -52,10 +69,12 @@ async def verify_auth(request: Request, call_next):
     auth = request.headers.get("authorization", "")
     if not auth.startswith("Bearer "):
         return JSONResponse({"error": "Unauthorized"}, status_code=401)
-    try:
-        jwt.decode(auth.split()[1], SECRET, algorithms=[ALGORITHM])
-    except Exception:
-        return JSONResponse({"error": "Invalid or expired token"}, status_code=401)
+    bearer = auth.split()[1]
+    if VERIFIED.get(bearer) is None:
+        try:
+            VERIFIED.put(bearer, jwt.decode(bearer, SECRET, algorithms=[ALGORITHM]))
+        except Exception:
+            return JSONResponse({"error": "Invalid or expired token"}, status_code=401)
     return await call_next(request)
 
 # === Normal endpoints ===
@@ -64,29 +83,60 @@ def schema():
     return {
         "name": "MorePi MCP Agent",
         "version": "1.0",
+        "description": "Provides system and container status to ChatGPT",
         "auth": {"type": "oauth", "client_id": CLIENT_ID},
         "endpoints": {
-            "/info": "Get system information",
-            "/disk": "Get disk usage stats"
+            "/info": "Get system information (CPU/memory over 1s, 1m, 5m)",
+            "/disk": "Get disk usage stats",
+            "/processes": "Get the top processes by CPU and memory",
+            "/containers": "List Docker containers with state and health",
+            "/containers/{name}/stats": "Get CPU, memory and network stats for one container",
+            "/mcp": "MCP streamable HTTP transport (JSON-RPC: initialize, tools/list, tools/call)"
         }
     }
 
+# Served from the background sampler's latest snapshot; no psutil calls per request.
 @app.get("/info")
 def info():
+    snap = sampler.snapshot
     return {
         "hostname": socket.gethostname(),
-        "cpu_percent": psutil.cpu_percent(),
-        "mem_percent": psutil.virtual_memory().percent,
-        "uptime_seconds": time.time() - psutil.boot_time()
+        "cpu_percent": snap["cpu"]["1s"],
+        "mem_percent": snap["mem"]["1s"],
+        "cpu": snap["cpu"],
+        "mem": snap["mem"],
+        "uptime_seconds": time.time() - BOOT_TIME,
+        "sampled_at": snap["ts"]
     }
 
 @app.get("/disk")
 def disk():
-    usage = psutil.disk_usage('/')
-    return {
-        "total_gb": round(usage.total / (1024**3), 2),
-        "used_gb": round(usage.used / (1024**3), 2),
-        "free_gb": round(usage.free / (1024**3), 2),
-        "percent_used": usage.percent
-    }
+    return sampler.snapshot["disk"]
+
+@app.get("/processes")
+def processes():
+    return sampler.snapshot["processes"]
+
+
+# Served from the Docker events/stats cache; requests never call the Docker API.
+@app.get("/containers")
+def list_containers():
+    return containers.inventory()
+
+@app.get("/containers/{name}/stats")
+def container_stats(name: str):
+    stats = containers.container_stats(name)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Unknown container: {name}")
+    return stats
 
+# === MCP transport: the same handlers as tools, manifest built once at startup ===
+tools = ToolManifest()
+tools.add("system_info", "Hostname, uptime and CPU/memory usage over 1s, 1m and 5m", info)
+tools.add("disk_usage", "Disk usage of the root filesystem", disk)
+tools.add("top_processes", "Top processes by CPU and by memory", processes)
+tools.add("list_containers", "Docker containers with state and health", list_containers)
+tools.add("container_stats", "CPU, memory and network stats for one Docker container",
+          container_stats,
+          properties={"name": {"type": "string", "description": "Container name"}}, required=["name"])
+app.include_router(mcp_router(tools))
@@ -0,0 +1,71 @@
+import hashlib, threading, time
+from collections import OrderedDict
+
+
+class CodeStore:
+    """OAuth authorization codes that expire after `ttl` seconds, at most `max_codes` held.
+
+    Codes all live for the same `ttl`, so insertion order is expiry order and
+    expired codes are swept from the front on every write.
+    """
+
+    def __init__(self, ttl=300, max_codes=1000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_codes = max_codes
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.codes = OrderedDict()  # code -> (expires_at, token)
+
+    def put(self, code, token):
+        with self.lock:
+            now = self.clock()
+            while self.codes and (next(iter(self.codes.values()))[0] <= now or len(self.codes) >= self.max_codes):
+                self.codes.popitem(last=False)
+            self.codes[code] = (now + self.ttl, token)
+
+    def pop(self, code):
+        """Return the code's token once; None when unknown, already used or expired."""
+        with self.lock:
+            expires_at, token = self.codes.pop(code, (0, None))
+        return token if expires_at > self.clock() else None
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class TokenCache:
+    """LRU of already-verified tokens, keyed by SHA-256 of the token, valid until each token's `exp`."""
+
+    def __init__(self, max_size=256, clock=time.time):
+        self.max_size = max_size
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # token hash -> (exp, claims)
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token, claims):
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            return  # no expiry: always verify
+        with self.lock:
+            self.entries[self.key(token)] = (exp, claims)
+            self.entries.move_to_end(self.key(token))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
@@ -0,0 +1,218 @@
+import http.client, json, os, socket, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlparse
+
+DOCKER_HOST = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
+STATS_SECONDS = float(os.getenv("DOCKER_STATS_SECONDS", "10"))
+STATS_WORKERS = int(os.getenv("DOCKER_STATS_WORKERS", "4"))
+RESYNC_SECONDS = 300
+MAX_BACKOFF = 60
+# container events that can change the inventory; not exec_* (every healthcheck run)
+DOCKER_EVENTS = ("create", "start", "restart", "stop", "die", "kill", "pause", "unpause", "rename", "destroy",
+                 "health_status")
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DockerClient:
+    """Minimal Docker Engine API client over the unix socket or TCP (e.g. dockerproxy)."""
+
+    def __init__(self, host=DOCKER_HOST):
+        url = urlparse(host)
+        self.unix_path = url.path if url.scheme == "unix" else None
+        self.host, self.port = url.hostname, url.port or 2375
+
+    def _open(self, path, timeout):
+        if self.unix_path:
+            conn = _UnixConnection(self.unix_path, timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        if resp.status != 200:
+            body = resp.read(200)
+            conn.close()
+            raise RuntimeError(f"docker GET {path} -> {resp.status} {body!r}")
+        return conn, resp
+
+    def get_json(self, path, timeout=10):
+        conn, resp = self._open(path, timeout)
+        try:
+            return json.load(resp)
+        finally:
+            conn.close()
+
+    def stream(self, path, timeout):
+        """Yield one decoded JSON object per line of a streaming response."""
+        conn, resp = self._open(path, timeout)
+        try:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+
+def is_state_change(event):
+    """True for a Docker event that can change a container's name, state or health."""
+    action = (event.get("Action") or event.get("status") or "").split(":")[0]
+    return action in DOCKER_EVENTS
+
+
+def summarize(c):
+    status = c.get("Status") or ""
+    health = None
+    for word in ("unhealthy", "healthy", "health: starting"):
+        if f"({word})" in status:
+            health = word.replace("health: ", "")
+            break
+    return {
+        "id": c["Id"][:12],
+        "name": (c.get("Names") or ["/" + c["Id"][:12]])[0].lstrip("/"),
+        "image": c.get("Image"),
+        "state": c.get("State"),
+        "status": status,
+        "health": health,
+        "created": c.get("Created"),
+    }
+
+
+def compute_stats(raw, previous=None):
+    """Turn a one-shot stats sample into percentages; CPU uses our previous sample as the baseline."""
+    cpu = raw.get("cpu_stats") or {}
+    total = (cpu.get("cpu_usage") or {}).get("total_usage")
+    system = cpu.get("system_cpu_usage")
+    cpus = cpu.get("online_cpus") or len((cpu.get("cpu_usage") or {}).get("percpu_usage") or []) or 1
+    cpu_percent = None
+    if previous and total is not None and system is not None:
+        d_total, d_system = total - previous["_cpu_total"], system - previous["_cpu_system"]
+        if d_total >= 0 and d_system > 0:
+            cpu_percent = round(d_total / d_system * cpus * 100, 2)
+
+    mem = raw.get("memory_stats") or {}
+    cache = (mem.get("stats") or {}).get("inactive_file", 0)
+    usage = max(0, (mem.get("usage") or 0) - cache)
+    limit = mem.get("limit") or 0
+    rx = sum(n.get("rx_bytes", 0) for n in (raw.get("networks") or {}).values())
+    tx = sum(n.get("tx_bytes", 0) for n in (raw.get("networks") or {}).values())
+    return {
+        "cpu_percent": cpu_percent,
+        "mem_usage_mb": round(usage / 1024 ** 2, 1),
+        "mem_limit_mb": round(limit / 1024 ** 2, 1),
+        "mem_percent": round(usage / limit * 100, 2) if limit else None,
+        "net_rx_mb": round(rx / 1024 ** 2, 2),
+        "net_tx_mb": round(tx / 1024 ** 2, 2),
+        "pids": (raw.get("pids_stats") or {}).get("current"),
+        "sampled_at": time.time(),
+        "_cpu_total": total,
+        "_cpu_system": system,
+    }
+
+
+class ContainerCache:
+    """Container inventory kept current by the Docker events stream, plus background stats.
+
+    The inventory is listed once and re-listed whenever a container event
+    arrives (and every RESYNC_SECONDS). A second thread samples one-shot stats
+    for the running containers every STATS_SECONDS over a small pool, so
+    requests only ever read these dicts.
+    """
+
+    def __init__(self, client=None, stats_seconds=STATS_SECONDS, workers=STATS_WORKERS):
+        self.client = client or DockerClient()
+        self.stats_seconds = stats_seconds
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docker-stats")
+        self.lock = threading.Lock()
+        self.containers = {}  # name -> summary
+        self.stats = {}       # name -> computed stats
+        self.updated = None
+        self.error = None
+        self.started = False
+
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        threading.Thread(target=self._follow_events, name="docker-events", daemon=True).start()
+        threading.Thread(target=self._sample_stats, name="docker-stats-loop", daemon=True).start()
+
+    def refresh(self):
+        listed = {s["name"]: s for s in map(summarize, self.client.get_json("/containers/json?all=1"))}
+        with self.lock:
+            self.containers = listed
+            self.stats = {name: st for name, st in self.stats.items() if name in listed}
+            self.updated = time.time()
+            self.error = None
+
+    def _follow_events(self):
+        backoff = 1
+        filters = quote(json.dumps({"type": ["container"], "event": list(DOCKER_EVENTS)}, separators=(",", ":")))
+        while True:
+            try:
+                since = int(time.time())
+                self.refresh()
+                path = f"/events?since={since}&until={since + RESYNC_SECONDS}&filters={filters}"
+                for event in self.client.stream(path, timeout=RESYNC_SECONDS + 30):
+                    if is_state_change(event):
+                        self.refresh()
+                backoff = 1
+            except Exception as e:
+                with self.lock:
+                    self.error = str(e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def sample_once(self):
+        with self.lock:
+            running = [c for c in self.containers.values() if c["state"] == "running"]
+
+        def one(c):
+            raw = self.client.get_json(f"/containers/{c['id']}/stats?stream=false&one-shot=true", timeout=15)
+            with self.lock:
+                previous = self.stats.get(c["name"])
+            computed = compute_stats(raw, previous)
+            with self.lock:
+                if c["name"] in self.containers:
+                    self.stats[c["name"]] = computed
+
+        for future in [self.pool.submit(one, c) for c in running]:
+            try:
+                future.result()
+            except Exception:
+                pass  # container stopped mid-sample; the next round will tell
+
+    def _sample_stats(self):
+        while True:
+            try:
+                self.sample_once()
+            except Exception as e:
+                with self.lock:
+                    self.error = str(e)
+            time.sleep(self.stats_seconds)
+
+    def inventory(self):
+        with self.lock:
+            return {
+                "containers": sorted(self.containers.values(), key=lambda c: c["name"]),
+                "updated": self.updated,
+                "error": self.error,
+            }
+
+    def container_stats(self, name):
+        """Stats for one container, or None if no such container is known."""
+        with self.lock:
+            summary = self.containers.get(name)
+            if summary is None:
+                return None
+            stats = self.stats.get(name)
+        public = {k: v for k, v in stats.items() if not k.startswith("_")} if stats else None
+        return {"name": name, "state": summary["state"], "health": summary["health"], "stats": public}
@@ -0,0 +1,131 @@
+import asyncio, inspect, json, secrets
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+PROTOCOL_VERSION = "2025-03-26"
+SERVER_INFO = {"name": "morepi-mcp-agent", "version": "1.1"}
+
+
+class ToolManifest:
+    """Tools registered once at startup; the `tools/list` result is rendered when frozen."""
+
+    def __init__(self):
+        self.tools = {}
+        self.listing = None
+
+    def add(self, name, description, handler, properties=None, required=()):
+        self.tools[name] = {
+            "handler": handler,
+            "spec": {
+                "name": name,
+                "description": description,
+                "inputSchema": {"type": "object", "properties": properties or {}, "required": list(required)},
+            },
+        }
+
+    def freeze(self):
+        self.listing = {"tools": [tool["spec"] for tool in self.tools.values()]}
+        return self
+
+    async def call(self, name, arguments):
+        """Run a tool; bad arguments and handler failures come back as `isError` results."""
+        tool = self.tools.get(name)
+        if tool is None:
+            raise KeyError(name)
+        arguments = arguments or {}
+        try:
+            if not isinstance(arguments, dict):
+                raise TypeError("arguments must be an object")
+            inspect.signature(tool["handler"]).bind(**arguments)
+        except TypeError as e:  # wrong or missing arguments
+            return _tool_result({"error": f"bad arguments: {e}"}, is_error=True)
+        try:
+            result = await asyncio.to_thread(tool["handler"], **arguments)
+        except HTTPException as e:
+            return _tool_result({"error": e.detail}, is_error=True)
+        except Exception as e:
+            print(f"tool {name} failed: {e!r}", flush=True)
+            return _tool_result({"error": f"{type(e).__name__}: {e}"}, is_error=True)
+        return _tool_result(result)
+
+
+def _tool_result(result, is_error=False):
+    # Text content only: structuredContent arrived with 2025-06-18, after PROTOCOL_VERSION.
+    return {
+        "content": [{"type": "text", "text": json.dumps(result, separators=(",", ":"))}],
+        "isError": is_error,
+    }
+
+
+def _error(msg_id, code, message):
+    return {"jsonrpc": "2.0", "id": msg_id, "error": {"code": code, "message": message}}
+
+
+async def handle_message(manifest, msg):
+    """Answer one JSON-RPC message; returns None for notifications."""
+    if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or "method" not in msg:
+        return _error(msg.get("id") if isinstance(msg, dict) else None, -32600, "Invalid Request")
+    msg_id, method, params = msg.get("id"), msg["method"], msg.get("params") or {}
+    if "id" not in msg:
+        return None  # notifications/initialized and friends need no answer
+
+    if method == "initialize":
+        result = {"protocolVersion": PROTOCOL_VERSION, "capabilities": {"tools": {"listChanged": False}},
+                  "serverInfo": SERVER_INFO}
+    elif method == "ping":
+        result = {}
+    elif method == "tools/list":
+        result = manifest.listing
+    elif method == "tools/call":
+        try:
+            result = await manifest.call(params.get("name"), params.get("arguments"))
+        except KeyError:
+            return _error(msg_id, -32602, f"Unknown tool: {params.get('name')}")
+    else:
+        return _error(msg_id, -32601, f"Method not found: {method}")
+    return {"jsonrpc": "2.0", "id": msg_id, "result": result}
+
+
+def mcp_router(manifest):
+    """Streamable HTTP transport: POST JSON-RPC to /mcp.
+
+    A batch sent with `Accept: text/event-stream` is answered as an SSE
+    stream, one event per response in completion order, so a fast tool is
+    not held back by a slow one in the same round trip. Otherwise the answer
+    is plain JSON.
+    """
+    router = APIRouter()
+    manifest.freeze()
+
+    @router.post("/mcp")
+    async def mcp(request: Request):
+        try:
+            body = await request.json()
+        except ValueError:
+            return JSONResponse(_error(None, -32700, "Parse error"), status_code=400)
+        messages = body if isinstance(body, list) else [body]
+        headers = {}
+        if any(isinstance(m, dict) and m.get("method") == "initialize" for m in messages):
+            headers["Mcp-Session-Id"] = secrets.token_hex(16)
+        if all(isinstance(m, dict) and "id" not in m for m in messages):
+            return Response(status_code=202, headers=headers)
+
+        if "text/event-stream" in request.headers.get("accept", ""):
+            async def events():
+                for next_done in asyncio.as_completed([handle_message(manifest, m) for m in messages]):
+                    reply = await next_done
+                    if reply is not None:
+                        yield f"event: message\ndata: {json.dumps(reply, separators=(',', ':'))}\n\n"
+            headers.update({"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+            return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+        replies = [r for r in await asyncio.gather(*(handle_message(manifest, m) for m in messages)) if r is not None]
+        return JSONResponse(replies if isinstance(body, list) else replies[0], headers=headers)
+
+    @router.get("/mcp")
+    def mcp_stream():
+        # No server-initiated messages: clients only need the POST side.
+        return Response(status_code=405, headers={"Allow": "POST"})
+
+    return router
@@ -0,0 +1,133 @@
+import os, threading, time
+from collections import deque
+
+import psutil
+
+TICK_SECONDS = 1.0
+PROC_EVERY = int(os.getenv("SAMPLER_PROC_EVERY", "5"))   # ticks between process scans
+DISK_EVERY = int(os.getenv("SAMPLER_DISK_EVERY", "5"))   # ticks between disk_usage calls
+DISK_PATH = os.getenv("SAMPLER_DISK_PATH", "/")
+TOP_N = int(os.getenv("SAMPLER_TOP_N", "5"))
+WINDOW_SECONDS = 300
+GB = 1024 ** 3
+
+
+class Rolling:
+    """Fixed-length history of one metric with 1s / 1m / 5m averages."""
+
+    def __init__(self, seconds=WINDOW_SECONDS, step=1):
+        self.step = step
+        self.values = deque(maxlen=int(seconds / step))
+
+    def add(self, value):
+        self.values.append(value)
+
+    def windows(self):
+        if not self.values:
+            return {"1s": None, "1m": None, "5m": None}
+        last_minute = list(self.values)[-max(1, int(60 / self.step)):]
+        return {
+            "1s": round(self.values[-1], 1),
+            "1m": round(sum(last_minute) / len(last_minute), 1),
+            "5m": round(sum(self.values) / len(self.values), 1),
+        }
+
+
+class Sampler(threading.Thread):
+    """Samples CPU, memory, disk and processes in the background.
+
+    Ticks only record raw values; `snapshot` (a plain dict) is built from them
+    when an endpoint first reads it after a tick and reused until the next one,
+    so the per-process windows are not recomputed every second nobody asks.
+    Requests still make no psutil call. `cpu_percent` is measured over exactly
+    one tick.
+    """
+
+    def __init__(self):
+        super().__init__(name="psutil-sampler", daemon=True)
+        self.lock = threading.Lock()
+        self.cpu = Rolling()
+        self.mem = Rolling()
+        self.disk = Rolling(step=DISK_EVERY)
+        self.procs = {}  # pid -> (name, Rolling cpu, last memory percent)
+        self.disk_usage = None
+        self.ticks = 0
+        self.sampled_at = None
+        self._snapshot = None  # built on first read after a tick
+        psutil.cpu_percent(interval=None)  # prime: the next call covers one tick
+
+    @property
+    def snapshot(self):
+        with self.lock:
+            if self._snapshot is None:
+                self._snapshot = self.build()
+            return self._snapshot
+
+    def tick(self):
+        cpu = psutil.cpu_percent(interval=None)
+        mem = psutil.virtual_memory().percent
+        usage = psutil.disk_usage(DISK_PATH) if self.ticks % DISK_EVERY == 0 else None
+        scanned = self.scan_processes() if self.ticks % PROC_EVERY == 0 else None
+        with self.lock:
+            self.cpu.add(cpu)
+            self.mem.add(mem)
+            if usage is not None:
+                self.disk_usage = usage
+                self.disk.add(usage.percent)
+            if scanned is not None:
+                self.update_processes(scanned)
+            self.ticks += 1
+            self.sampled_at = time.time()
+            self._snapshot = None
+
+    def scan_processes(self):
+        return [
+            p.info for p in psutil.process_iter(["pid", "name", "cpu_percent", "memory_percent"])
+            if p.info["cpu_percent"] is not None
+        ]
+
+    def update_processes(self, scanned):
+        alive = set()
+        for info in scanned:
+            alive.add(info["pid"])
+            name, history, _ = self.procs.get(info["pid"]) or (info["name"], Rolling(step=PROC_EVERY), 0.0)
+            history.add(info["cpu_percent"])
+            self.procs[info["pid"]] = (name, history, info["memory_percent"] or 0.0)
+        for pid in set(self.procs) - alive:
+            del self.procs[pid]
+
+    def build(self):
+        usage = self.disk_usage
+        disk = {}
+        if usage is not None:
+            disk = {
+                "total_gb": round(usage.total / GB, 2),
+                "used_gb": round(usage.used / GB, 2),
+                "free_gb": round(usage.free / GB, 2),
+                "percent_used": usage.percent,
+                "percent_used_windows": self.disk.windows(),
+            }
+        rows = [
+            {"pid": pid, "name": name, "cpu": history.windows(), "mem_percent": round(mem, 1)}
+            for pid, (name, history, mem) in self.procs.items()
+        ]
+        return {
+            "ts": self.sampled_at,
+            "cpu": self.cpu.windows(),
+            "mem": self.mem.windows(),
+            "disk": disk,
+            "processes": {
+                "by_cpu": sorted(rows, key=lambda r: r["cpu"]["1m"] or 0, reverse=True)[:TOP_N],
+                "by_mem": sorted(rows, key=lambda r: r["mem_percent"], reverse=True)[:TOP_N],
+            },
+        }
+
+    def run(self):
+        next_at = time.monotonic()
+        while True:
+            next_at += TICK_SECONDS
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"sampler tick failed: {e}", flush=True)
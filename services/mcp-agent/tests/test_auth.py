@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+
+import app as agent
+from auth_cache import CodeStore, TokenCache
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_codes_expire_and_stay_bounded():
+    clock = _Clock()
+    store = CodeStore(ttl=60, max_codes=3, clock=clock)
+    store.put("a", "tok-a")
+    clock.now += 61
+    for code in "bcde":
+        store.put(code, f"tok-{code}")
+
+    assert store.pop("a") is None
+    assert store.pop("b") is None  # pushed out by the size bound
+    assert store.pop("e") == "tok-e"
+    assert store.pop("e") is None
+    assert len(store) == 2
+
+
+def test_token_cache_honours_exp_and_lru():
+    clock = _Clock()
+    cache = TokenCache(max_size=2, clock=clock)
+    cache.put("t1", {"exp": 1100})
+    cache.put("t2", {"exp": 2000})
+    cache.get("t1")
+    cache.put("t3", {"exp": 2000})
+
+    assert cache.get("t1") == {"exp": 1100}
+    assert cache.get("t2") is None
+    clock.now = 1100
+    assert cache.get("t1") is None
+
+
+def test_authorize_token_flow_and_cached_verification(monkeypatch):
+    monkeypatch.setattr(agent, "CODES", CodeStore())
+    monkeypatch.setattr(agent, "VERIFIED", TokenCache())
+    client = TestClient(agent.app)
+    decodes = []
+    real_decode = agent.jwt.decode
+    monkeypatch.setattr(agent.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    redirect = client.get(
+        "/authorize",
+        params={"response_type": "code", "client_id": agent.CLIENT_ID, "redirect_uri": "http://cb", "state": "s"},
+        follow_redirects=False,
+    )
+    code = redirect.headers["location"].split("code=")[1].split("&")[0]
+    form = {"grant_type": "authorization_code", "code": code, "client_id": agent.CLIENT_ID, "redirect_uri": "http://cb"}
+    token = client.post("/token", data=form).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/disk", headers=headers).status_code == 200
+    assert client.get("/disk", headers=headers).status_code == 200
+    assert len(decodes) == 1
+    assert client.post("/token", data=form).status_code == 400
+    assert client.get("/disk", headers={"Authorization": "Bearer nope"}).status_code == 401
@@ -0,0 +1,131 @@
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+from fastapi.testclient import TestClient
+
+import app as agent
+from docker_cache import ContainerCache, DockerClient, compute_stats
+
+
+def _container(i, state="running"):
+    return {"Id": f"{i:064x}", "Names": [f"/svc{i}"], "Image": "img", "State": state,
+            "Status": "Up 1 hour (healthy)", "Created": 1}
+
+
+def _stats(total, system, usage=300 * 1024 ** 2):
+    return {
+        "cpu_stats": {"cpu_usage": {"total_usage": total}, "system_cpu_usage": system, "online_cpus": 4},
+        "memory_stats": {"usage": usage, "limit": 1024 ** 3, "stats": {"inactive_file": 100 * 1024 ** 2}},
+        "networks": {"eth0": {"rx_bytes": 1024 ** 2, "tx_bytes": 0}},
+        "pids_stats": {"current": 7},
+    }
+
+
+class _FakeDocker(BaseHTTPRequestHandler):
+    containers = [_container(i) for i in range(25)]
+    events = threading.Event()
+    calls = []
+
+    def do_GET(self):
+        self.calls.append(self.path)
+        if self.path.startswith("/containers/json"):
+            return self._json(self.containers)
+        if "/stats" in self.path:
+            n = sum("/stats" in p for p in self.calls)
+            return self._json(_stats(total=n * 1000, system=n * 10000))
+        if self.path.startswith("/events"):
+            self.send_response(200)
+            self.end_headers()
+            self.events.wait(5)
+            for action in (b"exec_create: true", b"exec_start: true", b"exec_die"):
+                self.wfile.write(b'{"Type":"container","Action":"%s"}\n' % action)
+            self.wfile.write(b'{"Type":"container","Action":"stop"}\n')
+            self.wfile.flush()
+            time.sleep(5)
+
+    def _json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return "unix"
+
+    def log_message(self, fmt, *args):
+        return None
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _serve():
+    path = os.path.join(tempfile.mkdtemp(), "docker.sock")
+    server = _UnixServer(path, _FakeDocker)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, DockerClient(f"unix://{path}")
+
+
+def _wait(predicate):
+    deadline = time.monotonic() + 3
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_compute_stats_uses_previous_sample_for_cpu():
+    first = compute_stats(_stats(1000, 10000))
+    second = compute_stats(_stats(3000, 20000), first)
+
+    assert first["cpu_percent"] is None
+    assert second["cpu_percent"] == 80.0
+    assert second["mem_usage_mb"] == 200.0 and second["mem_percent"] == 19.53
+    assert "_cpu_total" in second
+
+
+def test_cache_follows_events_and_samples_stats():
+    _FakeDocker.calls = []
+    server, client = _serve()
+    cache = ContainerCache(client, stats_seconds=0.05, workers=4)
+    try:
+        cache.start()
+        _wait(lambda: len(cache.inventory()["containers"]) == 25)
+        _wait(lambda: (cache.container_stats("svc3") or {}).get("stats", {}) and
+              cache.container_stats("svc3")["stats"]["cpu_percent"] is not None)
+
+        _FakeDocker.containers = [_container(i) for i in range(24)] + [_container(24, state="exited")]
+        _FakeDocker.events.set()
+        _wait(lambda: cache.container_stats("svc24")["state"] == "exited")
+    finally:
+        server.shutdown()
+
+    assert cache.container_stats("svc3")["stats"]["pids"] == 7
+    assert cache.container_stats("svc24")["state"] == "exited"
+    assert cache.container_stats("nope") is None
+    # one listing at start and one for the stop; the healthcheck exec_* events are ignored
+    assert sum(p.startswith("/containers/json") for p in _FakeDocker.calls) == 2
+    assert any(p.startswith("/events") and "health_status" in unquote(p) for p in _FakeDocker.calls)
+
+
+def test_endpoints_read_the_cache(monkeypatch):
+    server, client = _serve()
+    cache = ContainerCache(client)
+    cache.refresh()
+    server.shutdown()
+    monkeypatch.setattr(agent, "containers", cache)
+    api = TestClient(agent.app)
+    headers = {"Authorization": f"Bearer {agent.create_token()}"}
+
+    listed = api.get("/containers", headers=headers).json()
+    stats = api.get("/containers/svc1/stats", headers=headers).json()
+
+    assert listed["containers"][0]["name"] == "svc0" and listed["containers"][0]["health"] == "healthy"
+    assert stats == {"name": "svc1", "state": "running", "health": "healthy", "stats": None}
+    assert api.get("/containers/missing/stats", headers=headers).status_code == 404
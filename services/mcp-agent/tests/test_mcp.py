@@ -0,0 +1,84 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app as agent
+from mcp_transport import ToolManifest, mcp_router
+
+
+def _headers(**extra):
+    return {"Authorization": f"Bearer {agent.create_token()}", **extra}
+
+
+def _rpc(method, msg_id=1, **params):
+    return {"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params}
+
+
+def test_initialize_and_list_tools():
+    client = TestClient(agent.app)
+
+    init = client.post("/mcp", json=_rpc("initialize", protocolVersion="2025-03-26"), headers=_headers())
+    listed = client.post("/mcp", json=_rpc("tools/list", 2), headers=_headers()).json()
+
+    assert init.json()["result"]["capabilities"] == {"tools": {"listChanged": False}}
+    assert init.headers["Mcp-Session-Id"]
+    names = [t["name"] for t in listed["result"]["tools"]]
+    assert names == ["system_info", "disk_usage", "top_processes", "list_containers", "container_stats"]
+    assert listed["result"] == agent.tools.listing
+
+
+def test_tools_call_and_errors():
+    client = TestClient(agent.app)
+
+    disk = client.post("/mcp", json=_rpc("tools/call", name="disk_usage"), headers=_headers()).json()
+    missing = client.post("/mcp", json=_rpc("tools/call", name="container_stats", arguments={"name": "nope"}),
+                          headers=_headers()).json()
+    unknown = client.post("/mcp", json=_rpc("tools/call", name="nope"), headers=_headers()).json()
+    note = client.post("/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"}, headers=_headers())
+
+    assert disk["result"]["isError"] is False
+    assert json.loads(disk["result"]["content"][0]["text"]) == agent.sampler.snapshot["disk"]
+    assert "structuredContent" not in disk["result"]  # not part of PROTOCOL_VERSION 2025-03-26
+    assert missing["result"]["isError"] is True
+    assert unknown["error"]["code"] == -32602
+    assert note.status_code == 202
+
+
+def test_bad_arguments_and_tool_failures_are_tool_errors():
+    def broken(name):
+        raise TypeError("unsupported operand")
+
+    tools = ToolManifest()
+    tools.add("broken", "", broken, properties={"name": {"type": "string"}}, required=["name"])
+    app = FastAPI()
+    app.include_router(mcp_router(tools))
+    batch = [
+        _rpc("tools/call", 1, name="broken", arguments={"nope": 1}),
+        _rpc("tools/call", 2, name="broken", arguments={"name": "x"}),
+    ]
+
+    with TestClient(app).stream("POST", "/mcp", json=batch, headers={"Accept": "text/event-stream"}) as resp:
+        events = {e["id"]: e for e in (json.loads(line[len("data: "):]) for line in resp.iter_lines()
+                                       if line.startswith("data: "))}
+
+    assert set(events) == {1, 2}
+    assert all(e["result"]["isError"] for e in events.values())
+    assert json.loads(events[1]["result"]["content"][0]["text"])["error"].startswith("bad arguments:")
+    assert json.loads(events[2]["result"]["content"][0]["text"]) == {"error": "TypeError: unsupported operand"}
+
+
+def test_batch_streams_results_in_completion_order():
+    tools = ToolManifest()
+    tools.add("slow", "", lambda: time.sleep(0.3) or {"done": "slow"})
+    tools.add("fast", "", lambda: {"done": "fast"})
+    app = FastAPI()
+    app.include_router(mcp_router(tools))
+    batch = [_rpc("tools/call", 1, name="slow"), _rpc("tools/call", 2, name="fast")]
+
+    with TestClient(app).stream("POST", "/mcp", json=batch, headers={"Accept": "text/event-stream"}) as resp:
+        events = [json.loads(line[len("data: "):]) for line in resp.iter_lines() if line.startswith("data: ")]
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert [e["id"] for e in events] == [2, 1]
@@ -0,0 +1,57 @@
+from fastapi.testclient import TestClient
+
+import app as agent
+from sampler import Rolling, Sampler
+
+
+def test_rolling_windows():
+    rolling = Rolling(seconds=300, step=1)
+    for value in [10.0] * 240 + [40.0] * 60:
+        rolling.add(value)
+
+    assert rolling.windows() == {"1s": 40.0, "1m": 40.0, "5m": 16.0}
+
+
+def test_tick_builds_snapshot():
+    sampler = Sampler()
+
+    sampler.tick()
+    sampler.tick()
+    snap = sampler.snapshot
+
+    assert snap["cpu"]["1s"] is not None and snap["mem"]["5m"] is not None
+    assert set(snap["disk"]) >= {"total_gb", "percent_used", "percent_used_windows"}
+    assert snap["processes"]["by_mem"]
+
+
+def test_endpoints_serve_the_snapshot(monkeypatch):
+    fake = Sampler()
+    fake.tick()
+    monkeypatch.setattr(agent, "sampler", fake)
+    client = TestClient(agent.app)
+    headers = {"Authorization": f"Bearer {agent.create_token()}"}
+
+    info = client.get("/info", headers=headers).json()
+    disk = client.get("/disk", headers=headers).json()
+
+    assert info["cpu"] == fake.snapshot["cpu"] and info["cpu_percent"] == fake.snapshot["cpu"]["1s"]
+    assert disk == fake.snapshot["disk"]
+    assert client.get("/processes", headers=headers).json() == fake.snapshot["processes"]
+
+
+def test_snapshot_is_built_once_per_tick(monkeypatch):
+    sampler = Sampler()
+    builds = []
+    build = sampler.build
+    monkeypatch.setattr(sampler, "build", lambda: builds.append(1) or build())
+
+    sampler.tick()
+    sampler.tick()
+    first = sampler.snapshot
+    again = sampler.snapshot
+    sampler.tick()
+    later = sampler.snapshot
+
+    assert len(builds) == 2
+    assert again is first and later is not first
+    assert later["ts"] >= first["ts"]
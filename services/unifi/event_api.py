@@ -0,0 +1,175 @@
+"""Small HTTP API served by the collector (proxied by nginx under /unifi/)."""
+import json, os, threading, time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from event_rollups import Rollups
+
+API_PORT = int(os.getenv("API_PORT", "8088"))
+FEED_SIZE = 500
+MAX_WAIT_SECONDS = 30
+SSE_HEARTBEAT_SECONDS = 15
+
+
+class EventFeed:
+    """Recent events for long-poll and SSE readers, behind a timestamp cursor.
+
+    Each event is stamped with `published`, the wall-clock millisecond it reached
+    the feed (bumped so stamps strictly increase), and a reader's cursor is the
+    last stamp it saw. The stamp is used rather than the event's own `ts` because
+    events arrive out of `ts` order (several consoles, late fetches), and an
+    update that does not move the event's end (a new score, say) keeps a `ts`
+    its readers are already past; a `ts` cursor would skip both. Updates carry
+    `update: True` and replace their event by (nvr, id) on the reader's side.
+
+    Stamps keep increasing across restarts, but a restarted feed cannot know what
+    was published in between: a cursor older than the feed itself (or than an
+    evicted event), or newer than the last event, yields `reset: True`.
+    """
+
+    def __init__(self, size=FEED_SIZE, clock=time.time):
+        self.events = deque(maxlen=size)
+        self.clock = clock
+        self.last = int(clock() * 1000)  # cursor of an empty feed
+        self.floor = self.last  # cursors below this may have missed events
+        self.cond = threading.Condition()
+
+    def publish(self, evts):
+        with self.cond:
+            for e in evts:
+                if len(self.events) == self.events.maxlen:
+                    self.floor = self.events[0]["published"]
+                self.last = max(int(self.clock() * 1000), self.last + 1)
+                self.events.append({**e, "published": self.last})
+            self.cond.notify_all()
+
+    def read(self, since=None, limit=50, wait=0.0):
+        """Return `{"events", "cursor", "reset"}`, blocking up to `wait` seconds for news."""
+        deadline = time.monotonic() + wait
+        with self.cond:
+            if since is not None and since == self.last:
+                while self.last == since:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+
+            reset = since is None or since > self.last or since < self.floor
+            if reset:
+                events = list(self.events)[-limit:]
+            else:
+                events = [e for e in self.events if e["published"] > since][:limit]
+            cursor = events[-1]["published"] if events else self.last
+            return {"events": events, "cursor": cursor, "reset": reset and since is not None}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "unifi-collector"
+    routes = {}  # path -> method name, filled by `route`
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        handler = self.routes.get(url.path.rstrip("/"))
+        if handler is None:
+            return self.send_json({"error": "not found"}, 404)
+        try:
+            getattr(self, handler)()
+        except (ValueError, TypeError) as e:
+            self.send_json({"error": str(e)}, 400)
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        return None
+
+    # --- endpoints ---
+
+    def health(self):
+        sinks = {sink.sink_name: sink.stats() for sink in self.server.sinks}
+        self.send_json({"status": "ok", "sinks": sinks})
+
+    def history(self):
+        q = self.query
+        events, next_cursor = self.server.store.query(
+            camera=q.get("camera"),
+            type=q.get("type"),
+            since=int(q["since"]) if q.get("since") else None,
+            until=int(q["until"]) if q.get("until") else None,
+            cursor=q.get("cursor"),
+            limit=int(q.get("limit", 100)),
+            nvr=q.get("nvr"),
+        )
+        self.send_json({"events": events, "next_cursor": next_cursor})
+
+    def events(self):
+        q = self.query
+        since = int(q["since"]) if q.get("since") else None
+        wait = min(float(q.get("wait", 0)), MAX_WAIT_SECONDS)
+        self.send_json(self.server.feed.read(since, limit=int(q.get("limit", 50)), wait=wait))
+
+    def rollups(self):
+        q = self.query
+        resolution = q.get("resolution", "hour")
+        buckets = self.server.rollups.series(
+            resolution,
+            camera=q.get("camera"),
+            type=q.get("type"),
+            since=int(q["since"]) if q.get("since") else None,
+        )
+        self.send_json({"resolution": resolution, "buckets": buckets})
+
+    def events_stream(self):
+        # EventSource sends the last `id:` back when it reconnects
+        since = self.query.get("since") or self.headers.get("Last-Event-ID")
+        since = int(since) if since else None
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("X-Accel-Buffering", "no")
+        self.end_headers()
+        try:
+            while True:
+                page = self.server.feed.read(since, wait=SSE_HEARTBEAT_SECONDS if since is not None else 0)
+                if page["events"] or page["reset"]:
+                    data = json.dumps(page, separators=(",", ":"))
+                    self.wfile.write(f"id: {page['cursor']}\nevent: events\ndata: {data}\n\n".encode())
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                since = page["cursor"]
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def route(path, handler):
+    ApiHandler.routes[path] = handler
+
+
+route("/unifi/health", "health")
+route("/unifi/history", "history")
+route("/unifi/events", "events")
+route("/unifi/events/stream", "events_stream")
+route("/unifi/rollups", "rollups")
+
+
+def start_api(store, feed=None, sinks=(), rollups=None, port=API_PORT, host="0.0.0.0"):
+    """Serve the API from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.store = store
+    server.feed = feed if feed is not None else EventFeed()
+    server.sinks = list(sinks)
+    server.rollups = rollups if rollups is not None else Rollups()
+    threading.Thread(target=server.serve_forever, name="unifi-api", daemon=True).start()
+    return server
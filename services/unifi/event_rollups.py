@@ -0,0 +1,70 @@
+"""Incremental per-camera event counts by minute, hour and day."""
+import threading, time
+from collections import Counter
+
+# resolution -> (bucket seconds, buckets kept)
+RESOLUTIONS = {
+    "minute": (60, 24 * 60),
+    "hour": (3600, 7 * 24),
+    "day": (86400, 90),
+}
+
+
+def bucket_start(ts, resolution):
+    if resolution == "day":  # local calendar days, like the `time` field on events
+        y, m, d = time.localtime(ts)[:3]
+        return int(time.mktime((y, m, d, 0, 0, 0, 0, 0, -1)))
+    size = RESOLUTIONS[resolution][0]
+    return ts - ts % size
+
+
+class Rollups:
+    """Counts per `(camera, type)` in fixed time buckets, updated as events arrive.
+
+    Each resolution keeps a bounded number of buckets, so reading a series
+    costs the same whatever the event volume.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {res: {} for res in RESOLUTIONS}  # res -> {bucket start: Counter}
+
+    def add(self, events, now=None):
+        now = int(time.time() if now is None else now)
+        events = list(events)
+        with self.lock:
+            for res, (size, keep) in RESOLUTIONS.items():
+                series = self.buckets[res]
+                oldest = bucket_start(now, res) - (keep - 1) * size
+                for e in events:
+                    start = bucket_start(int(e["ts"]), res)
+                    if start >= oldest:
+                        series.setdefault(start, Counter())[(e.get("camera"), e.get("type"))] += 1
+                for start in [s for s in series if s < oldest]:
+                    del series[start]
+
+    def seed(self, store, now=None):
+        """Rebuild the counts from the event store (once, at startup)."""
+        now = int(time.time() if now is None else now)
+        since = bucket_start(now, "day") - (RESOLUTIONS["day"][1] - 1) * 86400
+        self.add(store.iter_since(since), now)
+
+    def series(self, resolution="hour", camera=None, type=None, since=None):
+        """Return non-empty buckets oldest first as `{"t", "total", "cameras": {camera: {type: n}}}`."""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        with self.lock:
+            items = sorted((start, dict(counts)) for start, counts in self.buckets[resolution].items())
+        out = []
+        for start, counts in items:
+            if since is not None and start < since:
+                continue
+            cameras, total = {}, 0
+            for (cam, etype), n in counts.items():
+                if (camera and cam != camera) or (type and etype != type):
+                    continue
+                cameras.setdefault(cam, {})[etype] = n
+                total += n
+            if total:
+                out.append({"t": start, "total": total, "cameras": cameras})
+        return out
@@ -0,0 +1,166 @@
+"""SQLite-backed long-term store for normalized UniFi Protect events."""
+import os, sqlite3, threading, time
+
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "90"))
+PRUNE_EVERY_SECONDS = 3600
+PRUNE_CHUNK = 10000
+MAX_PAGE = 1000
+
+# Event ids are only unique per console, so `nvr` is part of the key ('' for a single,
+# unnamed console).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    nvr    TEXT NOT NULL DEFAULT '',
+    id     TEXT NOT NULL,
+    ts     INTEGER NOT NULL,
+    time   TEXT,
+    type   TEXT,
+    camera TEXT,
+    PRIMARY KEY (nvr, id)
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts, nvr, id);
+CREATE INDEX IF NOT EXISTS idx_events_nvr_ts ON events (nvr, ts, id);
+CREATE INDEX IF NOT EXISTS idx_events_camera_ts ON events (camera, ts, nvr, id);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (type, ts, nvr, id);
+"""
+
+COLUMNS = ("nvr", "id", "ts", "time", "type", "camera")
+
+
+def encode_cursor(row):
+    return f"{row['ts']}:{row['nvr']}:{row['id']}"
+
+
+def decode_cursor(cursor):
+    ts, nvr, event_id = str(cursor).split(":", 2)
+    return int(ts), nvr, event_id
+
+
+class EventStore:
+    """Events indexed by time, camera and type, with retention-based pruning.
+
+    Writes go through one shared connection under a lock; every reading thread
+    gets its own connection so queries run concurrently with inserts (WAL).
+    """
+
+    def __init__(self, path, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._next_prune = 0.0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = self._connect()
+        self._migrate()
+        self._writer.executescript(SCHEMA)
+
+    def _migrate(self):
+        """Rebuild a table from before the `nvr` column, keying its events on console ''."""
+        columns = [row["name"] for row in self._writer.execute("PRAGMA table_info(events)")]
+        if not columns or "nvr" in columns:
+            return
+        with self._writer:
+            for index in ("idx_events_ts", "idx_events_camera_ts", "idx_events_type_ts"):
+                self._writer.execute(f"DROP INDEX IF EXISTS {index}")
+            self._writer.execute("ALTER TABLE events RENAME TO events_old")
+        self._writer.executescript(SCHEMA)
+        with self._writer:
+            self._writer.execute(
+                "INSERT INTO events (nvr, id, ts, time, type, camera) "
+                "SELECT '', id, ts, time, type, camera FROM events_old"
+            )
+            self._writer.execute("DROP TABLE events_old")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def insert_many(self, events):
+        rows = [(e.get("nvr") or "", *(e.get(col) for col in COLUMNS[1:])) for e in events]
+        if rows:
+            with self._write_lock, self._writer:
+                # Upsert: an event re-fetched once it closed replaces its open version.
+                self._writer.executemany(
+                    "INSERT INTO events (nvr, id, ts, time, type, camera) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(nvr, id) DO UPDATE SET ts = excluded.ts, time = excluded.time, "
+                    "type = excluded.type, camera = excluded.camera",
+                    rows,
+                )
+        if time.time() >= self._next_prune:
+            self.prune()
+
+    def prune(self, now=None):
+        """Delete events older than the retention window, in chunks to keep write locks short."""
+        now = time.time() if now is None else now
+        cutoff = int(now - self.retention_seconds)
+        removed = 0
+        while True:
+            with self._write_lock, self._writer:
+                cur = self._writer.execute(
+                    "DELETE FROM events WHERE rowid IN (SELECT rowid FROM events WHERE ts < ? LIMIT ?)",
+                    (cutoff, PRUNE_CHUNK),
+                )
+            removed += cur.rowcount
+            if cur.rowcount < PRUNE_CHUNK:
+                break
+        self._next_prune = now + PRUNE_EVERY_SECONDS
+        return removed
+
+    def query(self, camera=None, type=None, since=None, until=None, cursor=None, limit=100, nvr=None):
+        """Return `(events, next_cursor)`.
+
+        With `since` (exclusive, epoch seconds) events come oldest first so a
+        client can follow new events; otherwise newest first. `cursor` is the
+        `next_cursor` of the previous page (keyset pagination on `(ts, nvr, id)`).
+        """
+        limit = max(1, min(int(limit), MAX_PAGE))
+        ascending = since is not None
+        where, args = [], []
+        if nvr is not None:
+            where.append("nvr = ?")
+            args.append(nvr)
+        if camera:
+            where.append("camera = ?")
+            args.append(camera)
+        if type:
+            where.append("type = ?")
+            args.append(type)
+        if since is not None:
+            where.append("ts > ?")
+            args.append(int(since))
+        if until is not None:
+            where.append("ts <= ?")
+            args.append(int(until))
+        if cursor:
+            op = ">" if ascending else "<"
+            where.append(f"(ts, nvr, id) {op} (?, ?, ?)")
+            args.extend(decode_cursor(cursor))
+
+        order = "ASC" if ascending else "DESC"
+        sql = "SELECT nvr, id, ts, time, type, camera FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY ts {order}, nvr {order}, id {order} LIMIT ?"
+        rows = [dict(row) for row in self._reader().execute(sql, (*args, limit + 1))]
+
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], next_cursor
+
+    def iter_since(self, since):
+        """Yield `{ts, camera, type}` for every event at or after `since`, oldest first."""
+        cur = self._reader().execute("SELECT ts, camera, type FROM events WHERE ts >= ? ORDER BY ts", (int(since),))
+        for row in cur:
+            yield dict(row)
+
+    def count(self):
+        return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
@@ -0,0 +1,121 @@
+"""Content-addressed disk cache for event snapshots, served as static files by nginx."""
+import hashlib, os, re, tempfile, threading
+
+SNAPSHOT_CACHE_MB = float(os.getenv("SNAPSHOT_CACHE_MB", "512"))
+SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class SnapshotCache:
+    """JPEGs stored once per content hash, with size-bounded LRU eviction.
+
+    Layout under `root`:
+      objects/<sha[:2]>/<sha>.jpg      - the bytes, named by their SHA-256
+      by-event/<nvr>/<event id>.jpg    - relative symlink to the object
+
+    Recency is the last time an event stored or re-referenced the content
+    (nginx serves the files directly, so reads are not seen here). When the
+    objects exceed `max_bytes` the least recently used ones are deleted along
+    with every event link pointing at them. State is rebuilt from disk on start.
+    """
+
+    def __init__(self, root, max_bytes=int(SNAPSHOT_CACHE_MB * 1024 * 1024)):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.objects = {}  # sha -> size, least recently used first (dicts keep insertion order)
+        self.links = {}  # sha -> set of link paths
+        self.total = 0
+        self.evicted = 0
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "by-event"), exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def valid_key(nvr, event_id):
+        return bool(nvr and event_id and SAFE_NAME.match(nvr) and SAFE_NAME.match(event_id))
+
+    def _object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], f"{sha}.jpg")
+
+    def _link_path(self, nvr, event_id):
+        return os.path.join(self.root, "by-event", nvr, f"{event_id}.jpg")
+
+    def _scan(self):
+        found = []
+        for dirpath, _, files in os.walk(os.path.join(self.root, "objects")):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                if name.startswith(".tmp-"):
+                    os.unlink(path)
+                    continue
+                st = os.stat(path)
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, sha, size in sorted(found):
+            self.objects[sha] = size
+            self.total += size
+
+        for dirpath, _, files in os.walk(os.path.join(self.root, "by-event")):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                sha = os.path.basename(os.readlink(path))[:-4] if os.path.islink(path) else None
+                if sha in self.objects:
+                    self.links.setdefault(sha, set()).add(path)
+                else:
+                    os.unlink(path)
+        with self.lock:
+            self._evict()
+
+    def has(self, nvr, event_id):
+        return os.path.lexists(self._link_path(nvr, event_id))
+
+    def put(self, nvr, event_id, data):
+        """Store `data` for the event and return its content hash."""
+        sha = hashlib.sha256(data).hexdigest()
+        obj = self._object_path(sha)
+        with self.lock:
+            if sha in self.objects:
+                self.objects[sha] = self.objects.pop(sha)  # most recently used
+                os.utime(obj)
+            else:
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(obj), prefix=".tmp-")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, obj)
+                self.objects[sha] = len(data)
+                self.total += len(data)
+
+            link = self._link_path(nvr, event_id)
+            os.makedirs(os.path.dirname(link), exist_ok=True)
+            if os.path.islink(link):
+                self.links.get(os.path.basename(os.readlink(link))[:-4], set()).discard(link)
+            tmp_link = link + ".tmp"
+            if os.path.lexists(tmp_link):
+                os.unlink(tmp_link)
+            os.symlink(os.path.relpath(obj, os.path.dirname(link)), tmp_link)
+            os.replace(tmp_link, link)
+            self.links.setdefault(sha, set()).add(link)
+            self._evict(keep=sha)
+        return sha
+
+    def _evict(self, keep=None):
+        while self.total > self.max_bytes and self.objects:
+            sha = next(iter(self.objects))
+            if sha == keep:
+                break
+            self.total -= self.objects.pop(sha)
+            for link in self.links.pop(sha, ()):
+                try:
+                    os.unlink(link)
+                except FileNotFoundError:
+                    pass
+            try:
+                os.unlink(self._object_path(sha))
+            except FileNotFoundError:
+                pass
+            self.evicted += 1
+
+    def stats(self):
+        with self.lock:
+            return {"objects": len(self.objects), "bytes": self.total, "max_bytes": self.max_bytes, "evicted": self.evicted}
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from unifi_events import Sink
+
+
+class RecordingSink(Sink):
+    """Keeps every `offer` call in `offered` and every delivered batch in `batches`.
+
+    Offered events are still queued, so a started sink delivers them as usual.
+    """
+
+    def __init__(self, name="recording", delay=0.0, **kwargs):
+        super().__init__(name, **kwargs)
+        self.delay = delay
+        self.offered = []
+        self.batches = []
+
+    def offer(self, evts):
+        self.offered.append(list(evts))
+        super().offer(evts)
+
+    def offered_events(self):
+        return [e for evts in self.offered for e in evts]
+
+    def deliver(self, batch):
+        time.sleep(self.delay)
+        self.batches.append(list(batch))
+
+
+def raw_event(event_id, start=None, duration_ms=0, open=False):
+    """A Protect API event as the console returns it; `start` defaults to a second ago."""
+    if start is None:
+        start = int(time.time() * 1000) - duration_ms
+    end = None if open else start + duration_ms
+    return {"id": event_id, "type": "motion", "start": start, "end": end, "cameraName": "G4"}
+
+
+@pytest.fixture
+def recording_sink():
+    """The RecordingSink class, to build sinks with whatever queue settings a test needs."""
+    return RecordingSink
+
+
+@pytest.fixture
+def raw():
+    """`raw_event`, to build console events."""
+    return raw_event
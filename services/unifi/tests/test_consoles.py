@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+import unifi_events
+from unifi_events import Collector, Console, load_consoles, merge_loop
+
+
+def test_load_consoles_with_per_console_tokens(monkeypatch):
+    monkeypatch.setattr(unifi_events, "NVR_URLS", "home=https://10.0.0.1, https://10.0.0.2/")
+    monkeypatch.setattr(unifi_events, "API_TOKEN", "shared")
+    monkeypatch.setenv("API_TOKEN_HOME", "home-token")
+
+    home, other = load_consoles()
+
+    assert (home.name, home.url, home.token) == ("home", "https://10.0.0.1", "home-token")
+    assert (other.name, other.url, other.token) == ("10.0.0.2", "https://10.0.0.2", "shared")
+
+
+def test_merge_orders_events_across_consoles_and_keeps_cursors_apart(monkeypatch, tmp_path, recording_sink, raw):
+    monkeypatch.setattr(unifi_events, "OUT", str(tmp_path / "events.json"))
+    monkeypatch.setattr(unifi_events, "MERGE_WINDOW_SECONDS", 0.05)
+    sink = recording_sink()
+    home, barn = Console("home", "https://a", "t"), Console("barn", "https://b", "t")
+    collector = Collector([sink], [home, barn])
+    now = int(time.time() * 1000)
+
+    async def scenario():
+        out = asyncio.Queue()
+        await out.put((home, [raw("same", now - 3000), raw("h2", now - 1000)], now))
+        await out.put((barn, [raw("same", now - 2000)], now - 500))
+        task = asyncio.create_task(merge_loop(collector, out))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    assert len(sink.offered) == 1
+    assert [(e["nvr"], e["id"]) for e in sink.offered[0]] == [("home", "same"), ("barn", "same"), ("home", "h2")]
+    assert home.cursor_ms == now - 1000
+    assert barn.cursor_ms == now - 2000
@@ -0,0 +1,105 @@
+from urllib.parse import parse_qs, urlparse
+
+import unifi_events
+from unifi_events import Collector, Console, advance_cursor, fetch_since
+
+NOW = 10_000_000
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, items):
+        self.items = items
+
+    def json(self):
+        return {"items": self.items}
+
+
+class _FakeNvr:
+    """Answers /events from a fixed list, `limit` at a time, oldest or newest first."""
+
+    def __init__(self, events, newest_first=False):
+        self.events = sorted(events, key=lambda e: e["start"], reverse=newest_first)
+        self.urls = []
+
+    def get(self, url, timeout):
+        self.urls.append(url)
+        q = {k: int(v[0]) if v[0].isdigit() else v[0] for k, v in parse_qs(urlparse(url).query).items()}
+        window = [e for e in self.events if q["start"] <= e["start"] <= q["end"]]
+        return _Response(window[: q["limit"]])
+
+
+def _console(nvr):
+    console = Console("home", "https://nvr", "t")
+    console.session = nvr
+    return console
+
+
+def test_cursor_moves_to_newest_closed_event_and_waits_for_open_ones(raw):
+    closed = [raw("e1", NOW - 9000, 500), raw("e2", NOW - 5000, 500)]
+
+    assert advance_cursor(NOW - 20_000, closed, NOW) == NOW - 5000
+    assert advance_cursor(NOW - 20_000, closed + [raw("e3", NOW - 7000, 500, open=True)], NOW) == NOW - 7000
+    # An event open for longer than MAX_OPEN_MS no longer holds the cursor back.
+    stale = raw("e4", NOW - unifi_events.MAX_OPEN_MS - 1, 500, open=True)
+    assert advance_cursor(NOW - 20_000, closed + [stale], NOW) == NOW - 5000
+    assert advance_cursor(NOW - 20_000, [], NOW) == NOW - 20_000
+    assert advance_cursor(NOW + 5000, closed, NOW) == NOW
+
+
+def test_fetch_pages_oldest_first_and_overlap_is_deduped(monkeypatch, raw):
+    monkeypatch.setattr(unifi_events, "PAGE_LIMIT", 3)
+    nvr = _FakeNvr([raw(f"e{n}", NOW - 10_000 + n * 1000, 500) for n in range(8)])
+
+    items = fetch_since(_console(nvr), NOW - 20_000, NOW)
+
+    assert all("orderDirection=ASC" in url for url in nvr.urls)
+    assert len(nvr.urls) == 4  # pages overlap by one boundary event each
+    assert {e["id"] for e in items} == {f"e{n}" for n in range(8)}
+
+
+def test_fetch_follows_newest_first_consoles_backwards(monkeypatch, raw):
+    monkeypatch.setattr(unifi_events, "PAGE_LIMIT", 3)
+    nvr = _FakeNvr([raw(f"e{n}", NOW - 10_000 + n * 1000, 500) for n in range(8)], newest_first=True)
+
+    items = fetch_since(_console(nvr), NOW - 20_000, NOW)
+
+    assert {e["id"] for e in items} == {f"e{n}" for n in range(8)}
+
+
+def test_truncated_fetch_is_logged_and_cursor_carries_on(monkeypatch, raw):
+    monkeypatch.setattr(unifi_events, "PAGE_LIMIT", 2)
+    monkeypatch.setattr(unifi_events, "MAX_PAGES", 2)
+    logged = []
+    monkeypatch.setattr(unifi_events, "log", logged.append)
+    nvr = _FakeNvr([raw(f"e{n}", NOW - 10_000 + n * 1000, 500) for n in range(6)])
+
+    first = fetch_since(_console(nvr), NOW - 20_000, NOW)
+    cursor = advance_cursor(NOW - 20_000, first, NOW)
+    seen = {e["id"] for e in first}
+    for _ in range(3):
+        page = fetch_since(_console(nvr), cursor, NOW)
+        cursor = advance_cursor(cursor, page, NOW)
+        seen |= {e["id"] for e in page}
+
+    assert "follow on the next poll" in logged[0]
+    assert advance_cursor(NOW - 20_000, first, NOW) == NOW - 8000  # newest event fetched, not `now`
+    assert seen == {f"e{n}" for n in range(6)}
+
+
+def test_refetched_event_with_end_is_passed_on_as_update(monkeypatch, tmp_path, recording_sink, raw):
+    monkeypatch.setattr(unifi_events, "OUT", str(tmp_path / "events.json"))
+    sink = recording_sink()
+    console = Console("home", "https://nvr", "t")
+    collector = Collector([sink], [console])
+    now = NOW * 1000
+    opened = raw("e1", now - 5000, 500, open=True)
+
+    collector.ingest([opened], now, console)
+    collector.ingest([opened], now, console)
+    collector.ingest([{**opened, "end": now - 1000, "score": 80}], now, console)
+    collector.ingest([{**opened, "end": now - 1000, "score": 80}], now, console)
+
+    assert [(e["end"], e.get("update", False)) for e in sink.offered_events()] == [(None, False), (now // 1000 - 1, True)]
+    assert sink.offered_events()[1]["score"] == 80
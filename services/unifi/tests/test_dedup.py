@@ -0,0 +1,57 @@
+from unifi_events import RecentIds
+
+MINUTE_MS = 60_000
+
+
+def test_duplicates_are_rejected():
+    seen = RecentIds(window_ms=10 * MINUTE_MS)
+
+    assert seen.add("a", 1_000) is True
+    assert seen.add("a", 1_000) is False
+    assert seen.add("a", 5 * MINUTE_MS) is False
+    assert "a" in seen
+
+
+def test_ids_older_than_window_are_dropped():
+    seen = RecentIds(window_ms=10 * MINUTE_MS)
+    seen.add("old", 0)
+
+    seen.add("new", 30 * MINUTE_MS)
+
+    assert "old" not in seen
+    assert len(seen) == 1
+    # A straggler from before the window is treated as already processed.
+    assert seen.add("straggler", 0) is False
+
+
+def test_out_of_order_events_within_window():
+    seen = RecentIds(window_ms=10 * MINUTE_MS)
+    seen.add("b", 5 * MINUTE_MS)
+
+    assert seen.add("a", 2 * MINUTE_MS) is True
+    assert list(seen.buckets) == [2, 5]
+
+
+def test_size_cap_evicts_oldest_buckets():
+    seen = RecentIds(window_ms=60 * MINUTE_MS, max_ids=100)
+
+    for i in range(500):
+        seen.add(f"id-{i}", i * MINUTE_MS // 10)
+
+    assert len(seen) <= 100
+    assert "id-499" in seen
+
+
+def test_memory_stays_flat_over_months_of_events():
+    seen = RecentIds(window_ms=45 * MINUTE_MS)
+    sizes = []
+
+    # ~90 days at one event every 30 seconds.
+    for i in range(90 * 24 * 120):
+        seen.add(f"evt-{i}", i * 30_000)
+        if i % 10_000 == 0:
+            sizes.append(len(seen))
+
+    assert max(sizes) <= 46 * 2
+    assert len(seen.buckets) <= 46
+    assert len(seen) == sum(len(ids) for ids in seen.buckets.values())
@@ -0,0 +1,108 @@
+import json
+import time
+from urllib.request import urlopen
+
+from event_api import start_api
+from event_store import EventStore
+
+
+NOW = int(time.time()) - 1_000
+
+
+def _events(n, camera="G4 Pro", type="motion", start=NOW):
+    return [
+        {"id": f"{camera}-{i}", "ts": start + i, "time": "t", "type": type, "camera": camera}
+        for i in range(n)
+    ]
+
+
+def test_pages_newest_first_with_cursor(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    store.insert_many(_events(5))
+
+    first, cursor = store.query(limit=2)
+    second, cursor2 = store.query(limit=2, cursor=cursor)
+    third, cursor3 = store.query(limit=2, cursor=cursor2)
+
+    assert [e["ts"] for e in first + second + third] == [NOW + 4, NOW + 3, NOW + 2, NOW + 1, NOW]
+    assert cursor3 is None
+
+
+def test_since_returns_newer_events_oldest_first(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    store.insert_many(_events(3) + _events(3, camera="Doorbell", type="ring"))
+
+    events, _ = store.query(since=NOW, camera="Doorbell")
+
+    assert [e["id"] for e in events] == ["Doorbell-1", "Doorbell-2"]
+
+
+def test_duplicates_ignored_and_retention_pruned(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"), retention_days=1)
+    store.insert_many(_events(3))
+    store.insert_many(_events(3))
+    assert store.count() == 3
+
+    removed = store.prune(now=NOW + 2 + 86400)
+
+    assert removed == 2
+    assert store.count() == 1
+
+
+def test_updated_event_replaces_its_open_version(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    store.insert_many(_events(1))
+    store.insert_many([{**_events(1)[0], "ts": NOW + 30, "type": "smartDetectZone"}])
+
+    events, _ = store.query()
+
+    assert [(e["ts"], e["type"]) for e in events] == [(NOW + 30, "smartDetectZone")]
+
+
+def test_same_id_on_two_consoles_is_kept_apart(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    home = [{**e, "nvr": "home"} for e in _events(2)]
+    barn = [{**e, "nvr": "barn", "type": "ring"} for e in _events(2)]
+    store.insert_many(home + barn)
+
+    first, cursor = store.query(limit=3)
+    rest, _ = store.query(limit=3, cursor=cursor)
+    barn_only, _ = store.query(nvr="barn")
+
+    assert store.count() == 4
+    assert len({(e["nvr"], e["id"]) for e in first + rest}) == 4
+    assert [(e["nvr"], e["type"]) for e in barn_only] == [("barn", "ring"), ("barn", "ring")]
+
+
+def test_store_from_before_consoles_is_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "events.db")
+    old = sqlite3.connect(path)
+    old.executescript(
+        "CREATE TABLE events (id TEXT PRIMARY KEY, ts INTEGER NOT NULL, time TEXT, type TEXT, camera TEXT);"
+        "CREATE INDEX idx_events_ts ON events (ts, id);"
+    )
+    old.execute("INSERT INTO events VALUES ('a', ?, 't', 'motion', 'G4')", (NOW,))
+    old.commit()
+    old.close()
+
+    store = EventStore(path)
+    store.insert_many([{"nvr": "home", "id": "a", "ts": NOW + 1, "time": "t", "type": "motion", "camera": "G4"}])
+    events, _ = store.query()
+
+    assert [(e["nvr"], e["id"]) for e in events] == [("home", "a"), ("", "a")]
+
+
+def test_history_endpoint(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    store.insert_many(_events(3))
+    server = start_api(store, port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/unifi/history?limit=2&type=motion"
+        body = json.load(urlopen(url))
+    finally:
+        server.shutdown()
+
+    assert [e["ts"] for e in body["events"]] == [NOW + 2, NOW + 1]
+    assert body["next_cursor"] == f"{NOW + 1}::G4 Pro-1"
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from urllib.request import urlopen
+
+from event_api import EventFeed, start_api
+from unifi_events import FeedSink
+
+
+def _evt(i, ts=None):
+    return {"id": f"e{i}", "ts": 1_700_000_000 + i if ts is None else ts, "type": "motion", "camera": "G4"}
+
+
+class _Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_read_returns_only_new_events():
+    feed = EventFeed()
+    feed.publish([_evt(1), _evt(2)])
+
+    first = feed.read()
+    feed.publish([_evt(3)])
+    second = feed.read(since=first["cursor"])
+
+    assert [e["id"] for e in first["events"]] == ["e1", "e2"]
+    assert [e["id"] for e in second["events"]] == ["e3"]
+    assert second["cursor"] == second["events"][-1]["published"] > first["cursor"]
+    assert second["reset"] is False
+
+
+def test_cursor_is_a_publish_timestamp_that_keeps_late_events_and_updates():
+    clock = _Clock()
+    feed = EventFeed(clock=clock)
+    feed.publish([_evt(1, ts=100), _evt(1, ts=100)])  # same millisecond still orders strictly
+    first = feed.read()
+
+    clock.now += 2
+    feed.publish([_evt(2, ts=50), {**_evt(1, ts=100), "update": True}])
+    second = feed.read(since=first["cursor"])
+
+    assert first["cursor"] == 1_700_000_000_002
+    assert [(e["id"], e["ts"]) for e in second["events"]] == [("e2", 50), ("e1", 100)]
+    assert second["cursor"] == 1_700_000_002_001
+
+
+def test_feed_sink_publishes_one_version_per_event():
+    feed = EventFeed()
+    sink = FeedSink(feed)
+
+    sink.deliver([
+        {**_evt(1, ts=100), "nvr": "home"},
+        {**_evt(2, ts=90), "nvr": "home", "update": True},
+        {**_evt(1, ts=105), "nvr": "home", "update": True},
+        {**_evt(1, ts=100), "nvr": "barn"},
+    ])
+
+    events = feed.read()["events"]
+    assert [(e["nvr"], e["id"], e["ts"], e.get("update", False)) for e in events] == [
+        ("home", "e2", 90, True), ("barn", "e1", 100, False), ("home", "e1", 105, False),
+    ]
+
+
+def test_cursor_from_before_a_restart_resets():
+    clock = _Clock()
+    old = EventFeed(clock=clock)
+    old.publish([_evt(1)])
+    cursor = old.read()["cursor"]
+
+    clock.now += 60
+    restarted = EventFeed(clock=clock)
+    restarted.publish([_evt(2)])
+    page = restarted.read(since=cursor)
+
+    assert page["reset"] is True
+    assert [e["id"] for e in page["events"]] == ["e2"]
+
+
+def test_long_poll_wakes_on_publish():
+    feed = EventFeed()
+    timer = threading.Timer(0.1, feed.publish, args=([_evt(1)],))
+    timer.start()
+
+    started = time.monotonic()
+    page = feed.read(since=feed.read()["cursor"], wait=5)
+
+    assert time.monotonic() - started < 2
+    assert [e["id"] for e in page["events"]] == ["e1"]
+
+
+def test_unknown_cursor_resets():
+    feed = EventFeed(size=2)
+    feed.publish([_evt(0)])
+    evicted = feed.read()["cursor"]
+    feed.publish([_evt(i) for i in range(1, 5)])
+
+    assert feed.read(since=feed.read()["cursor"] + 1)["reset"] is True
+    assert feed.read(since=evicted)["reset"] is True
+    assert [e["id"] for e in feed.read(since=evicted)["events"]] == ["e3", "e4"]
+
+
+def test_events_endpoint_times_out_with_same_cursor():
+    feed = EventFeed()
+    feed.publish([_evt(1)])
+    cursor = feed.read()["cursor"]
+    server = start_api(store=None, feed=feed, port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/unifi/events?since={cursor}&wait=0.2"
+        body = json.load(urlopen(url))
+    finally:
+        server.shutdown()
+
+    assert body == {"events": [], "cursor": cursor, "reset": False}
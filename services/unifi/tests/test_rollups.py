@@ -0,0 +1,51 @@
+import json
+import time
+from urllib.request import urlopen
+
+from event_api import start_api
+from event_rollups import Rollups, bucket_start
+from event_store import EventStore
+
+NOW = int(time.time()) // 3600 * 3600 + 1800  # middle of the current hour
+
+
+def _evt(i, ts, camera="G4", type="motion"):
+    return {"id": f"e{i}", "ts": ts, "time": "", "type": type, "camera": camera}
+
+
+def test_counts_by_camera_and_type_per_resolution():
+    rollups = Rollups()
+    rollups.add([_evt(1, NOW), _evt(2, NOW + 10), _evt(3, NOW - 3600, camera="Barn"), _evt(4, NOW, type="ring")], NOW)
+
+    hours = rollups.series("hour")
+    days = rollups.series("day", camera="G4")
+
+    assert [(b["t"], b["total"]) for b in hours] == [(NOW - 5400, 1), (NOW - 1800, 3)]
+    assert hours[-1]["cameras"] == {"G4": {"motion": 2, "ring": 1}}
+    assert sum(b["total"] for b in days) == 3
+    assert days[-1]["t"] == bucket_start(NOW, "day")
+
+
+def test_old_buckets_are_dropped():
+    rollups = Rollups()
+    rollups.add([_evt(1, NOW - 2 * 86400)], NOW)
+
+    assert rollups.series("minute") == []
+    assert len(rollups.series("hour")) == 1
+
+
+def test_seed_from_store_and_endpoint(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    store.insert_many([_evt(1, NOW), _evt(2, NOW + 1, camera="Barn")])
+    rollups = Rollups()
+    rollups.seed(store, NOW)
+    server = start_api(store, rollups=rollups, port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/unifi/rollups?resolution=minute&camera=Barn"
+        body = json.load(urlopen(url))
+    finally:
+        server.shutdown()
+
+    assert body["resolution"] == "minute"
+    assert body["buckets"] == [{"t": NOW, "total": 1, "cameras": {"Barn": {"motion": 1}}}]
+    assert [b["total"] for b in rollups.series("day")] == [2]
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from unifi_events import Collector, Sink, WebhookSink
+
+
+class _BlockedSink(Sink):
+    def __init__(self):
+        super().__init__("blocked", max_queue=3, batch_size=1)
+        self.release = threading.Event()
+
+    def deliver(self, batch):
+        self.release.wait(5)
+
+
+def _webhook_server(statuses):
+    """Serve POSTs, answering with `statuses` in turn (then 200); returns (server, received)."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status = statuses.pop(0) if statuses else 200
+            if status == 200:
+                received.append((self.headers.get("X-API-Key"), body))
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def test_full_queue_drops_oldest_without_blocking(recording_sink):
+    sink = recording_sink("slow", max_queue=3)
+
+    sink.offer([{"id": i} for i in range(5)])
+
+    assert sink.dropped == 2
+    assert [sink.queue.get_nowait()["id"] for _ in range(3)] == [2, 3, 4]
+
+
+def test_slow_sink_does_not_delay_collector_or_other_sinks(monkeypatch, tmp_path, recording_sink, raw):
+    monkeypatch.setattr("unifi_events.OUT", str(tmp_path / "events.json"))
+    fast = recording_sink("fast", batch_size=10, flush_seconds=0.05)
+    blocked = _BlockedSink()
+    for sink in (fast, blocked):
+        sink.start()
+    collector = Collector([blocked, fast])
+
+    started = time.monotonic()
+    for i in range(10):
+        collector.ingest([raw(f"e{i}", duration_ms=1000)], int(time.time() * 1000))
+    elapsed = time.monotonic() - started
+
+    deadline = time.monotonic() + 2
+    while sum(len(b) for b in fast.batches) < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    blocked.release.set()
+
+    assert elapsed < 0.5
+    assert sum(len(b) for b in fast.batches) == 10
+    assert blocked.dropped > 0
+
+
+def test_webhook_sink_retries_only_undelivered_events(monkeypatch):
+    monkeypatch.setattr("unifi_events.time.sleep", lambda s: None)
+    server, received = _webhook_server([200, 503])
+    try:
+        sink = WebhookSink(f"http://127.0.0.1:{server.server_address[1]}/hook", api_key="k", types={"motion"})
+        sink._deliver_with_retry([{"id": f"e{i}", "type": "motion", "camera": "G4"} for i in range(3)])
+    finally:
+        server.shutdown()
+
+    assert [body["id"] for _, body in received] == ["e0", "e1", "e2"]
+    assert {key for key, _ in received} == {"k"}
+    assert received[0][1]["camera_name"] == "G4"
+    assert (sink.delivered, sink.dropped) == (3, 0)
+
+
+def test_webhook_sink_drops_batch_after_last_retry(monkeypatch):
+    monkeypatch.setattr("unifi_events.time.sleep", lambda s: None)
+    server, received = _webhook_server([200] + [403] * 3)
+    try:
+        sink = WebhookSink(f"http://127.0.0.1:{server.server_address[1]}/hook")
+        sink._deliver_with_retry([{"id": f"e{i}", "type": "motion", "camera": "G4"} for i in range(3)])
+    finally:
+        server.shutdown()
+
+    assert [body["id"] for _, body in received] == ["e0"]
+    assert (sink.delivered, sink.dropped) == (1, 2)
+
+
+def test_webhook_sink_skips_updates_and_other_types():
+    sink = WebhookSink("http://127.0.0.1:9/hook", types={"motion"})
+
+    sink.offer([
+        {"id": "a", "type": "motion"},
+        {"id": "a", "type": "motion", "update": True},
+        {"id": "b", "type": "ring"},
+    ])
+
+    assert [sink.queue.get_nowait()["id"] for _ in range(sink.queue.qsize())] == ["a"]
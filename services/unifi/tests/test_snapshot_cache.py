@@ -0,0 +1,45 @@
+import os
+
+from snapshot_cache import SnapshotCache
+
+
+def _read(cache, nvr, event_id):
+    with open(os.path.join(cache.root, "by-event", nvr, f"{event_id}.jpg"), "rb") as f:
+        return f.read()
+
+
+def test_identical_snapshots_are_stored_once(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_bytes=1000)
+
+    first = cache.put("home", "e1", b"jpeg-a")
+    second = cache.put("home", "e2", b"jpeg-a")
+
+    assert first == second
+    assert cache.stats()["objects"] == 1 and cache.stats()["bytes"] == 6
+    assert _read(cache, "home", "e1") == _read(cache, "home", "e2") == b"jpeg-a"
+
+
+def test_evicts_least_recently_used_with_its_links(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_bytes=20)
+    cache.put("home", "old", b"a" * 8)
+    cache.put("home", "mid", b"b" * 8)
+    cache.put("home", "reused", b"a" * 8)  # same content as "old": now most recent
+
+    cache.put("home", "new", b"c" * 8)
+
+    assert not cache.has("home", "mid")
+    assert cache.has("home", "old") and cache.has("home", "reused") and cache.has("home", "new")
+    assert cache.stats()["bytes"] == 16 and cache.stats()["evicted"] == 1
+
+
+def test_rebuilds_index_from_disk(tmp_path):
+    cache = SnapshotCache(str(tmp_path), max_bytes=100)
+    cache.put("barn", "e1", b"x" * 10)
+    os.unlink(os.path.join(tmp_path, "by-event", "barn", "e1.jpg"))
+    cache.put("barn", "e2", b"y" * 10)
+
+    reopened = SnapshotCache(str(tmp_path), max_bytes=100)
+
+    assert reopened.stats()["objects"] == 2 and reopened.stats()["bytes"] == 20
+    assert reopened.has("barn", "e2") and not reopened.has("barn", "e1")
+    assert not SnapshotCache.valid_key("barn", "motion:G4:123")
@@ -0,0 +1,54 @@
+import json
+
+from unifi_events import Console, WsListener
+
+
+def _listener():
+    pushed = []
+    return WsListener(Console("home", "https://nvr", "t"), pushed.append), pushed
+
+
+def _frame(action, item):
+    return json.dumps({"type": action, "item": item})
+
+
+def test_add_frame_is_pushed():
+    ws, pushed = _listener()
+
+    ws._on_message(_frame("add", {"id": "e1", "modelKey": "event", "type": "motion", "start": 1000}))
+
+    assert pushed == [("event", {"id": "e1", "modelKey": "event", "type": "motion", "start": 1000})]
+
+
+def test_update_frame_is_merged_into_the_event():
+    ws, pushed = _listener()
+    ws._on_message(_frame("add", {"id": "e1", "modelKey": "event", "type": "motion", "start": 1000, "end": None}))
+
+    ws._on_message(_frame("update", {"id": "e1", "modelKey": "event", "end": 4000, "score": 72}))
+
+    assert pushed[-1] == ("event", {"id": "e1", "modelKey": "event", "type": "motion", "start": 1000,
+                                    "end": 4000, "score": 72})
+
+
+def test_update_for_unknown_event_waits_for_rest():
+    ws, pushed = _listener()
+
+    ws._on_message(_frame("update", {"id": "e9", "end": 4000}))
+
+    assert pushed == []
+
+
+def test_malformed_and_foreign_frames_are_ignored():
+    ws, pushed = _listener()
+
+    for message in (
+        "not json",
+        "[1, 2]",
+        json.dumps({"type": "add", "item": "e1"}),
+        _frame("add", {"modelKey": "event", "type": "motion"}),  # no id
+        _frame("add", {"id": "c1", "modelKey": "camera", "type": "G4"}),
+        _frame("remove", {"id": "e1", "modelKey": "event", "type": "motion"}),
+    ):
+        ws._on_message(message)
+
+    assert pushed == []
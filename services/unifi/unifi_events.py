@@ -1,13 +1,33 @@
 #!/usr/bin/env python3
-import os, time, json, requests
+import os, re, time, json, asyncio, hashlib, queue, random, ssl, tempfile, threading, requests
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from event_api import EventFeed, start_api
+from event_rollups import Rollups
+from event_store import EventStore
+from snapshot_cache import SNAPSHOT_CACHE_MB, SnapshotCache
+
+try:
+    import websocket  # websocket-client
+except ImportError:  # REST polling still works without it
+    websocket = None
 
 NVR = os.getenv("NVR_URL", "https://192.168.1.59").rstrip("/")
+# Several consoles: NVR_URLS="home=https://192.168.1.59,barn=https://10.0.0.5"; per-console
+# tokens come from API_TOKEN_<NAME> (e.g. API_TOKEN_BARN) and default to API_TOKEN.
+NVR_URLS = os.getenv("NVR_URLS", "").strip()
+NVR_TIMEOUT = float(os.getenv("NVR_TIMEOUT", "10"))
 API_TOKEN = os.getenv("API_TOKEN", "").strip()
 
-OUT = "/var/www/html/unifi_events.json"
-DBG = "/var/www/html/unifi_debug.log"
-
-os.makedirs(os.path.dirname(OUT), exist_ok=True)
+OUT_DIR = os.getenv("OUT_DIR", "/var/www/html")
+OUT = os.path.join(OUT_DIR, "unifi_events.json")
+NDJSON = os.path.join(OUT_DIR, "unifi_events.ndjson")
+MANIFEST = os.path.join(OUT_DIR, "unifi_events.manifest.json")
+EVENT_DB = os.getenv("EVENT_DB", "/data/unifi_events.db")
+NDJSON_MAX_BYTES = int(os.getenv("NDJSON_MAX_BYTES", str(5 * 1024 * 1024)))
+DBG = os.path.join(OUT_DIR, "unifi_debug.log")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(OUT_DIR, "snapshots"))
 
 def log(msg):
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -19,15 +39,30 @@ def log(msg):
     except Exception:
         pass
 
-if not API_TOKEN:
-    log("❌ ERROR: API_TOKEN is not set. Exiting.")
-    raise SystemExit(1)
-
-S = requests.Session()
-S.verify = False  # UniFi uses self-signed cert
-S.headers.update({"Authorization": f"Bearer {API_TOKEN}", "User-Agent": "unifi-collector/REST-1.0"})
-
 MAX_EVENTS = 200
+PAGE_LIMIT = int(os.getenv("PAGE_LIMIT", "100"))
+MAX_PAGES = 10
+POLL_SECONDS = float(os.getenv("POLL_SECONDS", "5"))
+# Re-read this much before the cursor so events that were still open (no `end`)
+# or indexed late by the NVR are picked up on the next poll.
+CURSOR_OVERLAP_MS = int(os.getenv("CURSOR_OVERLAP_SECONDS", "30")) * 1000
+INITIAL_LOOKBACK_MS = 30*60*1000
+COLLECTOR_MODE = os.getenv("COLLECTOR_MODE", "auto").lower()  # auto (WebSocket + fallback) | poll
+WS_PATH = os.getenv("WS_PATH", "/proxy/protect/integration/v1/ws")
+WS_FALLBACK_SECONDS = float(os.getenv("WS_FALLBACK_SECONDS", "30"))
+WS_RECONCILE_SECONDS = float(os.getenv("WS_RECONCILE_SECONDS", "300"))
+WS_MAX_BACKOFF = 60
+WS_RECENT_EVENTS = 500  # events kept so `update` frames (changed fields only) can be merged
+MERGE_WINDOW_SECONDS = float(os.getenv("MERGE_WINDOW_SECONDS", "0.25"))
+MAX_OPEN_MS = 10*60*1000  # stop waiting for an event that never closes
+# Ids are only needed while their events can still come back from a query.
+DEDUP_WINDOW_MS = INITIAL_LOOKBACK_MS + MAX_OPEN_MS + CURSOR_OVERLAP_MS
+DEDUP_MAX_IDS = int(os.getenv("DEDUP_MAX_IDS", "50000"))
+WEBHOOK_SINK_URL = os.getenv("WEBHOOK_SINK_URL", "").strip()
+WEBHOOK_SINK_API_KEY = os.getenv("WEBHOOK_SINK_API_KEY", "").strip()
+WEBHOOK_SINK_TYPES = {t for t in os.getenv("WEBHOOK_SINK_TYPES", "").split(",") if t.strip()}
+DISCORD_SINK_WEBHOOK_URL = os.getenv("DISCORD_SINK_WEBHOOK_URL", "").strip()
+SNAPSHOT_TYPES = {t.strip() for t in os.getenv("SNAPSHOT_TYPES", "motion,smartDetectZone,smartDetectLine").split(",") if t.strip()}
 
 def load_events():
     try:
@@ -36,14 +71,69 @@ def load_events():
     except Exception:
         return []
 
-def save_events(evts):
+def atomic_write(path, text):
+    """Write via a temp file in the same directory + rename, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def load_manifest_version():
+    try:
+        with open(MANIFEST, "r") as f:
+            return int(json.load(f).get("version", 0))
+    except Exception:
+        return 0
+
+_manifest_version = None
+
+def append_ndjson(evts):
+    if not evts:
+        return
+    try:
+        if os.path.exists(NDJSON) and os.path.getsize(NDJSON) > NDJSON_MAX_BYTES:
+            os.replace(NDJSON, NDJSON + ".1")
+        with open(NDJSON, "a") as f:
+            f.writelines(json.dumps(e, separators=(",", ":")) + "\n" for e in evts)
+    except Exception as e:
+        log(f"⚠️ ndjson write error: {e}")
+
+def save_events(evts, new_evts=()):
+    """Publish the latest events: compact JSON, an append-only NDJSON log and a manifest.
+
+    The manifest carries a version counter and ETag so readers can skip the
+    download when nothing changed.
+    """
+    global _manifest_version
     try:
-        with open(OUT, "w") as f:
-            json.dump(evts[-MAX_EVENTS:], f, indent=2)
+        evts = evts[-MAX_EVENTS:]
+        body = json.dumps(evts, separators=(",", ":"))
+        atomic_write(OUT, body)
+        append_ndjson(list(new_evts))
+
+        if _manifest_version is None:
+            _manifest_version = load_manifest_version()
+        _manifest_version += 1
+        manifest = {
+            "version": _manifest_version,
+            "etag": hashlib.sha1(body.encode()).hexdigest()[:16],
+            "count": len(evts),
+            "latest_ts": evts[-1].get("ts") if evts else None,
+            "updated": int(time.time()),
+        }
+        atomic_write(MANIFEST, json.dumps(manifest, separators=(",", ":")))
     except Exception as e:
         log(f"⚠️ write error: {e}")
 
-def norm(ev):
+def norm(ev, nvr=None):
     cam = (
         ev.get("cameraName")
         or (ev.get("camera") or {}).get("name")
@@ -58,48 +148,615 @@ def norm(ev):
         "type": etype,
         "camera": cam,
         "id": ev.get("id") or f"{etype}:{cam}:{ts_ms}",
+        "nvr": nvr,
+        "end": int(ev["end"]/1000) if ev.get("end") else None,
+        "score": ev.get("score"),
     }
 
-def poll_loop():
-    end_ms = int(time.time()) * 1000
-    since_ms = end_ms - 30*60*1000  # last 30 minutes
+def event_version(raw):
+    """What changes when the NVR updates an event: `lastModified`, else `end` (None while open)."""
+    return raw.get("lastModified") or raw.get("end")
 
-    cache = load_events()
-    seen = {e.get("id") for e in cache if isinstance(e, dict) and e.get("id")}
-    save_events(cache)  # ensure file exists
+class RecentIds:
+    """Dedup set bounded by event time and size.
+
+    Ids live in one dict (id -> version) per `bucket_ms` slice of event time.
+    Buckets older than `window_ms` behind the newest event are dropped, as are
+    the oldest buckets whenever more than `max_ids` ids are held. Ids older than
+    the window are reported as already seen: no query can return them any more.
+    """
+
+    def __init__(self, window_ms=DEDUP_WINDOW_MS, max_ids=DEDUP_MAX_IDS, bucket_ms=60_000):
+        self.bucket_ms = bucket_ms
+        self.max_buckets = max(1, window_ms // bucket_ms + 1)
+        self.max_ids = max_ids
+        self.buckets = OrderedDict()  # bucket index -> set of ids, oldest first
+        self.size = 0
+        self.newest = None
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, event_id):
+        return any(event_id in ids for ids in self.buckets.values())
+
+    def add(self, event_id, ts_ms, version=None):
+        """Record `event_id`; return True if it was not seen before or carries a newer `version`."""
+        index = int(ts_ms) // self.bucket_ms
+        if self.newest is not None and index <= self.newest - self.max_buckets:
+            return False
+        for ids in self.buckets.values():
+            if event_id in ids:
+                seen = ids[event_id]
+                if version is None or (seen is not None and version <= seen):
+                    return False
+                ids[event_id] = version
+                return True
+
+        if index not in self.buckets:
+            self.buckets[index] = {}
+            if self.newest is not None and index < self.newest:
+                self.buckets = OrderedDict(sorted(self.buckets.items()))
+        self.buckets[index][event_id] = version
+        self.size += 1
+        if self.newest is None or index > self.newest:
+            self.newest = index
+        self._evict()
+        return True
+
+    def _evict(self):
+        cutoff = self.newest - self.max_buckets
+        while self.buckets:
+            oldest, ids = next(iter(self.buckets.items()))
+            if oldest > cutoff and (self.size <= self.max_ids or len(self.buckets) == 1):
+                break
+            del self.buckets[oldest]
+            self.size -= len(ids)
+
+class Console:
+    """One UniFi Protect console: its own session, token, timeout and cursor."""
+
+    def __init__(self, name, url, token, timeout=NVR_TIMEOUT):
+        self.name = name
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.cursor_ms = None
+        self.session = requests.Session()
+        self.session.verify = False  # UniFi uses self-signed cert
+        self.session.headers.update({"Authorization": f"Bearer {token}", "User-Agent": "unifi-collector/REST-1.0"})
+
+def load_consoles():
+    consoles = []
+    for i, item in enumerate(part.strip() for part in (NVR_URLS or NVR).split(",") if part.strip()):
+        name, url = item.split("=", 1) if "=" in item else ("", item)
+        name = name.strip() or urlparse(url).hostname or f"nvr{i + 1}"
+        token = os.getenv("API_TOKEN_" + re.sub(r"\W", "_", name).upper(), "").strip() or API_TOKEN
+        consoles.append(Console(name, url.strip(), token))
+    return consoles
+
+def fetch_since(console, start_ms, end_ms):
+    """Return raw events in [start_ms, end_ms], following pages while they come back full.
+
+    Pages are asked for oldest first, so if MAX_PAGES runs out what was fetched
+    is the start of the window: the cursor stops at its newest event and the
+    next poll carries on from there. A console that answers newest first
+    anyway is paged backwards; a truncated window is logged either way.
+    """
+    items = []
+    for _ in range(MAX_PAGES):
+        url = (f"{console.url}/proxy/protect/api/events?limit={PAGE_LIMIT}"
+               f"&start={start_ms}&end={end_ms}&orderDirection=ASC")
+        r = console.session.get(url, timeout=console.timeout)
+        if r.status_code != 200:
+            raise RuntimeError(f"REST {r.status_code}: {r.text[:120]}")
+        data = r.json()
+        page = data.get("items") if isinstance(data, dict) else data
+        page = [raw for raw in (page or []) if isinstance(raw, dict)]
+        items.extend(page)
+        if len(page) < PAGE_LIMIT:
+            return items
+        # Full page: narrow the window to the part this page did not cover and fetch again.
+        starts = [raw.get("start") or 0 for raw in page]
+        if starts[0] <= starts[-1]:
+            if max(starts) <= start_ms:
+                break  # a whole page within one millisecond: cannot narrow further
+            start_ms = max(starts)  # events at the boundary come back again and are deduped
+        else:
+            if min(starts) >= end_ms or min(starts) <= start_ms:
+                break
+            end_ms = min(starts)
+    newest_first = starts[0] > starts[-1]
+    log(f"⚠️ [{console.name}] {MAX_PAGES} full pages, events in {start_ms}..{end_ms} "
+        + ("were skipped (console pages newest first)" if newest_first else "follow on the next poll"))
+    return items
+
+def advance_cursor(cursor_ms, items, now_ms):
+    """Move the high-water mark to the newest fully processed event.
+
+    Events that are still open (no `end` yet) hold the cursor at their start so
+    their final version is fetched again once it closes.
+    """
+    open_starts = [
+        raw.get("start") for raw in items
+        if raw.get("start") and not raw.get("end") and now_ms - raw.get("start") < MAX_OPEN_MS
+    ]
+    done = [raw.get("start") for raw in items if raw.get("start") and raw.get("end")]
+    cursor = max([cursor_ms] + done)
+    if open_starts:
+        cursor = min(cursor, min(open_starts))
+    return min(cursor, now_ms)
+
+class WsListener(threading.Thread):
+    """Keeps the Protect WebSocket open and hands raw events to the collector.
+
+    Calls `push(("event", raw))` for every event message and
+    `push(("connected", None))` / `push(("disconnected", None))` on state
+    changes. `update` frames carry only the changed fields (end, score, ...),
+    so they are merged into the last version of the event and pushed whole.
+    Reconnects with exponential backoff and jitter; the backoff resets after a
+    successful connect.
+    """
+
+    def __init__(self, console, push):
+        super().__init__(name=f"unifi-ws-{console.name}", daemon=True)
+        self.console = console
+        self.push = push
+        self.recent = OrderedDict()  # event id -> latest raw event
+        self.url = console.url.replace("https://", "wss://").replace("http://", "ws://") + WS_PATH
+
+    def run(self):
+        backoff = 1
+        while True:
+            opened = threading.Event()
+            app = websocket.WebSocketApp(
+                self.url,
+                header=[f"Authorization: Bearer {self.console.token}", f"X-API-KEY: {self.console.token}"],
+                on_open=lambda ws: self._on_open(opened),
+                on_message=lambda ws, msg: self._on_message(msg),
+                on_error=lambda ws, err: log(f"❌ [{self.console.name}] WebSocket error: {err}"),
+            )
+            try:
+                app.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE, "check_hostname": False},
+                                ping_interval=30, ping_timeout=10)
+            except Exception as e:
+                log(f"❌ [{self.console.name}] WebSocket crashed: {e}")
+            if opened.is_set():
+                backoff = 1
+                self.push(("disconnected", None))
+            delay = backoff + random.uniform(0, backoff / 2)
+            log(f"🔌 [{self.console.name}] WebSocket closed, reconnecting in {delay:.1f}s")
+            time.sleep(delay)
+            backoff = min(backoff * 2, WS_MAX_BACKOFF)
+
+    def _on_open(self, opened):
+        opened.set()
+        log(f"✅ [{self.console.name}] WebSocket connected to UniFi Protect")
+        self.push(("connected", None))
+
+    def _on_message(self, message):
+        try:
+            data = json.loads(message)
+        except Exception:
+            log(f"⚠️ Error parsing message: {message[:100]}")
+            return
+        if not isinstance(data, dict):
+            return
+        # Integration API wraps the event as {"type": "add"|"update", "item": {...}}.
+        action, raw = (data.get("type"), data["item"]) if isinstance(data.get("item"), dict) else ("add", data)
+        if raw.get("modelKey", "event") != "event" or not raw.get("id"):
+            return
+        if action == "update":
+            known = self.recent.get(raw["id"])
+            if known is None:
+                return  # not seen since we connected; the REST reconcile picks it up
+            raw = {**known, **raw}
+        elif action != "add":
+            return
+        if raw.get("type") in (None, "add", "update"):
+            return
+        self.recent[raw["id"]] = raw
+        self.recent.move_to_end(raw["id"])
+        while len(self.recent) > WS_RECENT_EVENTS:
+            self.recent.popitem(last=False)
+        self.push(("event", raw))
+
+
+class Sink(threading.Thread):
+    """Delivers events from its own bounded queue, in batches, on its own thread.
+
+    `offer` never blocks: when the queue is full the oldest queued events are
+    dropped (and counted), so a slow sink cannot hold up polling or the other
+    sinks. Subclasses implement `deliver(batch)`.
+    """
+
+    def __init__(self, name, max_queue=1000, batch_size=50, flush_seconds=1.0, retries=3):
+        super().__init__(name=f"sink-{name}", daemon=True)
+        self.sink_name = name
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retries = retries
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, evts):
+        for e in evts:
+            while True:
+                try:
+                    self.queue.put_nowait(e)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._deliver_with_retry(batch)
+
+    def _deliver_with_retry(self, batch):
+        size = len(batch)
+        for attempt in range(1, self.retries + 1):
+            try:
+                self.deliver(batch)
+                self.delivered += size
+                return
+            except Exception as e:
+                log(f"⚠️ sink {self.sink_name} failed (attempt {attempt}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+        self.delivered += size - len(batch)
+        self.dropped += len(batch)
+
+    def deliver(self, batch):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"queued": self.queue.qsize(), "delivered": self.delivered, "dropped": self.dropped}
+
+
+class FileSink(Sink):
+    """Keeps the last MAX_EVENTS in unifi_events.json (plus NDJSON log and manifest)."""
+
+    def __init__(self, cache):
+        super().__init__("file", batch_size=200, flush_seconds=0.5)
+        self.cache = cache
+
+    def deliver(self, batch):
+        latest = {(e.get("nvr"), e.get("id")): e for e in batch}
+        self.cache = [e for e in self.cache if (e.get("nvr"), e.get("id")) not in latest]
+        self.cache.extend(sorted(latest.values(), key=lambda x: x["ts"]))
+        self.cache = self.cache[-MAX_EVENTS:]
+        save_events(self.cache, batch)
+
+
+class StoreSink(Sink):
+    def __init__(self, store):
+        super().__init__("store", max_queue=10000, batch_size=500, flush_seconds=1.0)
+        self.store = store
 
-    log("ℹ️ REST polling started (/proxy/protect/api/events every 5s)")
+    def deliver(self, batch):
+        self.store.insert_many(batch)
+
+
+class FeedSink(Sink):
+    """Publishes events to the in-memory feed behind /unifi/events.
+
+    Within a batch only the latest version of each (nvr, id) is published, and
+    an event first seen in that batch is published as new, not as an update.
+    """
+
+    def __init__(self, feed):
+        super().__init__("feed", batch_size=200, flush_seconds=0.05)
+        self.feed = feed
+
+    def deliver(self, batch):
+        latest = {}
+        for e in batch:
+            key = (e.get("nvr"), e.get("id"))
+            if key in latest and not latest[key].get("update"):
+                e = {k: v for k, v in e.items() if k != "update"}
+            latest[key] = e
+        self.feed.publish(sorted(latest.values(), key=lambda x: x["ts"]))
+
+
+class WebhookSink(Sink):
+    """POSTs each event as its own JSON body (e.g. to the farmbot motion webhook).
+
+    The farmbot webhook only accepts calls from other hosts that carry its
+    UNIFI_PROTECT_API_KEY, so set WEBHOOK_SINK_API_KEY to the same value.
+    """
+
+    def __init__(self, url, api_key="", types=()):
+        super().__init__("webhook", max_queue=200, batch_size=20, flush_seconds=0.2)
+        self.url = url
+        self.types = set(types)
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers["X-API-Key"] = api_key
+
+    def offer(self, evts):
+        super().offer([
+            e for e in evts if not e.get("update") and (not self.types or e.get("type") in self.types)
+        ])
+
+    def deliver(self, batch):
+        while batch:
+            e = batch[0]
+            self.session.post(self.url, json={**e, "camera_name": e.get("camera")}, timeout=10).raise_for_status()
+            batch.pop(0)  # retries only resend what was not delivered yet
+
+
+class DiscordSink(Sink):
+    """Posts a digest of events, one line each, as few Discord messages as possible."""
+
+    LIMIT = 2000
+
+    def __init__(self, url):
+        super().__init__("discord", max_queue=500, batch_size=25, flush_seconds=5.0)
+        self.url = url
+
+    def offer(self, evts):
+        super().offer([e for e in evts if not e.get("update")])
+
+    def deliver(self, batch):
+        lines = [f"🎥 {e['time']} – {e['type']} ({e['camera']})" for e in batch]
+        while lines:
+            content = ""
+            while lines and len(content) + len(lines[0]) + 1 <= self.LIMIT:
+                content += lines.pop(0) + "\n"
+            if not content:
+                content = lines.pop(0)[: self.LIMIT]
+            requests.post(self.url, json={"content": content}, timeout=10).raise_for_status()
+
+
+class SnapshotSink(Sink):
+    """Prefetches event thumbnails into the snapshot cache while the NVR still has them."""
+
+    def __init__(self, snapshots, consoles, types=SNAPSHOT_TYPES):
+        super().__init__("snapshots", max_queue=500, batch_size=10, flush_seconds=0.2)
+        self.snapshots = snapshots
+        self.consoles = {c.name: c for c in consoles}
+        self.types = set(types)
+        self.missing = 0
+
+    def offer(self, evts):
+        super().offer([
+            e for e in evts
+            if e.get("type") in self.types and e.get("nvr") in self.consoles
+            and self.snapshots.valid_key(e["nvr"], e.get("id"))
+        ])
+
+    def deliver(self, batch):
+        while batch:
+            e = batch[0]
+            if not self.snapshots.has(e["nvr"], e["id"]):
+                console = self.consoles[e["nvr"]]
+                r = console.session.get(
+                    f"{console.url}/proxy/protect/api/events/{e['id']}/thumbnail", timeout=console.timeout
+                )
+                if r.status_code == 404:
+                    self.missing += 1
+                else:
+                    r.raise_for_status()
+                    self.snapshots.put(e["nvr"], e["id"], r.content)
+            batch.pop(0)  # retries only refetch what was not stored yet
+
+    def stats(self):
+        return {**super().stats(), "missing": self.missing, "cache": self.snapshots.stats()}
+
+
+class RollupSink(Sink):
+    """Keeps the per-camera minute/hour/day counts behind /unifi/rollups current."""
+
+    def __init__(self, rollups):
+        super().__init__("rollups", max_queue=10000, batch_size=500, flush_seconds=0.5)
+        self.rollups = rollups
+
+    def offer(self, evts):
+        super().offer([e for e in evts if not e.get("update")])  # counted when first seen
+
+    def deliver(self, batch):
+        self.rollups.add(batch)
+
+
+def build_sinks(cache, store=None, feed=None, consoles=(), rollups=None):
+    sinks = [FileSink(cache)]
+    if feed is not None:
+        sinks.append(FeedSink(feed))
+    if store is not None:
+        sinks.append(StoreSink(store))
+    if rollups is not None:
+        sinks.append(RollupSink(rollups))
+    if WEBHOOK_SINK_URL:
+        sinks.append(WebhookSink(WEBHOOK_SINK_URL, WEBHOOK_SINK_API_KEY, WEBHOOK_SINK_TYPES))
+    if DISCORD_SINK_WEBHOOK_URL:
+        sinks.append(DiscordSink(DISCORD_SINK_WEBHOOK_URL))
+    if consoles and SNAPSHOT_CACHE_MB > 0:
+        sinks.append(SnapshotSink(SnapshotCache(SNAPSHOT_DIR), consoles))
+    return sinks
+
+
+class Collector:
+    """Dedups events from every console and hands them, time-ordered, to the sinks.
+
+    An event seen again with a newer version (closed, rescored) is handed on
+    once more with `update: True`; sinks that keep state replace the earlier
+    copy, and sinks that count or notify skip it.
+    """
+
+    def __init__(self, sinks, consoles=()):
+        self.sinks = sinks
+        self.consoles = list(consoles)
+        default_nvr = self.consoles[0].name if self.consoles else None
+        cache = [e for e in load_events() if isinstance(e, dict)]
+        self.seen = RecentIds()
+        for e in cache:
+            if e.get("id"):
+                # Closed events are final; open ones (end None) are picked up again when they close.
+                version = None if "end" in e and e["end"] is None else float("inf")
+                self.seen.add((e.get("nvr") or default_nvr, e["id"]), e.get("ts", 0) * 1000, version)
+
+        now_ms = int(time.time()) * 1000
+        for console in self.consoles:
+            latest = max(
+                (e.get("ts", 0) for e in cache if (e.get("nvr") or default_nvr) == console.name), default=0
+            ) * 1000
+            console.cursor_ms = max(latest, now_ms - INITIAL_LOOKBACK_MS)
+
+    def ingest(self, items, now_ms, console=None):
+        self.ingest_many([(console, items, now_ms)])
+
+    def ingest_many(self, batches):
+        """Take `(console, raw_items, now_ms)` batches and offer new events in one ts-ordered list."""
+        new_evts = []
+        for console, items, now_ms in batches:
+            nvr = console.name if console is not None else None
+            for raw in items:
+                try:
+                    e = norm(raw, nvr)
+                    known = (nvr, e["id"]) in self.seen
+                    if self.seen.add((nvr, e["id"]), e["ts"] * 1000, event_version(raw)):
+                        if known:
+                            e["update"] = True  # same event, re-fetched with its end/score filled in
+                        new_evts.append(e)
+                except Exception:
+                    continue
+            if console is not None:
+                console.cursor_ms = advance_cursor(console.cursor_ms, items, now_ms)
+        if new_evts:
+            new_evts.sort(key=lambda x: x["ts"])
+            for sink in self.sinks:
+                sink.offer(new_evts)
+            log(f"🗂️ Added {len(new_evts)} events")
+
+async def fetch_new(console):
+    """Fetch everything after the console's cursor without blocking the event loop."""
+    now_ms = int(time.time()) * 1000
+    items = await asyncio.wait_for(
+        asyncio.to_thread(fetch_since, console, console.cursor_ms - CURSOR_OVERLAP_MS, now_ms),
+        timeout=console.timeout * MAX_PAGES,
+    )
+    return items, now_ms
+
+async def rest_fill(console, out):
+    try:
+        items, now_ms = await fetch_new(console)
+    except Exception as e:
+        log(f"⚠️ [{console.name}] REST error: {e!r}")
+        return False
+    await out.put((console, items, now_ms))
+    return True
+
+async def poll_console(console, out):
+    log(f"ℹ️ [{console.name}] REST polling {console.url} every {POLL_SECONDS:g}s (cursor-based)")
+    delay = POLL_SECONDS
+    while True:
+        ok = await rest_fill(console, out)
+        delay = POLL_SECONDS if ok else min(delay * 2, WS_MAX_BACKOFF)
+        await asyncio.sleep(delay)
+
+async def push_console(console, out):
+    """WebSocket first; REST fills gaps after reconnects and takes over while the socket is down."""
+    loop = asyncio.get_running_loop()
+    inbox = asyncio.Queue(maxsize=10000)
+
+    def push(item):
+        try:
+            inbox.put_nowait(item)
+        except asyncio.QueueFull:
+            log(f"⚠️ [{console.name}] WebSocket backlog full, dropping message")
+
+    WsListener(console, lambda item: loop.call_soon_threadsafe(push, item)).start()
+    log(f"ℹ️ [{console.name}] WebSocket collector started ({WS_PATH}), REST fallback after {WS_FALLBACK_SECONDS:g}s down")
+
+    connected = False
+    down_since = time.monotonic()
+    last_rest = 0.0
     while True:
+        batch = []
         try:
-            url = f"{NVR}/proxy/protect/api/events?limit=200&start={since_ms}&end={end_ms}"
-            r = S.get(url, timeout=10)
-            if r.status_code == 200:
-                data = r.json()
-                items = data.get("items") if isinstance(data, dict) else data
-                if items:
-                    new_evts = []
-                    for raw in items:
-                        try:
-                            e = norm(raw if isinstance(raw, dict) else {})
-                            if e["id"] not in seen:
-                                seen.add(e["id"])
-                                new_evts.append(e)
-                        except Exception:
-                            continue
-                    if new_evts:
-                        cache.extend(sorted(new_evts, key=lambda x: x["ts"]))
-                        cache = cache[-MAX_EVENTS:]
-                        save_events(cache)
-                        log(f"🗂️ Added {len(new_evts)} events (total {len(cache)})")
-                # slide the window forward
-                end_ms = int(time.time()) * 1000
-                since_ms = end_ms - 30*60*1000
-            else:
-                log(f"⚠️ REST {r.status_code}: {r.text[:120]}")
-        except Exception as e:
-            log(f"⚠️ REST error: {e}")
-        time.sleep(5)
+            item = await asyncio.wait_for(inbox.get(), timeout=1.0)
+        except asyncio.TimeoutError:
+            item = None
+        while item is not None:
+            kind, raw = item
+            if kind == "event":
+                batch.append(raw)
+            elif kind == "connected":
+                connected = True
+                await rest_fill(console, out)  # fill the gap left while disconnected
+                last_rest = time.monotonic()
+            elif kind == "disconnected":
+                connected = False
+                down_since = time.monotonic()
+            item = inbox.get_nowait() if not inbox.empty() else None
+
+        if batch:
+            await out.put((console, batch, int(time.time()) * 1000))
+
+        now = time.monotonic()
+        if connected:
+            due = now - last_rest >= WS_RECONCILE_SECONDS
+        else:
+            due = now - down_since >= WS_FALLBACK_SECONDS and now - last_rest >= POLL_SECONDS
+        if due:
+            await rest_fill(console, out)
+            last_rest = now
+
+async def merge_loop(collector, out):
+    """Gather what every console delivered within MERGE_WINDOW_SECONDS into one ordered batch."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batches = [await out.get()]
+        deadline = loop.time() + MERGE_WINDOW_SECONDS
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batches.append(await asyncio.wait_for(out.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        collector.ingest_many(batches)
+
+async def run_collector(collector, push=True):
+    out = asyncio.Queue(maxsize=1000)
+    worker = push_console if push else poll_console
+    tasks = [asyncio.create_task(worker(console, out), name=console.name) for console in collector.consoles]
+    tasks.append(asyncio.create_task(merge_loop(collector, out), name="merge"))
+    await asyncio.gather(*tasks)
 
 if __name__ == "__main__":
-    poll_loop()
+    os.makedirs(os.path.dirname(OUT), exist_ok=True)
+    consoles = load_consoles()
+    missing = [c.name for c in consoles if not c.token]
+    if missing:
+        log(f"❌ ERROR: API_TOKEN is not set for {', '.join(missing)}. Exiting.")
+        raise SystemExit(1)
 
+    store = EventStore(EVENT_DB)
+    cache = load_events()
+    save_events(cache)  # ensure file exists
+    feed = EventFeed()
+    feed.publish(cache[-50:])
+    rollups = Rollups()
+    rollups.seed(store)
+    sinks = build_sinks(cache, store, feed, consoles, rollups)
+    for sink in sinks:
+        sink.start()
+    start_api(store, feed=feed, sinks=sinks, rollups=rollups)
+    collector = Collector(sinks, consoles)
+    asyncio.run(run_collector(collector, push=COLLECTOR_MODE != "poll" and websocket is not None))